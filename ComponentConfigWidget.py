@@ -1,5 +1,5 @@
 # component_config_widget.py
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QSplitter, QHBoxLayout, QPushButton
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QSplitter, QHBoxLayout, QPushButton, QLineEdit
 from PyQt5.QtCore import Qt
 from master_list_widget import MasterListWidget
 from detail_table_widget import DetailTableWidget
@@ -54,14 +54,26 @@ class ComponentConfigWidget(QWidget):
         btn_layout.addWidget(add_component_btn)
         btn_layout.addWidget(remove_component_btn)
 
+        # --- Wyszukiwarka KodSL (filtruje listę przy każdym znaku, Enter przechodzi do pierwszego trafienia) ---
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Szukaj składnika (KodSL)...")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.master_widget.set_search_text)
+        self.search_box.returnPressed.connect(self.master_widget.jump_to_search_match)
+
         # Dodajemy Master i przyciski do układu
         master_container = QVBoxLayout()
         master_container.setContentsMargins(0, 0, 0, 0)
+        master_container.addWidget(self.search_box)
         master_container.addWidget(self.master_widget)
         master_container.addLayout(btn_layout)
 
         # 4. Połączenie sygnału Master-Detail
         self.master_widget.variantSelected.connect(self.detail_widget.load_variant_data)
+        # Po wyświetleniu wybranego KodSL pobieramy w tle sąsiadów (nawigacja strzałkami trafia w cache)
+        self.master_widget.variantSelected.connect(
+            lambda _: self.detail_widget.prefetch_variants(self.master_widget.neighbour_variants())
+        )
 
         # Wymiana Master_widget na master_container w splitterze,
         # ale QSplitter nie przyjmuje layoutów bezpośrednio.
@@ -81,4 +93,5 @@ class ComponentConfigWidget(QWidget):
         # Uruchomienie ładowania dla pierwszego elementu
         if self.master_widget.rowCount() > 0:
             initial_kod_sl = self.master_widget.variant_names[0]
-            self.detail_widget.load_variant_data(initial_kod_sl)
\ No newline at end of file
+            self.detail_widget.load_variant_data(initial_kod_sl)
+            self.detail_widget.prefetch_variants(self.master_widget.neighbour_variants())
\ No newline at end of file
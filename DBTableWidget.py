@@ -1,40 +1,42 @@
 import pyodbc
-import json
-import os
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QSizePolicy, QWidget,
     QComboBox, QMessageBox, QDialog, QLabel, QLineEdit, QPushButton,
-    QVBoxLayout, QHBoxLayout, QApplication
+    QVBoxLayout, QHBoxLayout, QApplication, QMenu
 )
-from PyQt5.QtCore import Qt, QObject, QEvent
-from PyQt5.QtGui import QWheelEvent, QColor, QPainter, QPainterPath
+from PyQt5.QtCore import Qt, QObject, QEvent, QPoint, QItemSelection, QItemSelectionModel, QTimer
+from PyQt5.QtGui import QWheelEvent, QColor, QPainter, QPainterPath, QKeySequence
 
 from NoScrollComboBox import NoScrollComboBox
+from conflict_dialog import CONFLICT_OVERWRITE, CONFLICT_RELOAD, ask_conflict_resolution
+from definition_events import notify_definitions_changed
+from db_utils import load_db_config, ALL_EXPECTED_HEADERS, HEADER_MAPPING
+from job_scheduler import PRIORITY_INTERACTIVE, PRIORITY_NORMAL
+from kontrola_definicji import DefinitionMatrix, bit_indices, findings_by_cell, lint_matrix
+from offline_manager import (
+    handle_connection_error, is_offline, offline_manager, open_connection, queue_offline_changes, run_db_job
+)
+from skladniki_db import (
+    EMPTY_VERSION, ConflictError, apply_parameter_changes, fetch_all_parameters, fetch_variant_snapshot,
+    fetch_version_tokens, normalize_value
+)
+from skladniki_sync import diff_definitions, normalize_db_definitions, plan_changes, plan_is_empty
 
-CONFIG_FOLDER = "konfiguracje"
-CONFIG_FILE_NAME = os.path.join(CONFIG_FOLDER, "db_config.json")
 SQL_DATA_KEY = 'DefinicjeSkladnikow'
 
-ALL_EXPECTED_HEADERS = [
-    "do_podstawa_zus",
-    "do_podstawa_podatek",
-    "do_podstawa_zdrowotna",
-    "do_potracenie",
-    "do_zasilek",
-    "do_nie_podlega_zajęciu_przez_komornika",
-    "do_koszty_autorskie"
-]
-
-HEADER_MAPPING = {
-    "do_podstawa_zus": "ZUS",
-    "do_podstawa_podatek": "Podatek",
-    "do_podstawa_zdrowotna": "Zdrowotna",
-    "do_potracenie": "Potrącenie",
-    "do_zasilek": "Zasiłek",
-    "do_nie_podlega_zajęciu_przez_komornika": "Nie podlega zajęciu\n (komornik)",
-    "do_koszty_autorskie": "Koszty Autorskie"
-}
+
+class _PendingWrite:
+    """Zapis czekający w kolejce zapisów tabeli: zmiany komórek i usunięcia KodSL jednej transakcji."""
+
+    def __init__(self, changes, deleted_variants, error, on_done):
+        self.changes = list(changes)
+        self.deleted_variants = list(deleted_variants)
+        self.kod_sl_list = list(OrderedDict.fromkeys([kod_sl for kod_sl, _, _ in self.changes] + self.deleted_variants))
+        self.error = error
+        self.on_done = on_done
+        # KodSL, które użytkownik kazał nadpisać po konflikcie (zapis z aktualnymi tokenami wersji)
+        self.overwritten = []
 
 class DBTableWidget(QTableWidget):
     def __init__(self, styles, parent=None):
@@ -43,7 +45,29 @@ class DBTableWidget(QTableWidget):
         self.reverse_header_mapping = {v: k for k, v in HEADER_MAPPING.items()}
         self.data_before_conversion = OrderedDict()
         self.variant_names = []
-        self.setSelectionBehavior(QTableWidget.SelectRows)
+        # KodSL -> numer wiersza (odwrotność variant_names, aktualizowana przy wstawianiu/usuwaniu wierszy)
+        self.variant_rows = {}
+        # Tokeny wersji KodSL z chwili odczytu (None - baza bez kolumny wersji, bez wykrywania konfliktów)
+        self.row_versions = None
+        # Stan bazy, na którym opiera się model: {KodSL: wektor wartości} z chwili odczytu, aktualizowany
+        # po każdym zapisie i odświeżeniu wierszy. save_data zapisuje tylko różnice modelu względem niego.
+        self.saved_definitions = OrderedDict()
+        # Zapisy idą do bazy po kolei (jeden w toku): tokeny wersji następnego zapisu są brane
+        # z row_versions dopiero po zakończeniu poprzedniego, więc kolejne edycje tego samego KodSL
+        # nie zgłaszają fałszywych konfliktów.
+        self._pending_writes = deque()
+        self._write_in_flight = None
+        # Kontrola definicji (kontrola_definicji.py): macierz bitowa w układzie wierszy tabeli,
+        # oznaczone komórki {(wiersz, kolumna): komunikaty} i wiersze z nieznanymi parametrami.
+        self.definition_matrix = DefinitionMatrix()
+        self.lint_cells = {}
+        self.lint_rows = {}
+        self._lint_pending = False
+        # Zaznaczanie wielu komórek: nagłówki (wiersze/kolumny, z Shift/Ctrl), Ctrl/Shift+klik na komórce
+        self.setSelectionBehavior(QTableWidget.SelectItems)
+        self.setSelectionMode(QTableWidget.ExtendedSelection)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self._show_bulk_edit_menu)
         header_bg = self.styles['header_bg']
         header_color = self.styles['header_color']
         table_bg = self.styles.get('table_bg', '#FFFFFF')
@@ -124,6 +148,10 @@ class DBTableWidget(QTableWidget):
         if self.selectionModel():
             self.selectionModel().selectionChanged.connect(self.update_row_colors)
 
+        manager = offline_manager()
+        if manager is not None:
+            manager.replayed.connect(self._on_offline_replayed)
+
     def _handle_vertical_header_click(self, row_index):
         """
         Wymusza zaznaczenie całego wiersza i odświeżenie kolorów po kliknięciu
@@ -134,85 +162,57 @@ class DBTableWidget(QTableWidget):
 
     def load_db_config(self):
         """Wczytuje parametry połączenia z pliku JSON."""
-        self.db_config = {
-            "migration_server": "",
-            "migration_db": "",
-            "odbc_driver": "ODBC Driver 17 for SQL Server"
-        }
-
-        if os.path.exists(CONFIG_FILE_NAME):
-            try:
-                with open(CONFIG_FILE_NAME, 'r') as f:
-                    config = json.load(f)
-                    self.db_config.update(config)
-            except json.JSONDecodeError:
-                QMessageBox.critical(self, "Błąd Konfiguracji",
-                                     f"Błąd odczytu pliku {CONFIG_FILE_NAME}. Sprawdź składnię JSON.")
-        else:
-            print(f"Brak pliku konfiguracji bazy danych: {CONFIG_FILE_NAME}. Działanie na pustej konfiguracji.")
+        self.db_config = load_db_config()
 
     def get_db_connection(self):
-        """Tworzy i zwraca połączenie pyodbc do SQL Server."""
-        server = self.db_config.get("migration_server")
-        database = self.db_config.get("migration_db")
-        driver = self.db_config.get("odbc_driver")
-        if not server or not database:
-            QMessageBox.critical(self, "Błąd Połączenia",
-                                 "Brak konfiguracji serwera/bazy danych w pliku JSON.")
-            return None
-
-        connection_str = (
-            f"DRIVER={{{driver}}};"
-            f"SERVER={server};"
-            f"DATABASE={database};"
-            f"Trusted_Connection=yes;"
-            f"Pooling=no;"
+        """Tworzy i zwraca połączenie pyodbc do SQL Server (None w trybie offline)."""
+        return open_connection(self.db_config)
+
+    def _local_definitions(self, headers):
+        """Lokalna kopia definicji (tryb offline) w układzie fetch_all_parameters."""
+        return OrderedDict(
+            (kod_sl, OrderedDict((header, params.get(header, "")) for header in headers))
+            for kod_sl, params in offline_manager().local_definitions().items()
         )
 
-        try:
-            return pyodbc.connect(connection_str, autocommit=False)
-        except pyodbc.Error as ex:
-            sqlstate = ex.args[0]
-            QMessageBox.critical(self, "Błąd Połączenia SQL",
-                                 f"Nie można nawiązać połączenia z serwerem. SQL State: {sqlstate}")
-            return None
-
     # -----------------------------------------------------
     # II. KOMUNIKACJA Z BAZĄ DANYCH
     # -----------------------------------------------------
 
+    def _run_db_job(self, name, work, priority, on_result, on_error):
+        """Odczyt/zapis w tle (offline_manager.run_db_job) - wyniki i błędy wracają do wątku GUI."""
+        run_db_job(self.db_config, name, work, priority, on_result, on_error)
+
     def load_data(self):
         """
         Ładuje dane z wer_t_Skladniki_Parametry, uzupełnia brakujące kolumny
-        i buduje model słownikowy.
+        i buduje model słownikowy. W MainApp odczyt idzie w tle, a tabela jest budowana po nim.
         """
-        conn = self.get_db_connection()
-        if not conn:
-            self.data_before_conversion = OrderedDict()
-            return
+        headers_to_use = ALL_EXPECTED_HEADERS
+        db_config = self.db_config
 
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT DISTINCT KodSL, Parametr, Wartosc 
-                FROM wer_t_Skladniki_Parametry 
-                WHERE Data_Od IS NULL AND Data_Do IS NULL 
-                ORDER BY KodSL, Parametr
-            """)
-            rows = cursor.fetchall()
-            conn.close()
-        except pyodbc.Error as ex:
-            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu danych: {ex}")
-            conn.close()
-            return
+        def read(conn):
+            return fetch_all_parameters(conn, headers_to_use, db_config=db_config), fetch_version_tokens(conn)
+
+        self._run_db_job("Wczytanie definicji", read, PRIORITY_INTERACTIVE,
+                         on_result=self._on_data_loaded, on_error=self._on_load_error)
 
-        new_data = OrderedDict()
+    def _on_data_loaded(self, result):
+        new_data, self.row_versions = result
+        self._show_data(new_data)
 
-        for KodSL, Parametr, Wartosc in rows:
-            if KodSL not in new_data:
-                new_data[KodSL] = OrderedDict()
-            new_data[KodSL][Parametr] = str(Wartosc)
+    def _on_load_error(self, ex):
+        if ex is not None and not (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu danych: {ex}")
+            return
+        if is_offline():
+            self._show_data(self._local_definitions(ALL_EXPECTED_HEADERS))
+        else:
+            self.data_before_conversion = OrderedDict()
+            self._reset_lint()
 
+    def _show_data(self, new_data):
+        """Buduje tabelę z wczytanych definicji (baza albo lokalna kopia offline)."""
         headers_to_use = ALL_EXPECTED_HEADERS
         display_headers = [HEADER_MAPPING.get(h, h) for h in headers_to_use]
         # --------------------------------------------------------------------
@@ -221,15 +221,15 @@ class DBTableWidget(QTableWidget):
             self.setColumnCount(len(headers_to_use))
             self.setHorizontalHeaderLabels(display_headers)
             self.setRowCount(0)
+            self.saved_definitions = OrderedDict()
+            self._reset_lint()
             return
 
-        for KodSL, params in new_data.items():
-            for expected_header in headers_to_use:
-                if expected_header not in params:
-                    params[expected_header] = ""
-
         self.data_before_conversion = new_data
+        self.saved_definitions = normalize_db_definitions(new_data)
         self.variant_names = list(self.data_before_conversion.keys())
+        self.variant_rows = {}
+        self._reindex_rows(0)
 
         self.setColumnCount(len(headers_to_use))
         self.setHorizontalHeaderLabels(display_headers)
@@ -238,75 +238,115 @@ class DBTableWidget(QTableWidget):
 
         self._fill_table_widgets(headers_to_use)
         self.auto_resize_columns()
+        self._reset_lint()
         self.update_row_colors()
 
     def _fill_table_widgets(self, headers):
-        """Pomocnicza funkcja do wypełniania komórek, używana przez load_data i add_row."""
+        """Pomocnicza funkcja do wypełniania komórek wszystkich wierszy, używana przez load_data."""
         for r, variant in enumerate(self.variant_names):
-            for c, key in enumerate(headers):
-                value = self.data_before_conversion[variant].get(key, "")
+            self._fill_row_widgets(r, variant, headers)
+
+    def _fill_row_widgets(self, r, variant, headers):
+        """Wypełnia komórki JEDNEGO wiersza (load_data, add_row i wycofanie usunięcia)."""
+        for c, key in enumerate(headers):
+            value = self.data_before_conversion[variant].get(key, "")
 
-                if key in ALL_EXPECTED_HEADERS:
-                    combo_box = NoScrollComboBox(self)
-                    combo_box.addItems(["tak", "nie", ""])
-                    combo_box.setCurrentText(str(value))
+            if key in ALL_EXPECTED_HEADERS:
+                combo_box = NoScrollComboBox(self)
+                combo_box.addItems(["tak", "nie", ""])
+                combo_box.setCurrentText(str(value))
 
-                    self.style_combo_box_by_text(combo_box, str(value))
+                self.style_combo_box_by_text(combo_box, str(value))
 
-                    self.setCellWidget(r, c, combo_box)
+                self.setCellWidget(r, c, combo_box)
+                combo_box.installEventFilter(self)
 
-                    combo_box.currentTextChanged.connect(
-                        lambda text, row=r, col=c: self.combo_box_modified(row, col, text)
-                    )
+                # Wiersz wyznaczamy po nazwie wariantu w chwili zmiany - indeksy
+                # przesuwają się po dodaniu/usunięciu wierszy bez przebudowy tabeli.
+                combo_box.currentTextChanged.connect(
+                    lambda text, name=variant, col=c: self.combo_box_modified(self.variant_rows[name], col, text)
+                )
 
-                    item = QTableWidgetItem(str(value))
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                    self.setItem(r, c, item)
-                else:
-                    self.setItem(r, c, QTableWidgetItem(str(value)))
+                item = QTableWidgetItem(str(value))
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                self.setItem(r, c, item)
+            else:
+                self.setItem(r, c, QTableWidgetItem(str(value)))
 
-    def save_data(self):
+    def save_data(self, on_done=None):
         """
-        Zapisuje model danych do SQL Server. Usuwa stare parametry logiczne i wstawia nowe,
-        ALE FILTRUJE DANE, ZAPISUJĄC TYLKO TE Z WARTOSCIĄ 'tak' lub 'nie'.
+        Zapisuje do SQL Server zmiany modelu, których jeszcze nie ma w bazie: różnice względem
+        saved_definitions (stanu z chwili odczytu, aktualizowanego po każdym zapisie), czyli tylko
+        KodSL edytowane w tej tabeli - z kontrolą wersji tych KodSL. Zmiany innych użytkowników
+        w pozostałych KodSL nie są ani nadpisywane, ani zgłaszane jako konflikt; nie trzeba też
+        czytać całej tabeli z bazy. Zapisywane są tylko wartości 'tak' lub 'nie'.
+        on_done(zapisano) - jak w _save_changes.
         """
-        conn = self.get_db_connection()
-        if not conn:
+        plan = diff_definitions(normalize_db_definitions(self.data_before_conversion), self.saved_definitions)
+        if plan_is_empty(plan):
+            if on_done is not None:
+                on_done(True)
             return
+        self._save_changes(plan_changes(plan), plan.deletes, on_done=on_done)
+
+    def _mark_saved(self, changes=(), deleted_variants=()):
+        """Zapisane zmiany (KodSL, Parametr, Wartosc) i usunięcia KodSL trafiają do saved_definitions."""
+        for kod_sl in deleted_variants:
+            self.saved_definitions.pop(kod_sl, None)
+        for kod_sl, parametr, wartosc in changes:
+            if parametr not in ALL_EXPECTED_HEADERS:
+                continue
+            vector = list(self.saved_definitions.get(kod_sl, ("",) * len(ALL_EXPECTED_HEADERS)))
+            vector[ALL_EXPECTED_HEADERS.index(parametr)] = normalize_value(wartosc)
+            if any(vector):
+                self.saved_definitions[kod_sl] = tuple(vector)
+            else:
+                self.saved_definitions.pop(kod_sl, None)
+
+    def _mark_loaded(self, kod_sl_list):
+        """KodSL wczytane z bazy: ich stan w modelu staje się stanem bazy dla save_data."""
+        current = normalize_db_definitions(OrderedDict(
+            (kod_sl, self.data_before_conversion[kod_sl]) for kod_sl in kod_sl_list
+            if kod_sl in self.data_before_conversion
+        ))
+        for kod_sl in kod_sl_list:
+            if kod_sl in current:
+                self.saved_definitions[kod_sl] = current[kod_sl]
+            else:
+                self.saved_definitions.pop(kod_sl, None)
 
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("""
-                DELETE FROM wer_t_Skladniki_Parametry 
-                WHERE Data_Od IS NULL AND Data_Do IS NULL
-            """)
-
-            insert_query = """
-                INSERT INTO wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
-                VALUES (?, ?, ?, NULL, NULL)
-            """
-            batch_data = []
-
-            for KodSL, params in self.data_before_conversion.items():
-                for Parametr, Wartosc in params.items():
-
-                    normalized_value = str(Wartosc).strip().lower()
-
-                    if normalized_value == 'tak' or normalized_value == 'nie':
-                        batch_data.append((KodSL, Parametr, normalized_value))
-
-            if batch_data:
-                cursor.executemany(insert_query, batch_data)
+    def _on_offline_replayed(self, kod_sl_list):
+        """Zmiany z kolejki offline trafiły do bazy - odświeżamy wiersze i tokeny wersji tych KodSL."""
+        self.reload_variants(kod_sl_list)
 
-            conn.commit()
+    def reload_variants(self, kod_sl_list):
+        """Wczytuje z bazy (w MainApp w tle) bieżące parametry i tokeny wersji KodSL; odświeża tylko ich wiersze."""
+        kod_sl_list = list(kod_sl_list)
+        self._run_db_job("Odświeżenie definicji", lambda conn: fetch_variant_snapshot(conn, kod_sl_list),
+                         PRIORITY_INTERACTIVE, on_result=self._on_variants_reloaded, on_error=self._on_reload_error)
 
-        except pyodbc.Error as ex:
-            conn.rollback()
-            QMessageBox.critical(self, "Błąd Zapisu", f"Błąd podczas zapisu do bazy danych: {ex}")
-        finally:
-            conn.close()
+    def _on_reload_error(self, ex):
+        if ex is not None and not (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu danych: {ex}")
 
+    def _on_variants_reloaded(self, result):
+        fresh, versions = result
+        if versions is not None and self.row_versions is not None:
+            self.row_versions.update(versions)
+
+        for kod_sl, params in fresh.items():
+            if kod_sl not in self.data_before_conversion:
+                if params:
+                    variant_data = OrderedDict((header, params.get(header, "")) for header in ALL_EXPECTED_HEADERS)
+                    self._insert_variant_row(len(self.variant_names), kod_sl, variant_data)
+                continue
+            row = self.variant_rows[kod_sl]
+            if not params:  # usunięty przez innego użytkownika
+                self._remove_variant_row(row, kod_sl)
+                continue
+            for col, header in enumerate(ALL_EXPECTED_HEADERS):
+                self._set_cell_value(row, col, kod_sl, header, params.get(header, ""))
+        self._mark_loaded(list(fresh))
 
     def auto_resize_columns(self):
         """Wymusza rozciągnięcie wszystkich kolumn do pełnej szerokości tabeli, zapewniając równe proporcje."""
@@ -321,8 +361,10 @@ class DBTableWidget(QTableWidget):
         COLOR_NIE_BG = "#FDF0F0"  # Bardzo jasna, delikatna czerwień/róż
         COLOR_NIE_TEXT = "#B85C5C"
         COLOR_DEFAULT_TEXT = "#000000"
+        COLOR_LINT_BORDER = "#D93025"  # komórka z uwagą kontroli definicji (podpowiedź w tooltipie)
 
         highlight_bg = self.styles.get('row_highlight', '#D7E3F3').upper()
+        border = f"2px solid {COLOR_LINT_BORDER}" if combo_box.property("lint") else "none"
 
         is_row_selected = (row_bg.upper() == highlight_bg)
 
@@ -340,7 +382,7 @@ class DBTableWidget(QTableWidget):
             QComboBox {{
                 background-color: {bg};
                 color: {fg};
-                border: none;
+                border: {border};
                 padding: 6px 4px;
                 text-align: center;
             }}
@@ -361,14 +403,11 @@ class DBTableWidget(QTableWidget):
         """
         Obsługuje zmianę wartości, aktualizuje styl, zapisuje do modelu
         używając klucza bazodanowego (a nie nazwy wyświetlanej).
+        Zmiana jest optymistyczna: model i komórka są aktualizowane od razu, zapis idzie
+        w tle, a przy nieudanym zapisie komórka jest wycofywana - bez ponownego odczytu z bazy.
         """
 
-        combo_box = self.cellWidget(row, col)
-
-        # 1. Uaktualnij styl wizualny
-        self.style_combo_box_by_text(combo_box, text)
-
-        # 2. Zapisz dane do modelu
+        # 1. Zapisz dane do modelu
         display_header = self.horizontalHeaderItem(col).text()
 
         # --- KLUCZOWA ZMIANA: KONWERSJA NA KLUCZ BAZODANOWY ---
@@ -376,66 +415,318 @@ class DBTableWidget(QTableWidget):
         # ------------------------------------------------------
 
         variant = self.variant_names[row]
+        previous_value = self.data_before_conversion[variant].get(header_key, "")
+        self._set_cell_value(row, col, variant, header_key, text)
+
+        # 2. Zapisz do bazy danych tylko tę komórkę (przy błędzie - wycofanie tylko tej komórki)
+        reverts = [(variant, header_key, previous_value, text)]
+        self.save_cell_changes([(variant, header_key, text)], on_done=lambda saved: saved or self._revert_cells(reverts))
+
+    def _revert_cells(self, reverts):
+        """
+        Wycofuje nieudany zapis: [(KodSL, Parametr, poprzednia, zapisywana), ...]. Komórka wraca
+        do poprzedniej wartości tylko wtedy, gdy nadal ma zapisywaną (nie zmieniono jej w międzyczasie).
+        """
+        for variant, header_key, previous_value, value in reverts:
+            row = self.variant_rows.get(variant)
+            if row is None or self.data_before_conversion[variant].get(header_key, "") != value:
+                continue
+            self._set_cell_value(row, ALL_EXPECTED_HEADERS.index(header_key), variant, header_key, previous_value)
+
+    def _set_cell_value(self, row, col, variant, header_key, text):
+        """Ustawia wartość jednej komórki w modelu, ComboBoxie i elemencie pod spodem (O(1))."""
         self.data_before_conversion[variant][header_key] = text
 
-        # 3. Zapisz do QTableWidgetItem pod spodem
+        combo_box = self.cellWidget(row, col)
+        if combo_box.currentText() != text:
+            combo_box.blockSignals(True)
+            combo_box.setCurrentText(text)
+            combo_box.blockSignals(False)
+
         self.item(row, col).setText(text)
+        self._apply_cell_colors([(row, col)])
+        self.definition_matrix.set_value(row, header_key, text)
+        self._schedule_lint()
 
-        print(f"Zmieniono wariant: {variant}, parametr (DB): {header_key}, nowa wartość: {text}")
-        # 4. Zapisz do bazy danych
-        self.save_single_variant(variant)
-        self.update_row_colors()
+    # -----------------------------------------------------
+    # KONTROLA DEFINICJI (oznaczenia w komórkach)
+    # -----------------------------------------------------
 
-    def save_single_variant(self, variant_name):
+    def _reset_lint(self):
+        """Buduje macierz kontroli od nowa z całego modelu (po wczytaniu tabeli) i oznacza komórki."""
+        self.definition_matrix = DefinitionMatrix(self.data_before_conversion)
+        self.lint_cells = {}
+        self.lint_rows = {}
+        self._run_lint()
+
+    def _schedule_lint(self):
+        """Reguły liczone raz po serii zmian (edycja zbiorcza, wklejanie) - w następnym obiegu pętli zdarzeń."""
+        if not self._lint_pending:
+            self._lint_pending = True
+            QTimer.singleShot(0, self._run_lint)
+
+    def _shift_lint_rows(self, row, delta):
+        """Wiersze od row przesunęły się o delta (wstawienie/usunięcie) - oznaczenia przesuwamy razem z nimi."""
+        def shifted(r):
+            return r + delta if r >= row else r
+
+        removed = delta < 0
+        self.lint_cells = {(shifted(r), c): text for (r, c), text in self.lint_cells.items()
+                           if not (removed and r == row)}
+        self.lint_rows = {shifted(r): messages for r, messages in self.lint_rows.items()
+                          if not (removed and r == row)}
+
+    def _run_lint(self):
         """
-        Zapisuje zmiany tylko dla jednego, podanego wariantu (KodSL).
-        Wykonuje transakcję: USUŃ wszystkie stare parametry tego wariantu BEZ DAT i WSTAW nowe, przefiltrowane.
+        Sprawdza reguły w wierszach zmienionych od poprzedniego sprawdzenia (oznaczenia pozostałych
+        wierszy nie mogły się zmienić) i przerysowuje tylko komórki, których oznaczenie się zmieniło.
         """
-        conn = self.get_db_connection()
-        if not conn:
+        self._lint_pending = False
+        dirty = self.definition_matrix.take_dirty()
+        if not dirty:
             return
+        dirty_rows = list(bit_indices(dirty))
+        findings = lint_matrix(self.definition_matrix, self.db_config.get("definition_lint_exemptions"), rows=dirty)
+        previous_cells, previous_rows = {}, {}
+        for row in dirty_rows:
+            for col in range(len(ALL_EXPECTED_HEADERS)):
+                if (row, col) in self.lint_cells:
+                    previous_cells[(row, col)] = self.lint_cells.pop((row, col))
+            if row in self.lint_rows:
+                previous_rows[row] = self.lint_rows.pop(row)
+        cells, rows = {}, {}
+        for (kod_sl, parametr), messages in findings_by_cell(findings).items():
+            row = self.definition_matrix.index_of(kod_sl)
+            if parametr in ALL_EXPECTED_HEADERS:
+                cells[(row, ALL_EXPECTED_HEADERS.index(parametr))] = "\n".join(messages)
+            else:
+                rows.setdefault(row, []).extend(messages)
+        self.lint_cells.update(cells)
+        self.lint_rows.update(rows)
+
+        changed = [cell for cell in set(cells) | set(previous_cells) if cells.get(cell) != previous_cells.get(cell)]
+        changed = [(r, c) for r, c in changed if r < self.rowCount() and c < self.columnCount()]
+        for r, c in changed:
+            widget = self.cellWidget(r, c)
+            if widget is not None:
+                widget.setProperty("lint", (r, c) in cells)
+                widget.setToolTip(cells.get((r, c), ""))
+            if self.item(r, c):
+                self.item(r, c).setToolTip(cells.get((r, c), ""))
+        self._apply_cell_colors(changed)
+
+        for row in set(rows) | set(previous_rows):
+            if row < len(self.variant_names) and rows.get(row) != previous_rows.get(row):
+                name = self.variant_names[row]
+                header_item = QTableWidgetItem(f"{name} ⚠" if row in rows else name)
+                header_item.setToolTip("\n".join(rows.get(row, [])))
+                self.setVerticalHeaderItem(row, header_item)
 
-        cursor = conn.cursor()
+    # -----------------------------------------------------
+    # III. EDYCJA ZBIORCZA (WIELE KOMÓREK, SCHOWEK)
+    # -----------------------------------------------------
+
+    def eventFilter(self, obj, event):
+        """Ctrl+klik / Shift+klik na ComboBoxie zaznacza komórkę zamiast otwierać listę."""
+        if (event.type() == QEvent.MouseButtonPress and isinstance(obj, QComboBox)
+                and event.modifiers() & (Qt.ControlModifier | Qt.ShiftModifier)):
+            index = self.indexAt(obj.mapTo(self.viewport(), QPoint(1, 1)))
+            if index.isValid():
+                self._extend_selection_to(index, event.modifiers())
+            return True
+        return super().eventFilter(obj, event)
+
+    def _extend_selection_to(self, index, modifiers):
+        selection_model = self.selectionModel()
+        anchor = selection_model.currentIndex()
+        if modifiers & Qt.ShiftModifier and anchor.isValid():
+            top_left = self.model().index(min(anchor.row(), index.row()), min(anchor.column(), index.column()))
+            bottom_right = self.model().index(max(anchor.row(), index.row()), max(anchor.column(), index.column()))
+            flags = QItemSelectionModel.Select if modifiers & Qt.ControlModifier else QItemSelectionModel.ClearAndSelect
+            selection_model.select(QItemSelection(top_left, bottom_right), flags)
+        else:
+            selection_model.select(index, QItemSelectionModel.Toggle)
+            selection_model.setCurrentIndex(index, QItemSelectionModel.NoUpdate)
 
-        try:
-            # 1. Usuń WSZYSTKIE stare parametry DLA TEGO JEDNEGO wariantu (KodSL)
-            cursor.execute("""
-                DELETE FROM dbo.wer_t_Skladniki_Parametry 
-                WHERE KodSL = ? AND Data_Od IS NULL AND Data_Do IS NULL
-            """, (variant_name,))
-            print(f"DEBUG: DELETE dla {variant_name} wykonane. Usunięto wierszy: {cursor.rowcount}")
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Paste):
+            self.paste_from_clipboard()
+            return
+        if event.key() in (Qt.Key_Delete, Qt.Key_Backspace) and self.selectedIndexes():
+            self.set_selected_cells("")
+            return
+        super().keyPressEvent(event)
 
-            # 2. Przygotowanie danych do wstawienia (FILTROWANIE)
-            insert_query = """
-                INSERT INTO dbo.wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
-                VALUES (?, ?, ?, NULL, NULL)
-            """
-            batch_data = []
+    def _show_bulk_edit_menu(self, pos):
+        if not self.selectedIndexes():
+            return
+        menu = QMenu(self)
+        for label, value in (("tak", "tak"), ("nie", "nie"), ("puste", "")):
+            action = menu.addAction(f"Ustaw zaznaczone na: {label}")
+            action.triggered.connect(lambda _, value=value: self.set_selected_cells(value))
+        menu.addSeparator()
+        paste_action = menu.addAction("Wklej ze schowka")
+        paste_action.setShortcut(QKeySequence.Paste)
+        paste_action.triggered.connect(self.paste_from_clipboard)
+        menu.exec_(self.viewport().mapToGlobal(pos))
+
+    def set_selected_cells(self, value):
+        """Ustawia tę samą wartość we wszystkich zaznaczonych komórkach (jeden zapis do bazy)."""
+        cells = {(index.row(), index.column()): value for index in self.selectedIndexes()}
+        self.apply_cell_changes(cells)
+
+    def paste_from_clipboard(self):
+        """
+        Wkleja tekst ze schowka (kolumny rozdzielone tabulatorem, wiersze nową linią - format Excela).
+        Pojedyncza wartość trafia do wszystkich zaznaczonych komórek, blok - od lewego górnego rogu zaznaczenia.
+        """
+        text = QApplication.clipboard().text()
+        if not text or not self.selectedIndexes():
+            return
 
-            # Pobieramy dane TYLKO dla zmienionego wariantu
-            params = self.data_before_conversion.get(variant_name, {})
+        block = [line.split("\t") for line in text.rstrip("\r\n").replace("\r\n", "\n").split("\n")]
+        invalid = sum(1 for line in block for value in line if value.strip().lower() not in ("tak", "nie", ""))
+        if invalid:
+            QMessageBox.warning(self, "Błąd Wklejania",
+                                f"Schowek zawiera {invalid} wartości innych niż 'tak', 'nie' lub puste.")
+            return
 
-            for Parametr, Wartosc in params.items():
-                # Filtrowanie: zapisujemy tylko 'tak' lub 'nie'
-                normalized_value = str(Wartosc).strip().lower()
+        if len(block) == 1 and len(block[0]) == 1:
+            self.set_selected_cells(block[0][0].strip().lower())
+            return
 
-                if normalized_value == 'tak' or normalized_value == 'nie':
-                    batch_data.append((variant_name, Parametr, normalized_value))
+        top = min(index.row() for index in self.selectedIndexes())
+        left = min(index.column() for index in self.selectedIndexes())
+        cells = {}
+        for dr, line in enumerate(block):
+            for dc, value in enumerate(line):
+                r, c = top + dr, left + dc
+                if r < self.rowCount() and c < self.columnCount():
+                    cells[(r, c)] = value.strip().lower()
+        self.apply_cell_changes(cells)
+
+    def apply_cell_changes(self, cells):
+        """
+        Stosuje zmiany {(wiersz, kolumna): wartość} optymistycznie w modelu i widoku,
+        zapisuje je jedną transakcją (w tle), a przy błędzie wycofuje wszystkie.
+        Przerysowywane są tylko zmienione komórki.
+        """
+        applied = []
+        for (row, col), value in cells.items():
+            if not isinstance(self.cellWidget(row, col), QComboBox):
+                continue
+            display_header = self.horizontalHeaderItem(col).text()
+            header_key = self.reverse_header_mapping.get(display_header, display_header)
+            variant = self.variant_names[row]
+            previous_value = self.data_before_conversion[variant].get(header_key, "")
+            if previous_value == value:
+                continue
+            self._set_cell_value(row, col, variant, header_key, value)
+            applied.append((variant, header_key, previous_value, value))
+
+        if not applied:
+            return
 
-            # 3. Wstawienie przefiltrowanych danych
-            if batch_data:
-                cursor.executemany(insert_query, batch_data)
-                print(f"DEBUG: INSERT dla {variant_name} wykonane. Wstawiono wierszy: {len(batch_data)}")
+        changes = [(variant, header_key, value) for variant, header_key, _, value in applied]
+        self.save_cell_changes(changes, on_done=lambda saved: saved or self._revert_cells(applied))
 
-            # 4. Zatwierdź transakcję
-            conn.commit()
-            print(f"Sukces zapisu wariantu {variant_name} do bazy.")
+    def save_cell_changes(self, changes, on_done=None):
+        """
+        Zapisuje listę zmian (KodSL, Parametr, Wartosc) jedną transakcją, z kontrolą wersji
+        zmienianych KodSL. on_done(zapisano) - jak w _save_changes.
+        """
+        self._save_changes(changes, on_done=on_done)
 
-        except pyodbc.Error as ex:
-            conn.rollback()
-            QMessageBox.critical(self, "Błąd Zapisu", f"Błąd podczas zapisu do bazy danych: {ex}")
-        finally:
-            conn.close()
+    def _save_changes(self, changes, deleted_variants=(), error=("Błąd Zapisu", "Błąd podczas zapisu do bazy danych"),
+                      on_done=None):
+        """
+        Dodaje do kolejki zapisów tabeli zmiany komórek i usunięcia KodSL (jedna transakcja z kontrolą
+        wersji tych KodSL; offline - do kolejki offline). Zapisy idą po kolei, w MainApp w tle,
+        poza nim od razu. error - (tytuł, początek komunikatu) okna błędu. on_done(zapisano) jest
+        wołane w wątku GUI po zakończeniu zapisu; zapisane zmiany trafiają do saved_definitions.
+        """
+        self._pending_writes.append(_PendingWrite(changes, deleted_variants, error, on_done))
+        self._dispatch_write()
+
+    def _dispatch_write(self):
+        """Wysyła następny zapis z kolejki, jeśli żaden nie jest w toku."""
+        if self._write_in_flight is not None or not self._pending_writes:
+            return
+        write = self._write_in_flight = self._pending_writes.popleft()
+        expected = None if write.overwritten else self._expected_versions(write.kod_sl_list)
+        versioned = self.row_versions is not None
+
+        def work(conn):
+            versions = expected
+            if write.overwritten and versioned:
+                versions = fetch_version_tokens(conn, write.kod_sl_list)
+            return apply_parameter_changes(conn, write.changes, write.deleted_variants, expected_versions=versions)
+
+        self._run_db_job("Zapis definicji", work, PRIORITY_NORMAL,
+                         on_result=lambda versions: self._on_write_saved(write, versions),
+                         on_error=lambda ex: self._on_write_failed(write, ex))
+
+    def _expected_versions(self, kod_sl_list):
+        """Tokeny wersji KodSL z chwili odczytu (None - baza bez kolumny wersji)."""
+        if self.row_versions is None:
+            return None
+        return {kod_sl: self.row_versions.get(kod_sl, EMPTY_VERSION) for kod_sl in kod_sl_list}
+
+    def _on_write_saved(self, write, new_versions):
+        if new_versions is not None and self.row_versions is not None:
+            self.row_versions.update(new_versions)
+        self._mark_saved(write.changes, write.deleted_variants)
+        self._finish_write(write, True)
+        if write.overwritten:
+            # Pozostałe komórki nadpisanych KodSL mogą zawierać zmiany innego użytkownika.
+            self.reload_variants(write.overwritten)
+
+    def _on_write_failed(self, write, ex):
+        """
+        Konflikt rozstrzyga użytkownik: Nadpisz ponawia zapis z aktualnymi tokenami, Wczytaj ponownie
+        odświeża wiersze KodSL z bazy (po wycofaniu zmian lokalnych w on_done). Utrata połączenia -
+        zapis trafia do kolejki offline.
+        """
+        to_reload = []
+        if isinstance(ex, ConflictError):
+            choice = ask_conflict_resolution(self, ex.kod_sl_list)
+            if choice == CONFLICT_OVERWRITE:
+                write.overwritten.extend(kod_sl for kod_sl in ex.kod_sl_list if kod_sl not in write.overwritten)
+                self._write_in_flight = None
+                self._pending_writes.appendleft(write)
+                self._dispatch_write()
+                return
+            if choice == CONFLICT_RELOAD:
+                to_reload = ex.kod_sl_list
+            saved = False
+        elif ex is None or (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            saved = queue_offline_changes(write.changes, write.deleted_variants,
+                                          self._expected_versions(write.kod_sl_list))
+            if saved:
+                self._mark_saved(write.changes, write.deleted_variants)
+        else:
+            QMessageBox.critical(self, write.error[0], f"{write.error[1]}: {ex}")
+            saved = False
+        self._finish_write(write, saved)
+        if to_reload:
+            self.reload_variants(to_reload)
+
+    def _finish_write(self, write, saved):
+        self._write_in_flight = None
+        notify_definitions_changed(self, write.kod_sl_list)
+        if write.on_done is not None:
+            write.on_done(saved)
+        self._dispatch_write()
+
+    def save_single_variant(self, variant_name, on_done=None):
+        """
+        Zapisuje zmiany tylko dla jednego, podanego wariantu (KodSL): wszystkie jego parametry
+        trafiają do bazy jedną transakcją (puste wartości = brak wiersza), z kontrolą wersji.
+        on_done(zapisano) - jak w _save_changes.
+        """
+        params = self.data_before_conversion.get(variant_name, {})
+        changes = [(variant_name, parametr, wartosc) for parametr, wartosc in params.items()]
+        self.save_cell_changes(changes, on_done=on_done)
 
     # -----------------------------------------------------
     # IV. OBSŁUGA WIERSZY (DODAJ/USUŃ)
@@ -497,7 +788,7 @@ class DBTableWidget(QTableWidget):
 
             item_type = title.lower().replace('dodaj nową ', '').replace('dodaj ', '')
 
-            if new_variant_name in self.variant_names:
+            if new_variant_name in self.variant_rows:
                 QMessageBox.warning(self, "Błąd",
                                     f"{item_type.capitalize()} o nazwie '{new_variant_name}' już istnieje.")
                 return
@@ -505,44 +796,74 @@ class DBTableWidget(QTableWidget):
             self.add_row(new_variant_name)
 
     def add_row(self, new_row_name):
-        """Dodaje nowy wiersz do modelu danych i do tabeli."""
+        """Dodaje nowy wiersz do modelu danych i do tabeli (tylko ten wiersz, bez przebudowy reszty)."""
 
         new_row_name = new_row_name.upper()
 
         # 1. Dodanie wariantu do wewnętrznego modelu danych
         new_variant_data = OrderedDict()
-        current_headers = [self.horizontalHeaderItem(c).text() for c in range(self.columnCount())]
 
         for header in ALL_EXPECTED_HEADERS:  # Używamy kluczy bazodanowych do inicjalizacji modelu
             new_variant_data[header] = ""
 
-        self.data_before_conversion[new_row_name] = new_variant_data
-        self.variant_names.append(new_row_name)
-
-        # 2. Aktualizacja widżetu QTableWidget
-        row_count = self.rowCount()
-        self.insertRow(row_count)
-
-        # Ustawienie nagłówka pionowego
-        self.setVerticalHeaderLabels(self.variant_names)
-
-        # 3. Wypełnienie nowej kolumny
-        self._fill_table_widgets(ALL_EXPECTED_HEADERS)  # Używamy kluczy bazodanowych do wypełnienia widżetów
-
-        # 4. Zapis do bazy (nowy wariant, który na początku ma tylko puste wartości)
-        self.save_single_variant(new_row_name)
-        self.update_row_colors()
+        row_count = self._insert_variant_row(len(self.variant_names), new_row_name, new_variant_data)
         self.selectRow(row_count)
         self.scrollToBottom()
 
+        # 2. Zapis do bazy (nowy wariant, który na początku ma tylko puste wartości); przy błędzie wiersz znika
+        def added(saved):
+            if not saved and new_row_name in self.variant_rows:
+                self._remove_variant_row(self.variant_rows[new_row_name], new_row_name)
+
+        self.save_single_variant(new_row_name, on_done=added)
+
+    def _insert_variant_row(self, row, variant_name, variant_data):
+        """Wstawia wiersz wariantu do modelu i widoku na pozycji row; zwraca numer wiersza."""
+        self.data_before_conversion[variant_name] = variant_data
+        self.variant_names.insert(row, variant_name)
+        self._reindex_rows(row)
+
+        self.insertRow(row)
+        self.setVerticalHeaderItem(row, QTableWidgetItem(variant_name))
+        self._fill_row_widgets(row, variant_name, ALL_EXPECTED_HEADERS)  # Klucze bazodanowe
+        self._apply_row_colors(range(row, self.rowCount()))
+        self.definition_matrix.insert_row(row, variant_name, variant_data)
+        self._shift_lint_rows(row, 1)
+        self._schedule_lint()
+        return row
+
+    def _remove_variant_row(self, row, variant_name):
+        """Usuwa wiersz wariantu z modelu i widoku; zwraca usunięte dane (do ewentualnego wycofania)."""
+        self.removeRow(row)
+        variant_data = self.data_before_conversion.pop(variant_name, OrderedDict())
+        if row < len(self.variant_names):
+            del self.variant_names[row]
+            self.variant_rows.pop(variant_name, None)
+            self._reindex_rows(row)
+            self.definition_matrix.remove_row(row)
+            self._shift_lint_rows(row, -1)
+            self._schedule_lint()
+        # Wiersze poniżej zmieniły parzystość - odświeżamy tylko je.
+        self._apply_row_colors(range(row, self.rowCount()))
+        return variant_data
+
+    def _reindex_rows(self, first_row):
+        """Aktualizuje numery wierszy KodSL od first_row (wiersze powyżej się nie przesunęły)."""
+        for row in range(first_row, len(self.variant_names)):
+            self.variant_rows[self.variant_names[row]] = row
+
     def remove_configuration(self):
         """Usuwa aktualnie zaznaczony wiersz (wariant) z tabeli, danych i bazy."""
-        selected_rows = self.selectionModel().selectedRows()
-        if not selected_rows:
-            QMessageBox.warning(self, "Błąd Usuwania", "Proszę zaznaczyć cały wiersz.")
+        # Zaznaczanie działa na komórkach - wiersz wyznacza zaznaczenie albo bieżąca komórka.
+        rows = {index.row() for index in self.selectionModel().selectedIndexes()}
+        if not rows and self.currentIndex().isValid():
+            rows = {self.currentIndex().row()}
+        if len(rows) != 1:
+            QMessageBox.warning(self, "Błąd Usuwania",
+                                "Proszę zaznaczyć jeden wiersz." if rows else "Proszę zaznaczyć wiersz do usunięcia.")
             return
 
-        row_index = selected_rows[0].row()
+        row_index = rows.pop()
         variant_to_remove = self.variant_names[row_index]
 
         reply = QMessageBox.question(self, 'Potwierdzenie Usunięcia',
@@ -553,62 +874,63 @@ class DBTableWidget(QTableWidget):
             self.remove_row(row_index, variant_to_remove)
 
     def remove_row(self, row_index, variant_name):
-        """Wykonuje faktyczne usunięcie wariantu z modelu i widoku."""
-
-        # Usuwamy wiersz z widoku tabeli
-        self.removeRow(row_index)
+        """
+        Wykonuje faktyczne usunięcie wariantu z modelu i widoku.
+        Usunięcie jest optymistyczne - jeśli baza go odrzuci, wiersz wraca na swoje miejsce.
+        """
 
-        # Usuwamy dane z wewnętrznego modelu
-        if variant_name in self.data_before_conversion:
-            del self.data_before_conversion[variant_name]
+        # Usuwamy wiersz z widoku tabeli i dane z wewnętrznego modelu
+        removed_data = self._remove_variant_row(row_index, variant_name)
 
-        if self.variant_names and row_index < len(self.variant_names):
-            del self.variant_names[row_index]
+        # Usuwamy wariant z bazy
+        def deleted(saved):
+            if saved:
+                QMessageBox.information(self, "Sukces", f"Wariant '{variant_name}' został usunięty.")
+            elif variant_name not in self.variant_rows:
+                self._insert_variant_row(min(row_index, len(self.variant_names)), variant_name, removed_data)
 
-        self.setVerticalHeaderLabels(self.variant_names)
+        self._delete_variant_from_db(variant_name, on_done=deleted)
 
-        # Usuwamy wariant z bazy
-        self._delete_variant_from_db(variant_name)
-        self.update_row_colors()
+    def _delete_variant_from_db(self, variant_name, on_done=None):
+        """Usuwa wszystkie wpisy danego wariantu z bazy danych (z kontrolą wersji). on_done - jak w _save_changes."""
+        self._save_changes([], [variant_name], ("Błąd Usuwania", "Błąd podczas usuwania wariantu"), on_done)
 
-        QMessageBox.information(self, "Sukces", f"Wariant '{variant_name}' został usunięty.")
-
-    def _delete_variant_from_db(self, variant_name):
-        """Usuwa wszystkie wpisy danego wariantu z bazy danych."""
-        conn = self.get_db_connection()
-        if not conn: return
-
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                DELETE FROM dbo.wer_t_Skladniki_Parametry 
-                WHERE KodSL = ? AND Data_Od IS NULL AND Data_Do IS NULL
-            """, (variant_name,))
-            conn.commit()
-        except pyodbc.Error as ex:
-            conn.rollback()
-            QMessageBox.critical(self, "Błąd Usuwania", f"Błąd podczas usuwania wariantu: {ex}")
-        finally:
-            conn.close()
-
-    def update_row_colors(self):
+    def update_row_colors(self, selected=None, deselected=None):
         """
         Aktualizuje kolory tła wierszy, w tym podświetlenie.
         Przekazuje poprawny kolor tła (zaznaczone lub naprzemienne) do widżetów.
+        Wywołana jako slot selectionChanged odświeża tylko komórki, których zaznaczenie się zmieniło.
         """
+        if selected is None and deselected is None:
+            self._apply_row_colors(range(self.rowCount()))
+            return
+
+        changed_cells = {(index.row(), index.column()) for index in selected.indexes()}
+        changed_cells.update((index.row(), index.column()) for index in deselected.indexes())
+        self._apply_cell_colors(changed_cells)
+
+    def _apply_row_colors(self, rows):
+        """Koloruje wszystkie komórki podanych wierszy (int albo iterowalna kolekcja numerów)."""
+        if isinstance(rows, int):
+            rows = (rows,)
+        columns = range(self.columnCount())
+        self._apply_cell_colors((r, c) for r in rows for c in columns)
 
-        selected_rows = [index.row() for index in self.selectionModel().selectedRows()]
+    def _apply_cell_colors(self, cells):
+        """Koloruje podane komórki (wiersz, kolumna): zaznaczone - podświetlenie, pozostałe - paski."""
 
         # Użycie czystej, minimalistycznej palety
         default_bg = self.styles.get('table_bg', '#FFFFFF')
         alternate_bg = self.styles.get('alternate_bg', '#FFFFFF')
         highlight_bg = self.styles.get('row_highlight', "#D7E1F2")
         highlight_color = self.styles.get('row_highlight_color', '#000000')
+        selection_model = self.selectionModel()
+        model = self.model()
 
-        for r in range(self.rowCount()):
-            # 1. Określenie koloru bazowego wiersza
-            if r in selected_rows:
-                # Kolor zaznaczonego wiersza (błękit)
+        for r, c in cells:
+            # 1. Określenie koloru bazowego komórki
+            if selection_model.isSelected(model.index(r, c)):
+                # Kolor zaznaczonej komórki (błękit)
                 bg_color_hex = highlight_bg
                 text_color_hex = highlight_color
             else:
@@ -616,22 +938,17 @@ class DBTableWidget(QTableWidget):
                 bg_color_hex = default_bg if r % 2 == 0 else alternate_bg
                 text_color_hex = "#000000"
 
-            bg_color_qt = QColor(bg_color_hex)
-            text_color_qt = QColor(text_color_hex)
-
-            for c in range(self.columnCount()):
-                item = self.item(r, c)
-                if not item:
-                    item = QTableWidgetItem("")
-                    self.setItem(r, c, item)
-
-                # 2. Ustawienie kolorów dla QTableWidgetItem (pod widżetem)
-                item.setBackground(bg_color_qt)
-                item.setForeground(text_color_qt)
+            item = self.item(r, c)
+            if not item:
+                item = QTableWidgetItem("")
+                self.setItem(r, c, item)
 
-                # 3. Zastosowanie koloru bazowego do WIDŻETU komórki
-                widget = self.cellWidget(r, c)
-                if widget and isinstance(widget, QComboBox):
-                    # Przekazujemy kolor tła wiersza/podświetlenia do funkcji stylującej
-                    self.style_combo_box_by_text(widget, widget.currentText(), bg_color_hex)
+            # 2. Ustawienie kolorów dla QTableWidgetItem (pod widżetem)
+            item.setBackground(QColor(bg_color_hex))
+            item.setForeground(QColor(text_color_hex))
 
+            # 3. Zastosowanie koloru bazowego do WIDŻETU komórki
+            widget = self.cellWidget(r, c)
+            if widget and isinstance(widget, QComboBox):
+                # Przekazujemy kolor tła wiersza/podświetlenia do funkcji stylującej
+                self.style_combo_box_by_text(widget, widget.currentText(), bg_color_hex)
@@ -1,14 +1,25 @@
 import os.path
 import sys
 
-from PyQt5.QtGui import QColor
-from PyQt5.QtWidgets import QWidget, QApplication, QTabWidget, QVBoxLayout, QHBoxLayout
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QColor, QCursor, QDesktopServices, QKeySequence
+from PyQt5.QtWidgets import QWidget, QApplication, QTabWidget, QVBoxLayout, QHBoxLayout, QMessageBox
+from PyQt5.QtWidgets import QInputDialog, QMenu, QShortcut
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QWidget
 
 from ColoredTabBar import ColoredTabBar
+from action_profiler import PROFILED_ACTIONS, ActionProfiler
 from ComponentConfigWidget import ComponentConfigWidget
 from DBTableWidget import DBTableWidget
 from JSONTableWidget import JSONTableWidget
+from db_recorder import QUERY_LOG_SIZE, QueryLog
+from db_utils import load_db_config, set_error_handler
+from diagnostics_widget import DiagnosticsWidget
+from job_scheduler import JOB_WORKERS, JobScheduler, JobStatusBar, set_job_scheduler
+from offline_manager import OfflineManager, is_offline, set_offline_manager
+from results_widget import ResultsWidget
+from ui_watchdog import WATCHDOG_THRESHOLD_MS, UiWatchdog
+from verification_widget import VerificationWidget
 
 CONFIG_FOLDER = "konfiguracje"
 KONFIGURACJE_PRAWNE = os.path.join(CONFIG_FOLDER, "konfiguracje_prawne.json")
@@ -17,7 +28,21 @@ DEFINICJE_SKŁADNIKÓW = os.path.join(CONFIG_FOLDER, "definicje_składników.jso
 class MainApp(QWidget):
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("Weryfikator naliczeń")
+        # Warstwa danych nie zna Qt - w GUI błędy połączenia pokazujemy w oknach dialogowych
+        set_error_handler(self.show_error)
+        db_config = load_db_config()
+        # Każde wywołanie bazy trafia do bufora diagnostyki (zakładka "Diagnostyka")
+        self.query_log = QueryLog(db_config.get("sql_log_size", QUERY_LOG_SIZE))
+        self.query_log.install()
+        # Tryb offline: bez serwera edycje trafiają do lokalnej kolejki (odtwarzanej po powrocie serwera)
+        self.offline_manager = OfflineManager(db_config, parent=self)
+        self.offline_manager.onlineChanged.connect(self.update_window_title)
+        self.offline_manager.pendingChanged.connect(self.update_window_title)
+        set_offline_manager(self.offline_manager)
+        # Zadania w tle (weryfikacja, odczyty przy zapisie) - postęp w pasku stanu na dole okna
+        self.job_scheduler = JobScheduler(db_config.get("job_workers", JOB_WORKERS), parent=self)
+        set_job_scheduler(self.job_scheduler)
+        self.update_window_title()
         self.setFixedSize(1800,950)
 
         main_layout = QVBoxLayout(self)
@@ -31,12 +56,80 @@ class MainApp(QWidget):
         outer_bar = ColoredTabBar(self.outer_tabs_colors)
         self.tabs.setTabBar(outer_bar)
         main_layout.addWidget(self.tabs)
+        self.status_bar = JobStatusBar(self.job_scheduler)
+        main_layout.addWidget(self.status_bar)
+        self.offline_manager.message.connect(self.status_bar.showMessage)
 
         self.setup_parameter_tab()
         self.setup_definicje_skladnikow_tab()
+        verification = VerificationWidget(self.job_scheduler)
+        results = ResultsWidget()
+        verification.runStored.connect(results.show_run)
+        self.tabs.addTab(verification, "Weryfikacja")
+        self.tabs.addTab(results, "Wyniki")
+        self.tabs.addTab(DiagnosticsWidget(self.query_log), "Diagnostyka")
         self.apply_tab_colors(self.tabs, self.outer_tabs_colors)
 
         self.tabs.currentChanged.connect(lambda idx: self.update_tab_background(self.tabs, self.outer_tabs_colors, idx))
+        # Sonda w tle: odtwarza kolejkę z poprzedniej sesji i odświeża lokalną kopię definicji
+        self.offline_manager.probe()
+        # Strażnik zapisuje do logi/zawieszenia_gui.log sloty blokujące pętlę zdarzeń dłużej niż próg
+        self.watchdog = UiWatchdog(db_config.get("watchdog_threshold_ms", WATCHDOG_THRESHOLD_MS), parent=self)
+        self.watchdog.writeFailed.connect(self.status_bar.showMessage)
+        self.watchdog.start()
+        # Ukryte profilowanie następnych akcji (raporty w profile/ do przesłania przez użytkownika)
+        self.profiled_actions = db_config.get("profiler_actions", PROFILED_ACTIONS)
+        self.action_profiler = ActionProfiler(parent=self)
+        self.action_profiler.remainingChanged.connect(self.update_window_title)
+        self.action_profiler.reportWritten.connect(self.update_window_title)
+        self.action_profiler.reportFailed.connect(
+            lambda error: QMessageBox.warning(self, "Profilowanie", f"Nie można zapisać raportu profilowania: {error}")
+        )
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=lambda: self.action_profiler.toggle(self.profiled_actions))
+        QShortcut(QKeySequence("Ctrl+Shift+F12"), self, activated=self.show_profiler_menu)
+
+    def closeEvent(self, event):
+        # Uruchomione zadania kończą się przy najbliższym sprawdzeniu tokenu anulowania.
+        self.job_scheduler.shutdown()
+        self.watchdog.stop()
+        super().closeEvent(event)
+
+    def show_error(self, title, message):
+        # Offline brak połączenia jest stanem oczekiwanym - bez okien przy każdej próbie, tylko w pasku stanu.
+        if is_offline():
+            self.status_bar.showMessage(f"{title}: {message}")
+            return
+        QMessageBox.critical(self, title, message)
+
+    def update_window_title(self, *args):
+        title = "Weryfikator naliczeń"
+        if is_offline():
+            title += f" – tryb offline ({self.offline_manager.pending_count} zmian w kolejce)"
+        if getattr(self, "action_profiler", None) is not None and self.action_profiler.active:
+            title += (f" – profilowanie (pozostało akcji: {self.action_profiler.remaining}, "
+                      f"zapisane raporty: {self.action_profiler.reports})")
+        self.setWindowTitle(title)
+
+    def show_profiler_menu(self):
+        menu = QMenu(self)
+        if self.action_profiler.active:
+            menu.addAction("Zakończ profilowanie", self.action_profiler.stop)
+        else:
+            menu.addAction(f"Profiluj następne {self.profiled_actions} akcji",
+                           lambda: self.action_profiler.start(self.profiled_actions))
+            menu.addAction("Profiluj następne akcje...", self.ask_profiled_actions)
+        menu.addAction("Otwórz folder raportów", self.open_profile_folder)
+        menu.exec_(QCursor.pos())
+
+    def ask_profiled_actions(self):
+        actions, ok = QInputDialog.getInt(self, "Profilowanie", "Liczba akcji do sprofilowania:",
+                                          self.profiled_actions, 1, 100)
+        if ok:
+            self.action_profiler.start(actions)
+
+    def open_profile_folder(self):
+        os.makedirs(self.action_profiler.output_folder, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.abspath(self.action_profiler.output_folder)))
 
     def apply_tab_colors(self, tab_widget, colors):
         for i in range(tab_widget.count()):
@@ -0,0 +1,190 @@
+# action_profiler.py
+"""
+Profilowanie kolejnych akcji użytkownika na żądanie (ukryty skrót, bez instalowania narzędzi).
+
+Po włączeniu (MainApp: Ctrl+Shift+F12 - menu, Ctrl+Shift+P - przełącznik) każda z następnych N akcji
+- kliknięcie, klawisz, np. zmiana zakładki, zaznaczenia albo zapis - jest mierzona przez cProfile
+(wątek GUI) i tracemalloc. Akcja zaczyna się od zdarzenia myszy lub klawiatury, a kończy, gdy
+aplikacja przez ACTION_IDLE_MS nie dostaje kolejnych zdarzeń (klik = naciśnięcie + puszczenie).
+Dla każdej akcji powstaje w PROFILE_FOLDER raport tekstowy (najdroższe funkcje, miejsca alokacji
+pamięci, zmiana liczby obiektów Qt) i plik .prof (pstats, np. do snakeviz) - użytkownik może
+przesłać je bez dostępu do jego danych.
+"""
+
+import cProfile
+import gc
+import io
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from collections import Counter
+
+from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+PROFILE_FOLDER = "profile"
+PROFILED_ACTIONS = 5
+ACTION_IDLE_MS = 300
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+TOP_QT_CLASSES = 20
+_TRACEMALLOC_FRAMES = 10
+
+_USER_EVENTS = {
+    QEvent.MouseButtonPress: "klik",
+    QEvent.MouseButtonRelease: "klik",
+    QEvent.MouseButtonDblClick: "dwuklik",
+    QEvent.KeyPress: "klawisz",
+    QEvent.Wheel: "kółko myszy",
+}
+
+
+def qt_object_counts():
+    """Liczba żywych obiektów Qt (opakowań Pythona) według klasy."""
+    return Counter(type(obj).__name__ for obj in gc.get_objects() if isinstance(obj, QObject))
+
+
+def _snapshot():
+    # Bez alokacji samego profilowania.
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)
+    ] + [tracemalloc.Filter(False, __file__)])
+
+
+def _file_name(text):
+    return re.sub(r"[^\w.-]+", "_", text).strip("_")[:60]
+
+
+class ActionProfiler(QObject):
+    # liczba akcji pozostałych do sprofilowania (0 - profilowanie wyłączone)
+    remainingChanged = pyqtSignal(int)
+    # ścieżka zapisanego raportu
+    reportWritten = pyqtSignal(str)
+    # opis błędu zapisu raportu
+    reportFailed = pyqtSignal(str)
+
+    def __init__(self, output_folder=PROFILE_FOLDER, parent=None):
+        super().__init__(parent)
+        self.output_folder = output_folder
+        self.remaining = 0
+        self.reports = 0
+        self._installed = False
+        self._profile = None
+        self._action = None
+        self._started = None
+        self._before_snapshot = None
+        self._before_objects = None
+        self._idle = QTimer(self)
+        self._idle.setSingleShot(True)
+        self._idle.setInterval(ACTION_IDLE_MS)
+        self._idle.timeout.connect(self._finish_action)
+
+    @property
+    def active(self):
+        return self.remaining > 0
+
+    def start(self, actions=PROFILED_ACTIONS):
+        """Profiluje następne `actions` akcji użytkownika."""
+        if actions <= 0:
+            return self.stop()
+        if not self._installed:
+            QApplication.instance().installEventFilter(self)
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+            self._installed = True
+        self.remaining = actions
+        self.remainingChanged.emit(self.remaining)
+
+    def stop(self):
+        if self._action is not None:
+            self._finish_action()
+        if self._installed:
+            QApplication.instance().removeEventFilter(self)
+            tracemalloc.stop()
+            self._installed = False
+        self.remaining = 0
+        self.remainingChanged.emit(0)
+
+    def toggle(self, actions=PROFILED_ACTIONS):
+        if self.active:
+            self.stop()
+        else:
+            self.start(actions)
+
+    def eventFilter(self, obj, event):
+        kind = _USER_EVENTS.get(event.type())
+        if kind is not None and obj.isWidgetType():
+            if self._action is None:
+                self._start_action(f"{kind} {type(obj).__name__}")
+            self._idle.start()  # akcja trwa, dopóki przychodzą kolejne zdarzenia
+        return False
+
+    def _start_action(self, name):
+        self._action = name
+        self._before_objects = qt_object_counts()
+        self._before_snapshot = _snapshot()
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError:  # inny profiler już działa w tym wątku
+            self._profile = None
+
+    def _finish_action(self):
+        if self._action is None:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        after_snapshot = _snapshot()
+        # Bez czasu bezczynności, na który czekaliśmy przed zakończeniem akcji.
+        elapsed = time.perf_counter() - self._started - (ACTION_IDLE_MS / 1000 if not self._idle.isActive() else 0)
+        try:
+            path = self._write_report(self._action, max(elapsed, 0.0), after_snapshot)
+            self.reportWritten.emit(path)
+        except OSError as ex:
+            self.reportFailed.emit(str(ex))
+        self._action = None
+        self._profile = None
+        self._before_snapshot = self._before_objects = None
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.stop()
+        else:
+            self.remainingChanged.emit(self.remaining)
+
+    def _write_report(self, action, elapsed, after_snapshot):
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.reports += 1
+        base = os.path.join(self.output_folder,
+                            f"{time.strftime('%Y%m%d_%H%M%S')}_{self.reports:03d}_{_file_name(action)}")
+        lines = [f"Akcja: {action}", f"Czas (bez oczekiwania na koniec akcji): {elapsed * 1000:.1f} ms", ""]
+
+        if self._profile is not None:
+            self._profile.dump_stats(base + ".prof")
+            for sort_key, title in (("cumulative", "łączny czas z wywołaniami"), ("tottime", "czas własny")):
+                stream = io.StringIO()
+                pstats.Stats(self._profile, stream=stream).strip_dirs().sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+                lines += [f"=== Najdroższe funkcje ({title}) ===", stream.getvalue()]
+        else:
+            lines += ["(cProfile niedostępny - w tym wątku działa już inny profiler)", ""]
+
+        lines.append(f"=== Miejsca alokacji pamięci (przyrost, top {TOP_ALLOCATIONS}) ===")
+        for stat in after_snapshot.compare_to(self._before_snapshot, "lineno")[:TOP_ALLOCATIONS]:
+            lines.append(str(stat))
+        current, peak = tracemalloc.get_traced_memory()
+        lines += [f"Pamięć śledzona: {current / 1024:.0f} KiB (szczyt {peak / 1024:.0f} KiB)", ""]
+
+        lines.append(f"=== Obiekty Qt (zmiana liczby, top {TOP_QT_CLASSES}) ===")
+        objects = qt_object_counts()
+        changes = Counter(objects)
+        changes.subtract(self._before_objects)
+        changed = [(name, count) for name, count in changes.most_common() if count]
+        changed.sort(key=lambda item: abs(item[1]), reverse=True)
+        for name, count in changed[:TOP_QT_CLASSES]:
+            lines.append(f"{name:<30} {count:+6d} (teraz {objects[name]})")
+        lines.append(f"Razem obiektów Qt: {sum(objects.values())}, widżetów: {len(QApplication.allWidgets())}")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return base + ".txt"
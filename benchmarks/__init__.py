@@ -0,0 +1,2 @@
+# benchmarks
+"""Pomiary wydajności bez SQL Servera (baza zastępcza SQLite, Qt offscreen)."""
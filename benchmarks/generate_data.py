@@ -0,0 +1,85 @@
+# benchmarks/generate_data.py
+"""
+Syntetyczne definicje składników dla benchmarków (baza SQLite, sqlite_standin.py).
+
+    python -m benchmarks.generate_data --kodsl 10000 --plik dane_10k.db
+
+Rozkład wartości jest stały dla danego ziarna: ok. 40% 'tak', 30% 'nie', reszta bez wiersza,
+kilka procent wierszy z datami (nie należą do bieżących definicji, ale są w tabeli jak w migracji).
+"""
+
+import argparse
+import random
+import sqlite3
+
+from db_utils import ALL_EXPECTED_HEADERS
+from benchmarks.sqlite_standin import create_schema, create_version_triggers
+
+SIZES = (1000, 10000, 100000)
+DEFAULT_SEED = 1
+_INSERT_BATCH = 50000
+_VALUE_WEIGHTS = (("tak", 0.4), ("nie", 0.3), (None, 0.3))
+_DATED_SHARE = 0.05
+
+
+def kod_sl_name(index):
+    return f"SKL{index:06d}"
+
+
+def generate_rows(n_kodsl, seed=DEFAULT_SEED):
+    """Wiersze (KodSL, Parametr, Wartosc, Data_Od, Data_Do) - generator, stała pamięć."""
+    rnd = random.Random(seed)
+    values = [value for value, _ in _VALUE_WEIGHTS]
+    weights = [weight for _, weight in _VALUE_WEIGHTS]
+    for index in range(n_kodsl):
+        kod_sl = kod_sl_name(index)
+        for header in ALL_EXPECTED_HEADERS:
+            value = rnd.choices(values, weights)[0]
+            if value is None:
+                continue
+            yield kod_sl, header, value, None, None
+            if rnd.random() < _DATED_SHARE:
+                yield kod_sl, header, "nie", "2020-01-01", "2020-12-31"
+
+
+def create_database(path, n_kodsl, seed=DEFAULT_SEED, matrix_view=True):
+    """Tworzy (nadpisuje) bazę SQLite z n_kodsl składnikami; zwraca liczbę wierszy."""
+    connection = sqlite3.connect(path)
+    try:
+        create_schema(connection, matrix_view)
+        count = 0
+        batch = []
+        for row in generate_rows(n_kodsl, seed):
+            batch.append(row)
+            if len(batch) >= _INSERT_BATCH:
+                count += _insert(connection, batch)
+                batch = []
+        count += _insert(connection, batch)
+        create_version_triggers(connection)
+        connection.commit()
+        return count
+    finally:
+        connection.close()
+
+
+def _insert(connection, rows):
+    connection.executemany(
+        "INSERT INTO wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generuje syntetyczne definicje składników (SQLite).")
+    parser.add_argument("--kodsl", type=int, required=True, help="Liczba składników (KodSL).")
+    parser.add_argument("--plik", required=True, help="Plik bazy SQLite (nadpisywany).")
+    parser.add_argument("--ziarno", type=int, default=DEFAULT_SEED, help="Ziarno generatora.")
+    parser.add_argument("--bez-widoku", action="store_true", help="Bez widoku macierzy (odczyt z tabeli EAV).")
+    args = parser.parse_args(argv)
+    count = create_database(args.plik, args.kodsl, args.ziarno, matrix_view=not args.bez_widoku)
+    print(f"Zapisano {count} wierszy ({args.kodsl} KodSL) do {args.plik}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# benchmarks/gui_bench.py
+"""
+Pomiary widżetów definicji składników bez SQL Servera (QT_QPA_PLATFORM=offscreen, baza SQLite).
+
+    python -m benchmarks.gui_bench                                   # 1k, 10k i 100k KodSL
+    python -m benchmarks.gui_bench --rozmiary 1000 10000 --wyjscie wyniki.json --porownaj poprzednie.json
+
+Każdy rozmiar jest mierzony w osobnym procesie (szczytowe RSS dotyczy tylko tego rozmiaru):
+  - db_table_load_s      - DBTableWidget: utworzenie z load_data (cała macierz definicji),
+  - selection_change_ms  - DBTableWidget: zaznaczenie wiersza (update_row_colors), mediana,
+  - edit_save_ms         - DBTableWidget: zmiana komórki z zapisem w bazie, mediana,
+  - master_load_ms       - MasterListWidget.load_data (pierwsza strona KodSL),
+  - master_fetch_all_s   - doczytanie wszystkich stron listy Master (np. przy wyszukiwaniu),
+  - detail_load_ms       - DetailTableWidget.load_variant_data z odczytem z bazy, mediana,
+  - peak_rss_mb          - szczytowe zużycie pamięci procesu (null, gdy system go nie podaje).
+DBTableWidget buduje widżety dla całej macierzy (KodSL x parametry), więc powyżej --maks-tabela
+KodSL jego pomiary są pomijane (null w wynikach); proces, który przekroczy --limit-czasu, jest
+przerywany, a rozmiar dostaje pole "blad". Wyniki (z wersją kodu i środowiskiem) są zapisywane
+do pliku JSON; --porownaj pokazuje zmiany względem wcześniejszego pliku.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_data import DEFAULT_SEED, SIZES, create_database, kod_sl_name
+from benchmarks.widget_env import STYLES, fail_on_dialogs
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wyniki_gui.json")
+SAMPLES = 20
+MAX_TABLE_KODSL = 10000
+TIME_LIMIT_S = 1800
+RESULT_PREFIX = "WYNIK_BENCHMARKU "
+METRICS = [
+    "db_table_load_s", "selection_change_ms", "edit_save_ms", "master_load_ms",
+    "master_fetch_all_s", "detail_load_ms", "peak_rss_mb"
+]
+
+
+def _median_ms(timings):
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def _peak_rss_mb():
+    """Szczytowe zużycie pamięci procesu w MB albo None, gdy system go nie podaje."""
+    if sys.platform == "win32":
+        return _peak_working_set_mb()
+    try:
+        import resource  # tylko Unix
+    except ImportError:
+        return None
+    # ru_maxrss: KiB na Linuksie, bajty na macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _peak_working_set_mb():
+    """Windows: PeakWorkingSetSize z GetProcessMemoryInfo (psapi)."""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        get_info = ctypes.WinDLL("psapi").GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        current_process = ctypes.windll.kernel32.GetCurrentProcess
+        current_process.restype = wintypes.HANDLE
+        if not get_info(current_process(), ctypes.byref(counters), counters.cb):
+            return None
+    except (OSError, AttributeError):
+        return None
+    return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+
+
+def _measure_table(app, results, rnd, samples):
+    """DBTableWidget: wczytanie całej macierzy, zmiana zaznaczenia i edycja z zapisem."""
+    from DBTableWidget import DBTableWidget
+
+    started = time.perf_counter()
+    table = DBTableWidget(STYLES)
+    app.processEvents()
+    results["db_table_load_s"] = round(time.perf_counter() - started, 3)
+
+    rows = [rnd.randrange(table.rowCount()) for _ in range(samples)]
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        table.selectRow(row)
+        app.processEvents()
+        timings.append(time.perf_counter() - started)
+    results["selection_change_ms"] = _median_ms(timings)
+
+    timings = []
+    for row in rows:
+        combo_box = table.cellWidget(row, rnd.randrange(table.columnCount()))
+        new_value = "nie" if combo_box.currentText() == "tak" else "tak"
+        started = time.perf_counter()
+        combo_box.setCurrentText(new_value)
+        app.processEvents()
+        timings.append(time.perf_counter() - started)
+    results["edit_save_ms"] = _median_ms(timings)
+    table.deleteLater()
+    app.processEvents()
+
+
+def measure(db_path, n_kodsl, samples=SAMPLES, seed=DEFAULT_SEED, with_table=True):
+    """Mierzy widżety na bazie db_path (w bieżącym procesie); zwraca słownik METRICS."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    from benchmarks.sqlite_standin import install
+    install(db_path)
+    app = QApplication.instance() or QApplication([])
+    fail_on_dialogs()
+
+    from detail_table_widget import DetailTableWidget
+    from master_list_widget import MasterListWidget
+
+    rnd = random.Random(seed)
+    results = dict.fromkeys(METRICS)
+    if with_table:
+        _measure_table(app, results, rnd, samples)
+
+    started = time.perf_counter()
+    master = MasterListWidget(STYLES)
+    app.processEvents()
+    results["master_load_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    started = time.perf_counter()
+    master.source_model.fetch_all()
+    app.processEvents()
+    results["master_fetch_all_s"] = round(time.perf_counter() - started, 3)
+
+    detail = DetailTableWidget(STYLES)
+    timings = []
+    for _ in range(samples):
+        kod_sl = kod_sl_name(rnd.randrange(n_kodsl))
+        started = time.perf_counter()
+        detail.load_variant_data(kod_sl, force=True)
+        app.processEvents()
+        timings.append(time.perf_counter() - started)
+    results["detail_load_ms"] = _median_ms(timings)
+
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_size(n_kodsl, data_dir, matrix_view=True, samples=SAMPLES, max_table=MAX_TABLE_KODSL,
+             time_limit=TIME_LIMIT_S):
+    """Generuje dane i mierzy jeden rozmiar w osobnym procesie; błąd trafia do pola "blad"."""
+    db_path = os.path.join(data_dir, f"skladniki_{n_kodsl}.db")
+    create_database(db_path, n_kodsl, matrix_view=matrix_view)
+    command = [sys.executable, "-m", "benchmarks.gui_bench", "--pomiar", db_path, "--kodsl", str(n_kodsl),
+               "--probki", str(samples)]
+    if n_kodsl > max_table:
+        command.append("--bez-tabeli")
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=time_limit,
+                                   env=dict(os.environ, QT_QPA_PLATFORM="offscreen"))
+    except subprocess.TimeoutExpired:
+        return dict(dict.fromkeys(METRICS), blad=f"przekroczono limit czasu ({time_limit} s)")
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return dict(dict.fromkeys(METRICS), blad=completed.stderr.strip()[-2000:])
+
+
+def _cell(value):
+    return "-" if value is None else value
+
+
+def format_comparison(current, previous):
+    """Tabela zmian względem poprzedniego pliku wyników (wartość, poprzednia, zmiana %)."""
+    lines = []
+    for size, metrics in current["wyniki"].items():
+        before = previous.get("wyniki", {}).get(size, {})
+        lines.append(f"{size} KodSL:")
+        for metric in METRICS:
+            value = metrics.get(metric)
+            old = before.get(metric)
+            change = f"{(value - old) / old * 100:+.1f}%" if value is not None and old else "-"
+            lines.append(f"  {metric:<22} {_cell(value):>12} {_cell(old):>12} {change:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark widżetów definicji składników (offscreen, SQLite).")
+    parser.add_argument("--rozmiary", type=int, nargs="+", default=list(SIZES), help="Liczby KodSL do pomiaru.")
+    parser.add_argument("--wyjscie", default=DEFAULT_OUTPUT, help="Plik wyników JSON.")
+    parser.add_argument("--porownaj", help="Poprzedni plik wyników do porównania.")
+    parser.add_argument("--probki", type=int, default=SAMPLES, help="Liczba powtórzeń pomiarów medianowych.")
+    parser.add_argument("--bez-widoku", action="store_true", help="Bez widoku macierzy (odczyt z tabeli EAV).")
+    parser.add_argument("--maks-tabela", type=int, default=MAX_TABLE_KODSL,
+                        help="Powyżej tylu KodSL pomiary DBTableWidget są pomijane.")
+    parser.add_argument("--limit-czasu", type=int, default=TIME_LIMIT_S, help="Limit czasu pomiaru jednego rozmiaru (s).")
+    parser.add_argument("--bez-tabeli", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--pomiar", metavar="BAZA", help=argparse.SUPPRESS)  # proces potomny jednego rozmiaru
+    parser.add_argument("--kodsl", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.pomiar:
+        results = measure(args.pomiar, args.kodsl, args.probki, with_table=not args.bez_tabeli)
+        print(RESULT_PREFIX + json.dumps(results))
+        return 0
+
+    report = {
+        "wersja": _git_revision(),
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platforma": platform.platform(),
+        "widok_macierzy": not args.bez_widoku,
+        "maks_tabela": args.maks_tabela,
+        "wyniki": {},
+    }
+    with tempfile.TemporaryDirectory() as data_dir:
+        for n_kodsl in args.rozmiary:
+            print(f"Pomiar {n_kodsl} KodSL...")
+            report["wyniki"][str(n_kodsl)] = run_size(n_kodsl, data_dir, not args.bez_widoku, args.probki,
+                                                      args.maks_tabela, args.limit_czasu)
+            print(json.dumps(report["wyniki"][str(n_kodsl)]))
+
+    with open(args.wyjscie, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Wyniki zapisano do {args.wyjscie}.")
+    if args.porownaj:
+        with open(args.porownaj, encoding="utf-8") as f:
+            print(format_comparison(report, json.load(f)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# benchmarks/query_budget.py
+"""
+Budżety zapytań do bazy dla akcji użytkownika (offscreen, baza SQLite z sqlite_standin.py).
+
+    python -m benchmarks.query_budget              # kod wyjścia 1, gdy któraś akcja przekracza budżet
+    python -m benchmarks.query_budget --kodsl 2000
+
+Każda akcja jest wykonywana na prawdziwych widżetach, a db_recorder.QueryRecorder liczy
+połączenia, zapytania, wymiany z serwerem, wiersze i transakcje. Budżety (BUDGETS) są górnymi
+limitami wybranych liczników - „gadatliwa" zmiana (np. dodatkowe zapytanie przy każdym
+zaznaczeniu KodSL) kończy skrypt błędem, więc można go uruchamiać w CI obok gui_bench.py.
+Praca wątków w tle (prefetch sąsiadów w Detail) ma osobny budżet.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks.generate_data import create_database
+from benchmarks.widget_env import STYLES, fail_on_dialogs
+
+N_KODSL = 300
+TABLE_LOAD = "wczytanie tabeli definicji"
+TABLE_SELECTION = "zmiana zaznaczenia w tabeli definicji"
+TABLE_EDIT = "edycja komórki w tabeli definicji"
+COMPONENTS_OPEN = "otwarcie zakładki składników (strona listy Master i pierwszy KodSL)"
+KODSL_SELECTION = "zaznaczenie KodSL (odczyt z bazy)"
+KODSL_PREFETCH = "prefetch sąsiadów KodSL (w tle)"
+KODSL_SELECTION_CACHED = "ponowne zaznaczenie KodSL (z cache)"
+DETAIL_EDIT = "edycja komórki w tabeli Detail"
+
+# akcja -> {licznik QueryStats: największa dozwolona wartość}
+BUDGETS = {
+    TABLE_LOAD: {"connections": 1, "statements": 4, "transactions": 0},
+    TABLE_SELECTION: {"connections": 0, "statements": 0},
+    TABLE_EDIT: {"connections": 1, "statements": 4, "transactions": 1},
+    COMPONENTS_OPEN: {"connections": 2, "statements": 2, "transactions": 0},
+    KODSL_SELECTION: {"connections": 1, "statements": 1, "transactions": 0},
+    KODSL_PREFETCH: {"connections": 1, "statements": 1, "transactions": 0},
+    KODSL_SELECTION_CACHED: {"connections": 0, "statements": 0},
+    DETAIL_EDIT: {"connections": 1, "statements": 4, "transactions": 1},
+}
+
+
+def _run_actions(app, recorder):
+    """Wykonuje akcje z BUDGETS; zwraca {akcja: QueryStats jednego wykonania}."""
+    from DBTableWidget import DBTableWidget
+    from ComponentConfigWidget import ComponentConfigWidget
+
+    measured = {}
+
+    def run(name, action):
+        with recorder.action(name) as recorded:
+            action()
+            app.processEvents()
+        measured[name] = recorded.stats
+
+    tables = []
+    run(TABLE_LOAD, lambda: tables.append(DBTableWidget(STYLES)))
+    table = tables[0]
+    run(TABLE_SELECTION, lambda: table.selectRow(1))
+    combo_box = table.cellWidget(1, 0)
+    run(TABLE_EDIT, lambda: combo_box.setCurrentText("nie" if combo_box.currentText() == "tak" else "tak"))
+
+    components = []
+    run(COMPONENTS_OPEN, lambda: components.append(ComponentConfigWidget(STYLES)))
+    component = components[0]
+    master, detail = component.master_widget, component.detail_widget
+    detail._prefetch_pool.waitForDone()
+    app.processEvents()
+
+    background = recorder.unassigned.copy()
+    run(KODSL_SELECTION, lambda: master.selectRow(10))
+    detail._prefetch_pool.waitForDone()
+    app.processEvents()
+    measured[KODSL_PREFETCH] = recorder.unassigned - background
+
+    run(KODSL_SELECTION_CACHED, lambda: master.selectRow(11))  # sąsiad z prefetchu
+    detail._prefetch_pool.waitForDone()
+    app.processEvents()
+
+    row = next(row for row in range(detail.rowCount()) if detail.cellWidget(row, 1).currentText() == "tak")
+    run(DETAIL_EDIT, lambda: detail.cellWidget(row, 1).setCurrentText(""))
+    return measured
+
+
+def check_budgets(measured, budgets=BUDGETS):
+    """Zwraca listę przekroczeń: (akcja, licznik, zmierzono, budżet)."""
+    violations = []
+    for name, limits in budgets.items():
+        stats = measured[name]
+        for counter, limit in limits.items():
+            value = getattr(stats, counter)
+            if value > limit:
+                violations.append((name, counter, value, limit))
+    return violations
+
+
+def measure(db_path):
+    """Liczniki akcji z BUDGETS na bazie SQLite db_path (w bieżącym procesie)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    from benchmarks.sqlite_standin import install
+    from db_recorder import QueryRecorder
+
+    install(db_path)
+    app = QApplication.instance() or QApplication([])
+    fail_on_dialogs()
+    recorder = QueryRecorder()
+    recorder.install()
+    try:
+        return _run_actions(app, recorder)
+    finally:
+        recorder.uninstall()
+
+
+def format_results(measured, budgets=BUDGETS):
+    lines = []
+    for name, stats in measured.items():
+        limits = budgets.get(name, {})
+        lines.append(f"{name}:")
+        lines.append("  " + str(stats))
+        for counter, limit in limits.items():
+            value = getattr(stats, counter)
+            lines.append(f"  {counter:<13} {value:>4} / {limit:<4} {'OK' if value <= limit else 'PRZEKROCZONO'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Budżety zapytań do bazy dla akcji użytkownika (offscreen, SQLite).")
+    parser.add_argument("--kodsl", type=int, default=N_KODSL, help="Liczba KodSL w bazie testowej.")
+    parser.add_argument("--bez-widoku", action="store_true", help="Bez widoku macierzy (odczyt z tabeli EAV).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = os.path.join(data_dir, "budzet.db")
+        create_database(db_path, args.kodsl, matrix_view=not args.bez_widoku)
+        measured = measure(db_path)
+
+    print(format_results(measured))
+    violations = check_budgets(measured)
+    for name, counter, value, limit in violations:
+        print(f"PRZEKROCZONY BUDŻET: {name} - {counter} = {value} (limit {limit})")
+    if violations:
+        return 1
+    print("Wszystkie akcje mieszczą się w budżetach.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
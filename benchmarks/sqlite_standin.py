@@ -0,0 +1,166 @@
+# benchmarks/sqlite_standin.py
+"""
+Zastępcza baza SQLite dla wer_t_Skladniki_Parametry - pomiary widżetów bez SQL Servera.
+
+Połączenie naśladuje pyodbc w zakresie używanym przez aplikację (cursor/execute/executemany/
+fetch*/commit/rollback, błędy jako pyodbc.Error) i tłumaczy dialekt SQL Server z zapytań
+skladniki_db.py i schemat.py: TOP (?), prefiks dbo., literały N'...', podpowiedzi blokad,
+OBJECT_ID i COL_LENGTH. Kolumna WersjaWiersza (rowversion) jest emulowana wyzwalaczami.
+install() podmienia fabrykę połączeń db_utils (set_connection_factory), więc get_db_connection
+i pule połączeń otwierają tę bazę zamiast serwera z db_config.json.
+"""
+
+import re
+import sqlite3
+
+import pyodbc
+
+import db_utils
+from schemat import MATRIX_VIEW, VERSION_COLUMN, _matrix_view_sql
+
+_TOP = re.compile(r"SELECT\s+(DISTINCT\s+)?TOP\s*\((\?|\d+)\)", re.IGNORECASE)
+_UNICODE_LITERAL = re.compile(r"(?<![\w'])N'")
+_LOCK_HINT = re.compile(r"WITH\s*\(\s*UPDLOCK\s*,\s*HOLDLOCK\s*\)", re.IGNORECASE)
+_TABLE = "wer_t_Skladniki_Parametry"
+
+
+def translate(sql, params=()):
+    """Zapytanie SQL Server -> SQLite (tylko konstrukcje używane przez aplikację)."""
+    sql = sql.replace("dbo.", "")
+    sql = _LOCK_HINT.sub("", sql)
+    sql = _UNICODE_LITERAL.sub("'", sql)
+    match = _TOP.search(sql)
+    if match:
+        # TOP (n) -> LIMIT n na końcu; parametr TOP (?) jest pierwszy, więc przenosimy go na koniec.
+        sql = f"{sql[:match.start()]}SELECT {match.group(1) or ''}{sql[match.end():]} LIMIT {match.group(2)}"
+        if match.group(2) == "?":
+            params = list(params[1:]) + [params[0]]
+    return sql, params
+
+
+class StandInCursor:
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        try:
+            self._cursor.execute(*translate(sql, list(params)))
+        except sqlite3.Error as ex:
+            raise pyodbc.Error("HY000", str(ex))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        try:
+            self._cursor.executemany(translate(sql)[0], seq_of_params)
+        except sqlite3.Error as ex:
+            raise pyodbc.Error("HY000", str(ex))
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.create_function("OBJECT_ID", 2, self._object_id)
+        self._connection.create_function("COL_LENGTH", 2, self._col_length)
+
+    def _object_id(self, name, kind):
+        sqlite_type = {"U": "table", "V": "view"}.get(kind, "table")
+        row = self._connection.execute(
+            "SELECT rowid FROM sqlite_master WHERE name = ? AND type = ?",
+            (name.replace("dbo.", ""), sqlite_type)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _col_length(self, table, column):
+        columns = [row[1] for row in self._connection.execute(f"PRAGMA table_info({table.replace('dbo.', '')})")]
+        return 8 if column in columns else None
+
+    def cursor(self):
+        return StandInCursor(self._connection)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+def connect(path):
+    return StandInConnection(path)
+
+
+def install(path):
+    """Kieruje wszystkie połączenia aplikacji (db_utils.open_db_connection) do bazy SQLite path."""
+    db_utils.set_connection_factory(lambda db_config: connect(path))
+
+
+def create_schema(connection, matrix_view=True):
+    """
+    Tabela parametrów w układzie bazy migracyjnej z wersją schematu 3 (schemat.py):
+    filtrowany indeks, emulowana kolumna rowversion i opcjonalnie widok macierzy.
+    """
+    connection.executescript(f"""
+        DROP TABLE IF EXISTS {_TABLE};
+        CREATE TABLE {_TABLE} (
+            KodSL TEXT NOT NULL, Parametr TEXT NOT NULL, Wartosc TEXT,
+            Data_Od TEXT, Data_Do TEXT, {VERSION_COLUMN} INTEGER
+        );
+        CREATE INDEX IX_wer_t_Skladniki_Parametry_Biezace ON {_TABLE} (KodSL, Parametr)
+            WHERE Data_Od IS NULL AND Data_Do IS NULL;
+        CREATE TABLE wer_rowversion (Licznik INTEGER NOT NULL);
+        INSERT INTO wer_rowversion VALUES (0);
+    """)
+    if matrix_view:
+        connection.execute(translate(_matrix_view_sql())[0])
+    else:
+        connection.execute(f"DROP VIEW IF EXISTS {MATRIX_VIEW.replace('dbo.', '')}")
+
+
+def create_version_triggers(connection):
+    """rowversion: każdy INSERT/UPDATE dostaje kolejny numer z licznika bazy."""
+    connection.executescript(f"""
+        UPDATE wer_rowversion SET Licznik = (SELECT IFNULL(MAX(rowid), 0) FROM {_TABLE});
+        UPDATE {_TABLE} SET {VERSION_COLUMN} = rowid;
+        CREATE TRIGGER wer_rowversion_insert AFTER INSERT ON {_TABLE} BEGIN
+            UPDATE wer_rowversion SET Licznik = Licznik + 1;
+            UPDATE {_TABLE} SET {VERSION_COLUMN} = (SELECT Licznik FROM wer_rowversion) WHERE rowid = NEW.rowid;
+        END;
+        CREATE TRIGGER wer_rowversion_update AFTER UPDATE OF KodSL, Parametr, Wartosc ON {_TABLE} BEGIN
+            UPDATE wer_rowversion SET Licznik = Licznik + 1;
+            UPDATE {_TABLE} SET {VERSION_COLUMN} = (SELECT Licznik FROM wer_rowversion) WHERE rowid = NEW.rowid;
+        END;
+    """)
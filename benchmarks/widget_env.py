@@ -0,0 +1,19 @@
+# benchmarks/widget_env.py
+"""Wspólne ustawienia widżetów dla pomiarów offscreen (bez importów zależnych od systemu)."""
+
+STYLES = {
+    "table_bg": "#FFFFFF", "alternate_bg": "#F7F7F7", "row_highlight": "#DBEAFE",
+    "row_highlight_color": "#111827", "header_bg": "#F3F4F6", "header_color": "#111827",
+    "button_bg": "#F3F4F6", "button_border": "#D1D5DB", "button_text": "#111827", "button_hover": "#E5E7EB"
+}
+
+
+def fail_on_dialogs():
+    """Okno błędu w trybie offscreen zawiesiłoby pomiar - zamieniamy je na wyjątek."""
+    from PyQt5.QtWidgets import QMessageBox
+
+    def fail(parent, title, text, *args, **kwargs):
+        raise RuntimeError(f"{title}: {text}")
+    QMessageBox.critical = staticmethod(fail)
+    QMessageBox.warning = staticmethod(fail)
+    QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
@@ -0,0 +1,31 @@
+# conflict_dialog.py
+"""Rozwiązywanie konfliktów zapisu (ConflictError ze skladniki_db) - wspólne dla tabel definicji."""
+
+from PyQt5.QtWidgets import QMessageBox
+
+CONFLICT_OVERWRITE = "nadpisz"
+CONFLICT_RELOAD = "wczytaj"
+CONFLICT_CANCEL = "anuluj"
+
+
+def ask_conflict_resolution(parent, kod_sl_list):
+    """Pyta, co zrobić ze składnikami zmienionymi w międzyczasie przez innego użytkownika."""
+    box = QMessageBox(parent)
+    box.setIcon(QMessageBox.Warning)
+    box.setWindowTitle("Konflikt Zapisu")
+    box.setText("Inny użytkownik zmienił w międzyczasie składniki: " + ", ".join(kod_sl_list) + ".")
+    box.setInformativeText("Nadpisz - zapisz Twoje zmiany na wierzchu.\n"
+                           "Wczytaj ponownie - odrzuć Twoje zmiany i pokaż aktualne dane z bazy.")
+    overwrite_button = box.addButton("Nadpisz", QMessageBox.AcceptRole)
+    reload_button = box.addButton("Wczytaj ponownie", QMessageBox.ActionRole)
+    box.addButton("Anuluj", QMessageBox.RejectRole)
+    box.setDefaultButton(reload_button)
+    box.exec_()
+
+    clicked = box.clickedButton()
+    if clicked is overwrite_button:
+        return CONFLICT_OVERWRITE
+    if clicked is reload_button:
+        return CONFLICT_RELOAD
+    return CONFLICT_CANCEL
+
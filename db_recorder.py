@@ -0,0 +1,408 @@
+# db_recorder.py
+"""
+Instrumentacja wywołań bazy (bez zależności od Qt).
+
+Każde połączenie z db_utils.open_db_connection (czyli też get_db_connection i pule połączeń)
+może być opakowane przez obserwatorów (ConnectionObserver.install()). Opakowanie mierzy czas
+otwarcia połączenia, execute, fetch, commit i rollback, liczy wiersze i przekazuje błędy:
+  - QueryRecorder - liczniki (połączenia, zapytania, wymiany, wiersze, transakcje) łącznie
+    i w podziale na akcje użytkownika (benchmarks/query_budget.py),
+  - QueryLog      - ostatnie wywołania w buforze cyklicznym: percentyle czasów per rodzaj
+    zapytania i najwolniejsze zapytania (zakładka diagnostyki w MainApp).
+
+    recorder = QueryRecorder()
+    recorder.install()
+    with recorder.action("zaznaczenie KodSL"):
+        ...
+    print(recorder.actions["zaznaczenie KodSL"])
+    recorder.uninstall()
+"""
+
+import heapq
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import db_utils
+
+COUNTERS = ["connections", "statements", "round_trips", "rows_read", "rows_written", "commits", "rollbacks"]
+QUERY_LOG_SIZE = 5000
+
+CONNECT = "connect"
+EXECUTE = "execute"
+EXECUTEMANY = "executemany"
+COMMIT = "commit"
+ROLLBACK = "rollback"
+
+
+class ConnectionObserver:
+    """
+    Baza obserwatorów: install() opakowuje kolejne połączenia, a opakowanie wywołuje metody on_*.
+    on_execute może zwrócić obiekt zapytania - dostaje go potem on_fetch (odczyt wyników).
+    """
+
+    def install(self):
+        db_utils.add_connection_wrapper(self.wrap)
+
+    def uninstall(self):
+        db_utils.remove_connection_wrapper(self.wrap)
+
+    def wrap(self, connect):
+        started = time.perf_counter()
+        try:
+            conn = connect()
+        except Exception as ex:
+            self.on_connect(time.perf_counter() - started, ex)
+            raise
+        self.on_connect(time.perf_counter() - started, None)
+        return RecordingConnection(conn, self)
+
+    def on_connect(self, seconds, error):
+        pass
+
+    def on_execute(self, kind, sql, seconds, rows_written, error):
+        return None
+
+    def on_fetch(self, statement, rows, seconds):
+        pass
+
+    def on_end(self, kind, seconds, error):
+        """Koniec transakcji: kind to COMMIT albo ROLLBACK."""
+
+
+# -----------------------------------------------------
+# LICZNIKI AKCJI UŻYTKOWNIKA
+# -----------------------------------------------------
+
+class QueryStats:
+    """
+    Liczniki jednej akcji. round_trips to wymiany z serwerem: otwarcie połączenia, execute,
+    executemany (jedna paczka), commit i rollback; transakcja = commit.
+    """
+
+    def __init__(self):
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+    @property
+    def transactions(self):
+        return self.commits
+
+    def as_dict(self):
+        return {counter: getattr(self, counter) for counter in COUNTERS}
+
+    def __sub__(self, other):
+        difference = QueryStats()
+        for counter in COUNTERS:
+            setattr(difference, counter, getattr(self, counter) - getattr(other, counter))
+        return difference
+
+    def copy(self):
+        return self - QueryStats()
+
+    def __str__(self):
+        return (f"połączenia: {self.connections}, zapytania: {self.statements}, "
+                f"wymiany: {self.round_trips}, wiersze odczytane/zapisane: {self.rows_read}/{self.rows_written}, "
+                f"transakcje: {self.commits}, wycofania: {self.rollbacks}")
+
+
+class QueryRecorder(ConnectionObserver):
+    """
+    Liczniki wywołań (bezpieczne wątkowo). Zdarzenia są przypisywane akcji aktywnej w wątku,
+    który je wykonał; praca wątków w tle (np. prefetch Detail) bez własnej akcji trafia do `unassigned`.
+    """
+
+    def __init__(self):
+        self.totals = QueryStats()
+        self.unassigned = QueryStats()
+        self.actions = OrderedDict()  # nazwa akcji -> QueryStats (suma wszystkich wykonań)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def action(self, name):
+        """Kontekst akcji użytkownika: zdarzenia z bieżącego wątku liczą się do akcji name."""
+        return _Action(self, name)
+
+    def reset(self):
+        with self._lock:
+            self.totals = QueryStats()
+            self.unassigned = QueryStats()
+            self.actions.clear()
+
+    def on_connect(self, seconds, error):
+        self.record(connections=1, round_trips=1)
+
+    def on_execute(self, kind, sql, seconds, rows_written, error):
+        self.record(statements=1, round_trips=1, rows_written=rows_written)
+
+    def on_fetch(self, statement, rows, seconds):
+        self.record(rows_read=rows)
+
+    def on_end(self, kind, seconds, error):
+        if kind == COMMIT:
+            self.record(commits=1, round_trips=1)
+        else:
+            self.record(rollbacks=1, round_trips=1)
+
+    def record(self, **counts):
+        stack = getattr(self._local, "stack", None)
+        with self._lock:
+            targets = [self.totals] + ([self.actions[name] for name in stack] if stack else [self.unassigned])
+            for target in targets:
+                for counter, value in counts.items():
+                    setattr(target, counter, getattr(target, counter) + value)
+
+    def _enter(self, name):
+        with self._lock:
+            self.actions.setdefault(name, QueryStats())
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        self._local.stack.append(name)
+
+    def _exit(self):
+        self._local.stack.pop()
+
+
+class _Action:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.stats = None
+
+    def __enter__(self):
+        self.recorder._enter(self.name)
+        self._before = self.recorder.actions[self.name].copy()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder._exit()
+        # Liczniki tego jednego wykonania (actions[name] sumuje wszystkie).
+        self.stats = self.recorder.actions[self.name] - self._before
+        return False
+
+
+# -----------------------------------------------------
+# BUFOR OSTATNICH WYWOŁAŃ (DIAGNOSTYKA)
+# -----------------------------------------------------
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, ?\?)*\)", re.IGNORECASE)
+_REPEATED_GROUP = re.compile(r"(\([^()]*\))((?: ?(?:,|OR) ?\1)+)", re.IGNORECASE)
+
+
+def statement_type(sql):
+    """
+    Rodzaj zapytania: tekst bez zbędnych odstępów, z listami parametrów zwiniętymi do '…'
+    (IN z dowolną liczbą KodSL, wielowierszowe VALUES i warunki OR dla paczki zmian).
+    """
+    text = _WHITESPACE.sub(" ", sql).strip().replace("( ", "(").replace(" )", ")")
+    text = _IN_LIST.sub("IN (…)", text)
+    return _REPEATED_GROUP.sub(lambda match: f"{match.group(1)} …", text)
+
+
+class QueryEvent:
+    """
+    Jedno wywołanie: czas wykonania, czas i liczba wierszy odczytu wyników, błąd.
+    Zapamiętywany jest surowy tekst zapytania; rodzaj (statement_type) jest liczony dopiero przy odczycie.
+    """
+
+    __slots__ = ("timestamp", "kind", "sql", "seconds", "fetch_seconds", "rows", "error", "thread")
+
+    def __init__(self, kind, sql, seconds, rows=0, error=None):
+        self.timestamp = time.time()
+        self.kind = kind
+        self.sql = sql
+        self.seconds = seconds
+        self.fetch_seconds = 0.0
+        self.rows = rows
+        self.error = None if error is None else str(error)
+        self.thread = threading.current_thread().name
+
+    @property
+    def statement(self):
+        return statement_type(self.sql)
+
+    @property
+    def total_seconds(self):
+        return self.seconds + self.fetch_seconds
+
+
+def percentile(sorted_values, fraction):
+    """Percentyl (metoda najbliższej rangi) z posortowanej listy."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class QueryStatementSummary:
+    def __init__(self, statement, timings, rows, errors):
+        self.statement = statement
+        self.count = len(timings)
+        self.p50 = percentile(timings, 0.50)
+        self.p95 = percentile(timings, 0.95)
+        self.max = timings[-1]
+        self.rows = rows
+        self.errors = errors
+
+
+class QueryLog(ConnectionObserver):
+    """
+    Ostatnie `size` wywołań w buforze cyklicznym. Zapis to tylko dopisanie do deque (bezpieczne
+    wątkowo w CPython) zdarzenia z surowym tekstem zapytania, więc narzut przy zamkniętej zakładce
+    diagnostyki jest pomijalny; rodzaje zapytań i percentyle są liczone dopiero przy odczycie
+    (summary/slowest).
+    """
+
+    def __init__(self, size=QUERY_LOG_SIZE):
+        self.events = deque(maxlen=size)
+
+    def clear(self):
+        self.events.clear()
+
+    def on_connect(self, seconds, error):
+        self.events.append(QueryEvent(CONNECT, "(połączenie)", seconds, error=error))
+
+    def on_execute(self, kind, sql, seconds, rows_written, error):
+        event = QueryEvent(kind, sql, seconds, rows_written, error)
+        self.events.append(event)
+        return event
+
+    def on_fetch(self, statement, rows, seconds):
+        if statement is not None:
+            statement.rows += rows
+            statement.fetch_seconds += seconds
+
+    def on_end(self, kind, seconds, error):
+        self.events.append(QueryEvent(kind, f"({kind.upper()})", seconds, error=error))
+
+    def summary(self):
+        """Statystyki per rodzaj zapytania (QueryStatementSummary), od najwyższego p95."""
+        by_sql = {}
+        for event in list(self.events):
+            group = by_sql.setdefault(event.sql, [[], 0, 0])
+            group[0].append(event.total_seconds)
+            group[1] += event.rows
+            group[2] += event.error is not None
+        # Rodzaj zapytania raz na różny tekst, nie na każde wywołanie.
+        groups = {}
+        for sql, (timings, rows, errors) in by_sql.items():
+            group = groups.setdefault(statement_type(sql), [[], 0, 0])
+            group[0].extend(timings)
+            group[1] += rows
+            group[2] += errors
+        summaries = [QueryStatementSummary(statement, sorted(timings), rows, errors)
+                     for statement, (timings, rows, errors) in groups.items()]
+        summaries.sort(key=lambda summary: summary.p95, reverse=True)
+        return summaries
+
+    def slowest(self, limit=20):
+        return heapq.nlargest(limit, list(self.events), key=lambda event: event.total_seconds)
+
+
+# -----------------------------------------------------
+# OPAKOWANIA POŁĄCZENIA I KURSORA
+# -----------------------------------------------------
+
+class RecordingCursor:
+    """Kursor pyodbc z pomiarem wywołań; pozostałe atrybuty są przekazywane do oryginału."""
+
+    def __init__(self, cursor, observer):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_observer", observer)
+        object.__setattr__(self, "_statement", None)
+
+    def _run(self, kind, sql, call, *args):
+        started = time.perf_counter()
+        try:
+            call(sql, *args)
+        except Exception as ex:
+            object.__setattr__(self, "_statement",
+                               self._observer.on_execute(kind, sql, time.perf_counter() - started, 0, ex))
+            raise
+        seconds = time.perf_counter() - started
+        written = self._cursor.rowcount if self._cursor.description is None and self._cursor.rowcount > 0 else 0
+        object.__setattr__(self, "_statement", self._observer.on_execute(kind, sql, seconds, written, None))
+
+    def execute(self, sql, *params):
+        self._run(EXECUTE, sql, self._cursor.execute, *params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._run(EXECUTEMANY, sql, self._cursor.executemany, seq_of_params)
+
+    def _fetch(self, call, *args):
+        started = time.perf_counter()
+        rows = call(*args)
+        self._observer.on_fetch(self._statement, len(rows), time.perf_counter() - started)
+        return rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._observer.on_fetch(self._statement, 0 if row is None else 1, time.perf_counter() - started)
+        return row
+
+    def fetchval(self):
+        row = self.fetchone()
+        return None if row is None else row[0]
+
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        rows = 0
+        started = time.perf_counter()
+        try:
+            for row in self._cursor:
+                rows += 1
+                yield row
+        finally:
+            # Czas iteracji zawiera też pracę wywołującego między wierszami - to górne oszacowanie.
+            self._observer.on_fetch(self._statement, rows, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)  # np. fast_executemany
+
+
+class RecordingConnection:
+    """Połączenie pyodbc z pomiarem wywołań; pozostałe atrybuty są przekazywane do oryginału."""
+
+    def __init__(self, conn, observer):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_observer", observer)
+
+    def cursor(self):
+        return RecordingCursor(self._conn.cursor(), self._observer)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def _end(self, kind, call):
+        started = time.perf_counter()
+        try:
+            call()
+        except Exception as ex:
+            self._observer.on_end(kind, time.perf_counter() - started, ex)
+            raise
+        self._observer.on_end(kind, time.perf_counter() - started, None)
+
+    def commit(self):
+        self._end(COMMIT, self._conn.commit)
+
+    def rollback(self):
+        self._end(ROLLBACK, self._conn.rollback)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)  # np. autocommit
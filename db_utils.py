@@ -1,8 +1,10 @@
-
 import pyodbc
+import functools
 import json
 import os
-from PyQt5.QtWidgets import QMessageBox
+import queue
+import sys
+import threading
 
 CONFIG_FOLDER = "konfiguracje"
 CONFIG_FILE_NAME = os.path.join(CONFIG_FOLDER, "db_config.json")
@@ -24,47 +26,226 @@ HEADER_MAPPING = {
 }
 REVERSE_HEADER_MAPPING = {v: k for k, v in HEADER_MAPPING.items()}
 
-def load_db_config():
+
+def _print_error(title, message):
+    print(f"{title}: {message}", file=sys.stderr)
+
+
+# Moduł nie importuje PyQt (działa w trybie wsadowym, bez X).
+# GUI podmienia obsługę błędów na okna QMessageBox przez set_error_handler.
+_error_handler = _print_error
+
+
+def set_error_handler(handler):
+    """Ustawia funkcję handler(title, message) zgłaszającą błędy konfiguracji/połączenia."""
+    global _error_handler
+    _error_handler = handler or _print_error
+
+
+def report_error(title, message):
+    _error_handler(title, message)
+
+
+def load_db_config(config_file=CONFIG_FILE_NAME):
     """Wczytuje parametry połączenia z pliku JSON."""
     db_config = {
         "migration_server": "",
         "migration_db": "",
         "odbc_driver": "ODBC Driver 17 for SQL Server"
     }
-    if os.path.exists(CONFIG_FILE_NAME):
+    if os.path.exists(config_file):
         try:
-            with open(CONFIG_FILE_NAME, 'r') as f:
+            with open(config_file, 'r') as f:
                 db_config.update(json.load(f))
         except json.JSONDecodeError:
-            QMessageBox.critical(None, "Błąd Konfiguracji",
-                                 f"Błąd odczytu pliku {CONFIG_FILE_NAME}.")
+            report_error("Błąd Konfiguracji", f"Błąd odczytu pliku {config_file}.")
     else:
-        print(f"Brak pliku konfiguracji: {CONFIG_FILE_NAME}")
+        print(f"Brak pliku konfiguracji: {config_file}")
     return db_config
 
 
-def get_db_connection(db_config):
-    """Tworzy i zwraca połączenie pyodbc do SQL Server."""
+class DBConfigError(Exception):
+    """Brak serwera/bazy w konfiguracji połączenia."""
+
+
+def build_connection_string(db_config):
     server = db_config.get("migration_server")
     database = db_config.get("migration_db")
     driver = db_config.get("odbc_driver")
 
     if not server or not database:
-        QMessageBox.critical(None, "Błąd Połączenia",
-                             "Brak konfiguracji serwera/bazy danych.")
-        return None
+        raise DBConfigError("Brak konfiguracji serwera/bazy danych.")
 
-    connection_str = (
+    return (
         f"DRIVER={{{driver}}};"
         f"SERVER={server};"
         f"DATABASE={database};"
         f"Trusted_Connection=yes;"
         f"Pooling=no;"
     )
+
+
+def _pyodbc_connect(db_config):
+    return pyodbc.connect(build_connection_string(db_config), autocommit=False)
+
+
+# Wszystkie połączenia aplikacji powstają w open_db_connection. Fabrykę podmieniają benchmarki
+# (baza SQLite zamiast serwera), a opakowania dokłada instrumentacja zapytań (db_recorder.py).
+_connection_factory = _pyodbc_connect
+_connection_wrappers = []
+
+
+def set_connection_factory(factory):
+    """Ustawia funkcję factory(db_config) otwierającą połączenia (None - pyodbc.connect)."""
+    global _connection_factory
+    _connection_factory = factory or _pyodbc_connect
+
+
+def add_connection_wrapper(wrapper):
+    """
+    Dokłada opakowanie wrapper(connect) -> połączenie; connect() otwiera połączenie
+    (przez fabrykę i wcześniej dodane opakowania), więc wrapper może zmierzyć czas i błąd otwarcia.
+    """
+    _connection_wrappers.append(wrapper)
+
+
+def remove_connection_wrapper(wrapper):
+    if wrapper in _connection_wrappers:
+        _connection_wrappers.remove(wrapper)
+
+
+def open_db_connection(db_config):
+    """Otwiera połączenie pyodbc; błędy (DBConfigError, pyodbc.Error) są zgłaszane wyjątkiem."""
+    connect = functools.partial(_connection_factory, db_config)
+    for wrapper in _connection_wrappers:
+        connect = functools.partial(wrapper, connect)
+    return connect()
+
+
+def database_key(db_config):
+    """Klucz bazy docelowej (serwer, baza, fabryka połączeń) do zapamiętywania informacji o jej schemacie."""
+    return db_config.get("migration_server"), db_config.get("migration_db"), _connection_factory
+
+
+def get_db_connection(db_config, show_errors=True):
+    """
+    Tworzy i zwraca połączenie pyodbc do SQL Server.
+    show_errors=False wyłącza zgłaszanie błędów (wymagane poza wątkiem GUI).
+    """
     try:
-        return pyodbc.connect(connection_str, autocommit=False)
+        return open_db_connection(db_config)
+    except DBConfigError as ex:
+        if show_errors:
+            report_error("Błąd Połączenia", str(ex))
+        return None
     except pyodbc.Error as ex:
         sqlstate = ex.args[0]
-        QMessageBox.critical(None, "Błąd Połączenia SQL",
-                             f"Nie można nawiązać połączenia. SQL State: {sqlstate}")
-        return None
\ No newline at end of file
+        if show_errors:
+            report_error("Błąd Połączenia SQL", f"Nie można nawiązać połączenia. SQL State: {sqlstate}")
+        return None
+
+
+def is_connection_error(ex):
+    """Czy pyodbc.Error oznacza utratę połączenia (SQLSTATE 08xxx, przekroczony czas), a nie błąd zapytania."""
+    sqlstate = str(ex.args[0]) if ex.args else ""
+    return sqlstate.startswith("08") or sqlstate in ("HYT00", "HYT01")
+
+
+# -----------------------------------------------------
+# WIELE BAZ MIGRACYJNYCH I PULE POŁĄCZEŃ
+# -----------------------------------------------------
+
+def load_targets(db_config):
+    """
+    Zwraca listę konfiguracji baz docelowych. db_config może zawierać listę "migration_targets"
+    (każdy element: name, migration_server, migration_db, opcjonalnie odbc_driver i inne
+    ustawienia); bez niej jedynym celem jest para migration_server/migration_db.
+    Ustawienia wspólne są dziedziczone z głównej konfiguracji.
+    """
+    shared = {k: v for k, v in db_config.items() if k != "migration_targets"}
+    targets = []
+    for entry in db_config.get("migration_targets") or [shared]:
+        target = dict(shared)
+        target.update(entry)
+        target.setdefault("name", f"{target.get('migration_server')}/{target.get('migration_db')}")
+        targets.append(target)
+    return targets
+
+
+class ConnectionPool:
+    """
+    Pula połączeń do jednej bazy (bezpieczna wątkowo). Połączenia są otwierane leniwie,
+    najwyżej max_size naraz; po użyciu wracają do puli, po błędzie są zamykane.
+
+        with pool.connection() as conn:
+            ...
+    """
+
+    def __init__(self, db_config, max_size=4):
+        self.db_config = db_config
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def connection(self):
+        return _PooledConnection(self)
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return open_db_connection(self.db_config)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken):
+        try:
+            if broken:
+                try:
+                    conn.close()
+                except pyodbc.Error:
+                    pass
+            else:
+                conn.rollback()  # niezatwierdzone zmiany nie przechodzą do następnego użytkownika
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _PooledConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool._acquire()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool._release(self.conn, broken=exc_type is not None)
+        return False
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_config, max_size=4):
+    """Zwraca współdzieloną pulę dla danej bazy (jedna pula na parę serwer/baza)."""
+    key = build_connection_string(db_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_config, max_size)
+        return pool
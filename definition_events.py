@@ -0,0 +1,31 @@
+# definition_events.py
+"""
+Powiadomienia o zapisach definicji składników między widżetami.
+
+Każda ścieżka zapisu (tabela definicji, Detail, kolejka offline) zgłasza KodSL, których definicje
+mogły się zmienić - także po nieudanym zapisie, bo stanu bazy nie da się wtedy przewidzieć.
+Odbiorcy (np. cache parametrów Detail) unieważniają swoje kopie tych KodSL.
+"""
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class DefinitionEvents(QObject):
+    # (nadawca, lista KodSL) - nadawca pozwala pominąć własne zapisy
+    changed = pyqtSignal(object, list)
+
+
+_events = None
+
+
+def definition_events():
+    global _events
+    if _events is None:
+        _events = DefinitionEvents()
+    return _events
+
+
+def notify_definitions_changed(sender, kod_sl_list):
+    kod_sl_list = list(kod_sl_list)
+    if kod_sl_list:
+        definition_events().changed.emit(sender, kod_sl_list)
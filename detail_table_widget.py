@@ -1,13 +1,23 @@
 # detail_table_widget.py (Wersja z poprawnym filtrowaniem)
 
 import pyodbc
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QComboBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtGui import QColor, QWheelEvent
 from db_utils import load_db_config, get_db_connection, ALL_EXPECTED_HEADERS, HEADER_MAPPING, REVERSE_HEADER_MAPPING
+from conflict_dialog import CONFLICT_OVERWRITE, CONFLICT_RELOAD, ask_conflict_resolution
+from definition_events import definition_events, notify_definitions_changed
+from job_scheduler import PRIORITY_INTERACTIVE, PRIORITY_NORMAL
+from kontrola_definicji import findings_by_cell, lint_definitions
+from offline_manager import (
+    handle_connection_error, is_offline, offline_manager, queue_offline_changes, run_db_job
+)
+from skladniki_db import ConflictError, apply_parameter_changes, fetch_variant_snapshot, fetch_version_tokens
+
+DETAIL_CACHE_SIZE = 256
 
 
 class NoScrollComboBox(QComboBox):
@@ -18,6 +28,80 @@ class NoScrollComboBox(QComboBox):
         event.ignore()
 
 
+class VariantParametersCache:
+    """
+    Ograniczony cache LRU: KodSL -> parametry (OrderedDict).
+    Przechowuje i wydaje kopie, żeby edycja w tabeli nie zmieniała wpisu w cache.
+    generation rośnie przy każdym unieważnieniu - odczyt w tle rozpoczęty wcześniej
+    mógł pobrać dane sprzed zapisu i nie powinien trafić do cache.
+    """
+
+    def __init__(self, max_size=DETAIL_CACHE_SIZE):
+        self.max_size = max_size
+        self.generation = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, kod_sl):
+        return kod_sl in self._entries
+
+    def get(self, kod_sl):
+        params = self._entries.get(kod_sl)
+        if params is None:
+            return None
+        self._entries.move_to_end(kod_sl)
+        return OrderedDict(params)
+
+    def put(self, kod_sl, params):
+        self._entries[kod_sl] = OrderedDict(params)
+        self._entries.move_to_end(kod_sl)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, kod_sl):
+        self._entries.pop(kod_sl, None)
+        self.generation += 1
+
+
+class _PrefetchSignals(QObject):
+    loaded = pyqtSignal(object, object)
+
+
+class _PrefetchTask(QRunnable):
+    """Pobiera w tle parametry kilku KodSL jednym zapytaniem (bez okien błędów)."""
+
+    def __init__(self, db_config, kod_sl_list, generation):
+        super().__init__()
+        self.db_config = db_config
+        self.kod_sl_list = kod_sl_list
+        self.generation = generation
+        self.signals = _PrefetchSignals()
+
+    def run(self):
+        conn = get_db_connection(self.db_config, show_errors=False)
+        if not conn:
+            self.signals.loaded.emit({}, None)
+            return
+        try:
+            result, versions = fetch_variant_snapshot(conn, self.kod_sl_list)
+        except pyodbc.Error:
+            result, versions = {}, None
+        finally:
+            conn.close()
+        self.signals.loaded.emit(result, versions)
+
+
+class _PendingSave:
+    """Zapis Detail czekający w kolejce: zmienione parametry jednego KodSL."""
+
+    def __init__(self, variant_name, params, changes, on_done):
+        self.variant_name = variant_name
+        self.params = OrderedDict(params)
+        self.changes = list(changes)
+        self.on_done = on_done
+        # Użytkownik kazał nadpisać zmiany innego użytkownika (zapis z aktualnym tokenem wersji)
+        self.overwritten = False
+
+
 class DetailTableWidget(QTableWidget):
     """
     Tabela Detail: Wyświetla parametry dla JEDNEGO KodSL jako lista (wiersze),
@@ -31,6 +115,24 @@ class DetailTableWidget(QTableWidget):
         self.reverse_header_mapping = REVERSE_HEADER_MAPPING
         self.data_before_conversion = OrderedDict()
         self.current_kod_sl = None
+        self.display_headers = []
+
+        # Cache LRU parametrów + pobieranie w tle sąsiadów z listy Master
+        self.variant_cache = VariantParametersCache(self.db_config.get("detail_cache_size", DETAIL_CACHE_SIZE))
+        self._prefetch_pool = QThreadPool(self)
+        self._prefetch_pool.setMaxThreadCount(1)
+        self._prefetch_in_flight = set()
+        self._prefetch_tasks = set()
+        # Tokeny wersji KodSL z chwili odczytu (wykrywanie zmian innych użytkowników przy zapisie)
+        self.variant_versions = {}
+        # Odczyt wyświetlanego KodSL idzie w tle - wynik starszego żądania (zmiana zaznaczenia
+        # w międzyczasie) nie nadpisuje widoku. Zapisy idą po kolei, jeden w toku: token wersji
+        # następnego zapisu jest brany dopiero po zakończeniu poprzedniego.
+        self._load_request = 0
+        self._pending_saves = deque()
+        self._save_in_flight = None
+        # Uwagi kontroli definicji bieżącego KodSL: {Parametr: komunikaty}
+        self.lint_cells = {}
 
         self.setSelectionBehavior(QTableWidget.SelectItems)
         self.setSelectionMode(QTableWidget.NoSelection)
@@ -53,8 +155,10 @@ class DetailTableWidget(QTableWidget):
 
         self.init_table_structure()
 
-    def get_db_connection(self):
-        return get_db_connection(self.db_config)
+        manager = offline_manager()
+        if manager is not None:
+            manager.replayed.connect(self._on_offline_replayed)
+        definition_events().changed.connect(self._on_definitions_changed)
 
     def init_table_structure(self):
         """Konfiguruje stałe nagłówki kolumn tabeli (Parametr | Wartość)."""
@@ -69,6 +173,7 @@ class DetailTableWidget(QTableWidget):
         """Wyczyść wszystkie wiersze i widżety."""
         self.setRowCount(0)
         self.clearContents()
+        self.lint_cells = {}
 
     def auto_resize_columns(self):
         header = self.horizontalHeader()
@@ -76,41 +181,30 @@ class DetailTableWidget(QTableWidget):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
 
-    def load_variant_data(self, kod_sl):
+    def load_variant_data(self, kod_sl, force=False):
         """SLOT: Ładuje, filtruje i wyświetla dane dla JEDNEGO wariantu (KodSL).
 
         Parametry są wyświetlane TYLKO, jeśli ich wartość w bazie to 'tak'.
+        force=True wymusza ponowny odczyt z bazy (z pominięciem cache).
         """
-        if kod_sl == self.current_kod_sl:
+        if kod_sl == self.current_kod_sl and not force:
             return
+        if force:
+            self.variant_cache.invalidate(kod_sl)
 
         self.clear_table()
         self.current_kod_sl = kod_sl
+        self._load_request += 1
 
-        conn = self.get_db_connection()
-        if not conn:
-            return
-
-        # POBIERANIE DANYCH Z BAZY
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT Parametr, Wartosc 
-                FROM wer_t_Skladniki_Parametry 
-                WHERE KodSL = ? AND Data_Od IS NULL AND Data_Do IS NULL 
-                ORDER BY Parametr
-            """, (kod_sl,))
-            rows = cursor.fetchall()
-            conn.close()
-        except pyodbc.Error as ex:
-            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu danych dla {kod_sl}: {ex}")
-            conn.close()
+        new_params = self.variant_cache.get(kod_sl)
+        if new_params is None:
+            self.data_before_conversion = OrderedDict()
+            self._fetch_variant(kod_sl)
             return
+        self._show_variant(kod_sl, new_params)
 
-        new_params = OrderedDict()
-        for Parametr, Wartosc in rows:
-            new_params[Parametr] = str(Wartosc).lower()
-
+    def _show_variant(self, kod_sl, new_params):
+        """Wyświetla parametry KodSL (filtrowane do wartości 'tak') i oznacza uwagi kontroli."""
         # --- ZMIENIONA LOGIKA FILTROWANIA PARAMETRÓW ---
         # Usuwamy warunek 'wartosc == ""', aby wyświetlać TYLKO te, które mają 'tak'.
 
@@ -132,8 +226,93 @@ class DetailTableWidget(QTableWidget):
 
         # Wypełnienie widżetu QTableWidget (TYLKO tymi filtrowanymi)
         self._fill_table_widgets(kod_sl, self.display_headers)
+        self._run_lint()
         self.update_row_colors()
 
+    def _fetch_variant(self, kod_sl):
+        """Pobiera parametry i token wersji jednego KodSL (w MainApp w tle, z priorytetem interaktywnym)."""
+        request = self._load_request
+        generation = self.variant_cache.generation
+        run_db_job(self.db_config, "Odczyt parametrów składnika",
+                   lambda conn: fetch_variant_snapshot(conn, [kod_sl]), PRIORITY_INTERACTIVE,
+                   on_result=lambda result: self._on_variant_fetched(kod_sl, request, generation, *result),
+                   on_error=lambda ex: self._on_variant_fetch_failed(kod_sl, request, ex))
+
+    def _on_variant_fetched(self, kod_sl, request, generation, params, versions):
+        if request == self._load_request:
+            self.variant_cache.put(kod_sl, params[kod_sl])
+            self._store_versions(versions)
+            self._show_variant(kod_sl, OrderedDict(params[kod_sl]))
+        elif generation == self.variant_cache.generation and kod_sl not in self.variant_cache:
+            # Zaznaczenie zmieniło się w trakcie odczytu - wynik trafia tylko do cache (jak prefetch).
+            self.variant_cache.put(kod_sl, params[kod_sl])
+            self._store_versions(versions)
+
+    def _on_variant_fetch_failed(self, kod_sl, request, ex):
+        if request != self._load_request:
+            return
+        if ex is None or (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            if is_offline():
+                new_params = offline_manager().local_parameters(kod_sl)
+                self.variant_cache.put(kod_sl, new_params)
+                self._show_variant(kod_sl, OrderedDict(new_params))
+                return
+        else:
+            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu danych dla {kod_sl}: {ex}")
+        self.current_kod_sl = None
+
+    def prefetch_variants(self, kod_sl_list):
+        """
+        SLOT: Pobiera w tle parametry podanych KodSL (np. sąsiadów zaznaczenia na liście Master),
+        żeby nawigacja klawiaturą trafiała w cache.
+        """
+        if is_offline():
+            return
+        missing = [kod_sl for kod_sl in kod_sl_list
+                   if kod_sl and kod_sl not in self.variant_cache and kod_sl not in self._prefetch_in_flight]
+        if not missing:
+            return
+
+        self._prefetch_in_flight.update(missing)
+        task = _PrefetchTask(self.db_config, missing, self.variant_cache.generation)
+        task.signals.loaded.connect(
+            lambda result, versions, task=task: self._on_prefetch_loaded(task, result, versions)
+        )
+        self._prefetch_tasks.add(task)
+        self._prefetch_pool.start(task)
+
+    def _on_prefetch_loaded(self, task, result, versions):
+        self._prefetch_tasks.discard(task)
+        self._prefetch_in_flight.difference_update(task.kod_sl_list)
+        if task.generation != self.variant_cache.generation:
+            return  # w trakcie odczytu unieważniono wpisy cache (zapis) - wynik może być nieaktualny
+        for kod_sl, params in result.items():
+            # Nie nadpisujemy wpisu, który w międzyczasie został zapisany/wczytany na wierzchu.
+            if kod_sl not in self.variant_cache:
+                self.variant_cache.put(kod_sl, params)
+                if versions is not None:
+                    self.variant_versions[kod_sl] = versions[kod_sl]
+
+    def _on_offline_replayed(self, kod_sl_list):
+        """Zmiany z kolejki offline trafiły do bazy - cache i tokeny tych KodSL są nieaktualne."""
+        self.invalidate_variants(kod_sl_list)
+
+    def _on_definitions_changed(self, sender, kod_sl_list):
+        if sender is not self:
+            self.invalidate_variants(kod_sl_list)
+
+    def invalidate_variants(self, kod_sl_list):
+        """Usuwa z cache parametry i tokeny wersji KodSL; wyświetlany KodSL jest wczytywany ponownie."""
+        for kod_sl in kod_sl_list:
+            self.variant_cache.invalidate(kod_sl)
+            self.variant_versions.pop(kod_sl, None)
+        if self.current_kod_sl in kod_sl_list:
+            self.load_variant_data(self.current_kod_sl, force=True)
+
+    def _store_versions(self, versions):
+        if versions is not None:
+            self.variant_versions.update(versions)
+
     def _fill_table_widgets(self, kod_sl, headers):
         """Wypełnia wiersze Parametrami i ComboBoxami Wartości."""
 
@@ -141,28 +320,67 @@ class DetailTableWidget(QTableWidget):
         variant_data = self.data_before_conversion.get(kod_sl, {})
 
         for r, key in enumerate(headers):
-            # A. KOLUMNA 0: NAZWA PARAMETRU (Tekst statyczny)
-            display_name = HEADER_MAPPING.get(key, key)
-            item_param = QTableWidgetItem(display_name)
-            item_param.setFlags(item_param.flags() & ~Qt.ItemIsEditable)
-            self.setItem(r, 0, item_param)
-
-            # B. KOLUMNA 1: WARTOŚĆ (ComboBox)
-            value = variant_data.get(key, "")
-            combo_box = NoScrollComboBox(self)
-            combo_box.addItems(["tak", "nie", ""])
-            combo_box.setCurrentText(str(value))
-
-            self.style_combo_box_by_text(combo_box, str(value), row_bg=self._get_row_color(r))
-            self.setCellWidget(r, 1, combo_box)
-
-            combo_box.currentTextChanged.connect(
-                lambda text, row=r, db_key=key: self.combo_box_modified(row, 1, text, db_key)
-            )
-
-            item_value = QTableWidgetItem(str(value))
-            item_value.setFlags(item_value.flags() & ~Qt.ItemIsEditable)
-            self.setItem(r, 1, item_value)
+            self._fill_row(r, key, variant_data.get(key, ""))
+
+    def _fill_row(self, r, key, value):
+        """Wypełnia jeden wiersz: nazwa parametru + ComboBox wartości."""
+        # A. KOLUMNA 0: NAZWA PARAMETRU (Tekst statyczny)
+        display_name = HEADER_MAPPING.get(key, key)
+        item_param = QTableWidgetItem(display_name)
+        item_param.setFlags(item_param.flags() & ~Qt.ItemIsEditable)
+        self.setItem(r, 0, item_param)
+
+        # B. KOLUMNA 1: WARTOŚĆ (ComboBox)
+        combo_box = NoScrollComboBox(self)
+        combo_box.addItems(["tak", "nie", ""])
+        combo_box.setCurrentText(str(value))
+        self._mark_lint(item_param, combo_box, self.lint_cells.get(key, ""))
+
+        self.style_combo_box_by_text(combo_box, str(value), row_bg=self._get_row_color(r))
+        self.setCellWidget(r, 1, combo_box)
+
+        # Wiersz wyznaczamy po kluczu w chwili zmiany - po ukryciu wiersza 'nie' indeksy się przesuwają.
+        combo_box.currentTextChanged.connect(
+            lambda text, db_key=key: self.combo_box_modified(self.display_headers.index(db_key), 1, text, db_key)
+        )
+
+        item_value = QTableWidgetItem(str(value))
+        item_value.setFlags(item_value.flags() & ~Qt.ItemIsEditable)
+        self.setItem(r, 1, item_value)
+
+    # -----------------------------------------------------
+    # KONTROLA DEFINICJI (oznaczenia w wierszach)
+    # -----------------------------------------------------
+
+    def _mark_lint(self, item_param, combo_box, text):
+        combo_box.setProperty("lint", bool(text))
+        combo_box.setToolTip(text)
+        item_param.setToolTip(text)
+
+    def _run_lint(self):
+        """
+        Kontrola definicji bieżącego KodSL po wczytaniu i każdej zmianie: oznacza widoczne wiersze,
+        a uwagi do parametrów niewyświetlanych ('nie', puste, nieznane klucze) pokazuje nagłówek Wartość.
+        """
+        variant_data = self.data_before_conversion.get(self.current_kod_sl)
+        findings = []
+        if variant_data is not None:
+            findings = lint_definitions({self.current_kod_sl: variant_data},
+                                        self.db_config.get("definition_lint_exemptions"))
+        cells = {parametr: "\n".join(messages) for (_, parametr), messages in findings_by_cell(findings).items()}
+        for r, key in enumerate(self.display_headers):
+            if cells.get(key) != self.lint_cells.get(key) and self.cellWidget(r, 1) is not None:
+                self._mark_lint(self.item(r, 0), self.cellWidget(r, 1), cells.get(key, ""))
+                self.style_combo_box_by_text(self.cellWidget(r, 1), self.cellWidget(r, 1).currentText(),
+                                             self._get_row_color(r))
+        self.lint_cells = cells
+
+        hidden = [f"{' '.join(HEADER_MAPPING.get(key, key).split())}: {text}"
+                  for key, text in cells.items() if key not in self.display_headers]
+        header = self.horizontalHeaderItem(1)
+        if header is not None:
+            header.setText("Wartość ⚠" if hidden else "Wartość")
+            header.setToolTip("\n".join(hidden))
 
     def _get_row_color(self, row):
         """Zwraca kolor tła dla wiersza."""
@@ -176,6 +394,8 @@ class DetailTableWidget(QTableWidget):
         COLOR_NIE_BG = "#FDF0F0"
         COLOR_NIE_TEXT = "#B85C5C"
         COLOR_DEFAULT_TEXT = "#000000"
+        COLOR_LINT_BORDER = "#D93025"
+        border = f"2px solid {COLOR_LINT_BORDER}" if combo_box.property("lint") else "none"
 
         if text.lower() == "tak":
             bg = COLOR_TAK_BG
@@ -191,7 +411,7 @@ class DetailTableWidget(QTableWidget):
             QComboBox {{
                 background-color: {bg};
                 color: {fg};
-                border: none;
+                border: {border};
                 padding: 6px 4px;
                 text-align: center;
             }}
@@ -212,63 +432,146 @@ class DetailTableWidget(QTableWidget):
                 self.style_combo_box_by_text(widget, widget.currentText(), bg_color_hex)
 
     def combo_box_modified(self, row, col, text, db_key):
-        """Obsługa zmiany wartości w ComboBox i aktualizacja modelu/DB."""
+        """
+        Obsługa zmiany wartości w ComboBox i aktualizacja modelu/DB.
+        Zmiana jest optymistyczna: model i widok są aktualizowane lokalnie (wiersz 'nie'
+        od razu znika), a przy nieudanym zapisie przywracane - bez ponownego odczytu z bazy.
+        """
 
         normalized_text = text.strip().lower()
 
-        # 1. Aktualizacja stylu i modelu wewnętrznego
-        self.style_combo_box_by_text(self.cellWidget(row, col), normalized_text, self._get_row_color(row))
-
         variant = self.current_kod_sl
         header_key = db_key
+        variant_data = self.data_before_conversion.get(variant)
+        if variant_data is None:
+            return
+        previous_value = variant_data.get(header_key, "")
 
-        if variant in self.data_before_conversion:
-            self.data_before_conversion[variant][header_key] = normalized_text
+        # 1. Aktualizacja stylu i modelu wewnętrznego
+        self.style_combo_box_by_text(self.cellWidget(row, col), normalized_text, self._get_row_color(row))
+        variant_data[header_key] = normalized_text
 
         if self.item(row, col):
             self.item(row, col).setText(normalized_text)
 
-        # 2. Zapis do bazy
-        self.save_single_variant(variant)
+        # 2. UKRYWANIE WIERSZA, JEŚLI WARTOŚĆ ZMIENIONA NA 'nie'
+        row_hidden = normalized_text == 'nie'
+        if row_hidden:
+            self._remove_display_row(row)
+        self._run_lint()
 
-        # 3. UKRYWANIE WIERSZA, JEŚLI WARTOŚĆ ZMIENIONA NA 'nie'
-        if normalized_text == 'nie':
-            self.load_variant_data(self.current_kod_sl)
+        # 3. Zapis do bazy tylko tej komórki; przy błędzie wycofujemy tylko tę zmianę
+        def saved_or_reverted(saved):
+            if not saved:
+                self._revert_value(variant, header_key, previous_value, normalized_text)
 
-    def save_single_variant(self, variant_name):
-        """Zapisuje zmiany tylko dla jednego, podanego wariantu (KodSL)."""
-        conn = self.get_db_connection()
-        if not conn:
-            return
-
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                DELETE FROM dbo.wer_t_Skladniki_Parametry 
-                WHERE KodSL = ? AND Data_Od IS NULL AND Data_Do IS NULL
-            """, (variant_name,))
-
-            insert_query = """
-                INSERT INTO dbo.wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
-                VALUES (?, ?, ?, NULL, NULL)
-            """
-            batch_data = []
-            params = self.data_before_conversion.get(variant_name, {})
+        self.save_single_variant(variant, [header_key], on_done=saved_or_reverted)
 
-            for Parametr, Wartosc in params.items():
-                normalized_value = str(Wartosc).strip().lower()
-
-                if normalized_value == 'tak' or normalized_value == 'nie':
-                    batch_data.append((variant_name, Parametr, normalized_value))
+    def _revert_value(self, variant, header_key, previous_value, written_value):
+        """
+        Wycofuje nieudany zapis jednej wartości - o ile KodSL jest nadal wyświetlany, a wartości nie
+        zmieniono w międzyczasie. Widok jest budowany ponownie z modelu (bez odczytu z bazy).
+        """
+        variant_data = self.data_before_conversion.get(variant)
+        if variant != self.current_kod_sl or variant_data is None or variant_data.get(header_key, "") != written_value:
+            return
+        variant_data[header_key] = previous_value
+        self.clear_table()
+        self._show_variant(variant, variant_data)
 
-            if batch_data:
-                cursor.executemany(insert_query, batch_data)
+    def _remove_display_row(self, row):
+        """Usuwa jeden wiersz z widoku; kolory odświeżane są tylko dla wierszy poniżej."""
+        del self.display_headers[row]
+        self.removeRow(row)
+        self._restyle_rows_from(row)
 
-            conn.commit()
-            print(f"Sukces zapisu wariantu {variant_name} do bazy.")
+    def _restyle_rows_from(self, first_row):
+        for r in range(first_row, self.rowCount()):
+            widget = self.cellWidget(r, 1)
+            if widget and isinstance(widget, QComboBox):
+                self.style_combo_box_by_text(widget, widget.currentText(), self._get_row_color(r))
 
-        except pyodbc.Error as ex:
-            conn.rollback()
+    def save_single_variant(self, variant_name, parameters=None, on_done=None):
+        """
+        Zapisuje zmiany jednego wariantu (KodSL) - tylko parametry z listy parameters
+        (None - wszystkie), z kontrolą wersji KodSL. Zapis idzie w MainApp w tle;
+        on_done(zapisano) jest wołane w wątku GUI po jego zakończeniu.
+        """
+        params = self.data_before_conversion.get(variant_name, {})
+        changes = [(variant_name, parametr, params.get(parametr, ""))
+                   for parametr in (params if parameters is None else parameters)]
+        # Kolejne wejście na KodSL pokazuje zmianę od razu, jeszcze przed końcem zapisu.
+        self.variant_cache.put(variant_name, params)
+        self._pending_saves.append(_PendingSave(variant_name, params, changes, on_done))
+        self._dispatch_save()
+
+    def _dispatch_save(self):
+        """Wysyła następny zapis z kolejki, jeśli żaden nie jest w toku."""
+        if self._save_in_flight is not None or not self._pending_saves:
+            return
+        save = self._save_in_flight = self._pending_saves.popleft()
+        variant_name = save.variant_name
+        expected = None
+        if variant_name in self.variant_versions:
+            expected = {variant_name: self.variant_versions[variant_name]}
+
+        def work(conn):
+            versions = expected
+            if save.overwritten and versions is not None:
+                versions = fetch_version_tokens(conn, [variant_name])
+            return apply_parameter_changes(conn, save.changes, expected_versions=versions)
+
+        run_db_job(self.db_config, "Zapis parametrów składnika", work, PRIORITY_NORMAL,
+                   on_result=lambda new_versions: self._on_save_done(save, new_versions),
+                   on_error=lambda ex: self._on_save_failed(save, ex))
+
+    def _on_save_done(self, save, new_versions):
+        self._store_versions(new_versions)
+        self._finish_save(save, True)
+        if save.overwritten:
+            # Pozostałe parametry nadpisanego KodSL mogą zawierać zmiany innego użytkownika.
+            self.invalidate_variants([save.variant_name])
+
+    def _on_save_failed(self, save, ex):
+        """
+        Konflikt rozstrzyga użytkownik: Nadpisz ponawia zapis z aktualnym tokenem, Wczytaj ponownie
+        pokazuje stan z bazy (po wycofaniu zmiany w on_done). Utrata połączenia - kolejka offline.
+        """
+        reload = False
+        if isinstance(ex, ConflictError):
+            choice = ask_conflict_resolution(self, ex.kod_sl_list)
+            if choice == CONFLICT_OVERWRITE:
+                save.overwritten = True
+                self._save_in_flight = None
+                self._pending_saves.appendleft(save)
+                self._dispatch_save()
+                return
+            reload = choice == CONFLICT_RELOAD
+            saved = False
+        elif ex is None or (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            saved = self._queue_offline(save.variant_name, save.params, save.changes)
+        else:
             QMessageBox.critical(self, "Błąd Zapisu", f"Błąd podczas zapisu do bazy danych: {ex}")
-        finally:
-            conn.close()
\ No newline at end of file
+            saved = False
+        if not saved:
+            self.variant_cache.invalidate(save.variant_name)
+        self._finish_save(save, saved)
+        if reload:
+            self.invalidate_variants([save.variant_name])
+
+    def _finish_save(self, save, saved):
+        self._save_in_flight = None
+        notify_definitions_changed(self, [save.variant_name])
+        if save.on_done is not None:
+            save.on_done(saved)
+        self._dispatch_save()
+
+    def _queue_offline(self, variant_name, params, changes):
+        """Offline: zmiana trafia do kolejki (odtworzonej po powrocie serwera) i do cache."""
+        versions = None
+        if variant_name in self.variant_versions:
+            versions = {variant_name: self.variant_versions[variant_name]}
+        if not queue_offline_changes(changes, versions=versions):
+            return False
+        self.variant_cache.put(variant_name, params)
+        return True
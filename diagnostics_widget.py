@@ -0,0 +1,103 @@
+# diagnostics_widget.py
+"""
+Zakładka diagnostyki: czasy wywołań bazy z bufora db_recorder.QueryLog.
+
+Górna tabela - rodzaje zapytań z liczbą wywołań i percentylami czasu (execute + odczyt wyników),
+dolna - najwolniejsze z ostatnich wywołań. Statystyki są liczone tylko wtedy, gdy zakładka jest
+widoczna (odświeżanie co REFRESH_INTERVAL_MS); przy zamkniętej zakładce koszt to wyłącznie
+dopisywanie wywołań do bufora.
+"""
+
+import time
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QVBoxLayout, QWidget
+)
+
+REFRESH_INTERVAL_MS = 1000
+SLOWEST_LIMIT = 20
+SUMMARY_HEADERS = ["Zapytanie", "Liczba", "p50 [ms]", "p95 [ms]", "Maks. [ms]", "Wiersze", "Błędy"]
+SLOWEST_HEADERS = ["Czas", "Wątek", "Czas [ms]", "Odczyt [ms]", "Wiersze", "Zapytanie", "Błąd"]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f}"
+
+
+class DiagnosticsWidget(QWidget):
+    def __init__(self, query_log, parent=None):
+        super().__init__(parent)
+        self.query_log = query_log
+
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        layout.addWidget(QLabel("Czasy wywołań według rodzaju zapytania"))
+        self.summary_table = self._create_table(SUMMARY_HEADERS)
+        layout.addWidget(self.summary_table, 3)
+
+        layout.addWidget(QLabel(f"Najwolniejsze z ostatnich wywołań (do {SLOWEST_LIMIT})"))
+        self.slowest_table = self._create_table(SLOWEST_HEADERS)
+        layout.addWidget(self.slowest_table, 2)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        clear_btn = QPushButton("Wyczyść")
+        clear_btn.clicked.connect(self.clear)
+        btn_layout.addWidget(clear_btn)
+        layout.addLayout(btn_layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def _create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(headers.index("Zapytanie"), QHeaderView.Stretch)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def clear(self):
+        self.query_log.clear()
+        self.refresh()
+
+    def refresh(self):
+        summaries = self.query_log.summary()
+        self.status_label.setText(
+            f"Wywołania w buforze: {len(self.query_log.events)} (ostatnie {self.query_log.events.maxlen})"
+        )
+        self._fill(self.summary_table, [
+            [summary.statement, summary.count, _ms(summary.p50), _ms(summary.p95), _ms(summary.max),
+             summary.rows, summary.errors]
+            for summary in summaries
+        ])
+        self._fill(self.slowest_table, [
+            [time.strftime("%H:%M:%S", time.localtime(event.timestamp)), event.thread, _ms(event.seconds),
+             _ms(event.fetch_seconds), event.rows, event.statement, event.error or ""]
+            for event in self.query_log.slowest(SLOWEST_LIMIT)
+        ])
+
+    def _fill(self, table, rows):
+        table.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                item.setToolTip(str(value))
+                table.setItem(r, c, item)
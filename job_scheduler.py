@@ -0,0 +1,226 @@
+# job_scheduler.py
+"""
+Zadania w tle dla GUI: ograniczona pula wątków, priorytety i anulowanie kooperatywne.
+
+JobScheduler (jeden, należy do MainApp) uruchamia funkcje fn(token, progress) w puli
+job_workers wątków (db_config.json, domyślnie JOB_WORKERS). Kolejka jest uporządkowana
+priorytetem: odczyty na żądanie użytkownika (PRIORITY_INTERACTIVE) wyprzedzają zapisy
+(PRIORITY_NORMAL), a te - weryfikacje (PRIORITY_BATCH). Zadania wsadowe nie zajmują nigdy
+ostatniego wolnego wątku, więc interaktywne nie czekają na koniec weryfikacji.
+
+fn sprawdza token (token.raise_if_cancelled()) i zgłasza postęp progress(zrobione, razem, opis);
+razem = 0 oznacza nieznaną liczbę kroków. Wynik, błąd i anulowanie trafiają do wątku GUI
+sygnałami zadania (Job.signals) i callbackami z submit(). JobStatusBar pokazuje postęp w pasku stanu.
+"""
+
+import heapq
+import itertools
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QLabel, QProgressBar, QPushButton, QStatusBar
+
+PRIORITY_INTERACTIVE = 2
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 0
+JOB_WORKERS = 2
+
+
+class JobCancelled(Exception):
+    """Zadanie przerwane na żądanie użytkownika (zgłaszane przez CancellationToken)."""
+
+
+class CancellationToken:
+    """Flaga anulowania sprawdzana przez zadanie w bezpiecznych miejscach (bez zabijania wątku)."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class _JobSignals(QObject):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+class Job(QRunnable):
+    def __init__(self, name, fn, priority=PRIORITY_NORMAL):
+        super().__init__()
+        self.setAutoDelete(False)  # obiekt żyje w schedulerze do końca zadania
+        self.name = name
+        self.fn = fn
+        self.priority = priority
+        self.token = CancellationToken()
+        self.signals = _JobSignals()
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.signals.progress.connect(self._store_progress)
+
+    def _store_progress(self, done, total, message):
+        self.done, self.total, self.message = done, total, message
+
+    def report_progress(self, done, total=0, message=""):
+        self.signals.progress.emit(done, total, message)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def run(self):
+        if self.token.cancelled:
+            self.signals.cancelled.emit()
+            return
+        try:
+            result = self.fn(self.token, self.report_progress)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as ex:
+            self.signals.failed.emit(ex)
+        else:
+            self.signals.finished.emit(result)
+
+
+class JobScheduler(QObject):
+    # lista zadań (uruchomionych lub oczekujących) się zmieniła
+    jobsChanged = pyqtSignal()
+    # postęp jednego z zadań (Job)
+    jobProgress = pyqtSignal(object)
+
+    def __init__(self, max_workers=JOB_WORKERS, parent=None):
+        super().__init__(parent)
+        self.max_workers = max(1, max_workers)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.max_workers)
+        self._pending = []  # kopiec (-priorytet, kolejność, Job)
+        self._running = []
+        self._order = itertools.count()
+
+    @property
+    def jobs(self):
+        """Zadania uruchomione, potem oczekujące (w kolejności uruchamiania)."""
+        return list(self._running) + [job for _, _, job in sorted(self._pending)]
+
+    def submit(self, name, fn, priority=PRIORITY_NORMAL, on_result=None, on_error=None, on_cancelled=None):
+        """Dodaje zadanie fn(token, progress); callbacki są wywoływane w wątku GUI. Zwraca Job."""
+        job = Job(name, fn, priority)
+        job.signals.progress.connect(lambda *args: self.jobProgress.emit(job))
+        for signal, callback in ((job.signals.finished, on_result), (job.signals.failed, on_error),
+                                 (job.signals.cancelled, on_cancelled)):
+            signal.connect(lambda *args, job=job: self._on_job_done(job))
+            if callback is not None:
+                signal.connect(callback)
+        heapq.heappush(self._pending, (-priority, next(self._order), job))
+        self._dispatch()
+        self.jobsChanged.emit()
+        return job
+
+    def cancel(self, job):
+        """Anuluje zadanie: oczekujące od razu, uruchomione przy najbliższym sprawdzeniu tokenu."""
+        job.cancel()
+        for index, (_, _, pending) in enumerate(self._pending):
+            if pending is job:
+                self._pending.pop(index)
+                heapq.heapify(self._pending)
+                job.signals.cancelled.emit()
+                break
+
+    def cancel_all(self):
+        for job in self.jobs:
+            self.cancel(job)
+
+    def shutdown(self):
+        """Anuluje wszystkie zadania i czeka na zakończenie uruchomionych (zamykanie aplikacji)."""
+        self.cancel_all()
+        self._pool.waitForDone()
+
+    def _dispatch(self):
+        while self._pending and len(self._running) < self.max_workers:
+            priority = -self._pending[0][0]
+            batch_running = sum(1 for job in self._running if job.priority <= PRIORITY_BATCH)
+            if priority <= PRIORITY_BATCH and batch_running >= max(self.max_workers - 1, 1):
+                break  # ostatni wolny wątek zostaje dla zadań interaktywnych
+            job = heapq.heappop(self._pending)[2]
+            self._running.append(job)
+            self._pool.start(job)
+
+    def _on_job_done(self, job):
+        if job in self._running:
+            self._running.remove(job)
+        self._dispatch()
+        self.jobsChanged.emit()
+
+
+class JobStatusBar(QStatusBar):
+    """Pasek stanu: pierwsze z uruchomionych zadań z postępem, liczba pozostałych i przycisk Anuluj."""
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.current_job = None
+        self.label = QLabel()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(250)
+        self.cancel_button = QPushButton("Anuluj")
+        self.cancel_button.clicked.connect(self._cancel_current)
+        self.addPermanentWidget(self.label)
+        self.addPermanentWidget(self.progress_bar)
+        self.addPermanentWidget(self.cancel_button)
+        scheduler.jobsChanged.connect(self.refresh)
+        scheduler.jobProgress.connect(self._on_progress)
+        self.refresh()
+
+    def refresh(self):
+        jobs = self.scheduler.jobs
+        self.current_job = jobs[0] if jobs else None
+        for widget in (self.label, self.progress_bar, self.cancel_button):
+            widget.setVisible(self.current_job is not None)
+        if self.current_job is not None:
+            self._show(self.current_job, len(jobs) - 1)
+
+    def _on_progress(self, job):
+        if job is self.current_job:
+            self._show(job, len(self.scheduler.jobs) - 1)
+
+    def _show(self, job, others):
+        text = f"{job.name}: {job.message}" if job.message else job.name
+        if others:
+            text += f" (+{others} w kolejce)"
+        self.label.setText(text)
+        if job.total > 0:
+            self.progress_bar.setRange(0, job.total)
+            self.progress_bar.setValue(min(job.done, job.total))
+        else:
+            self.progress_bar.setRange(0, 0)  # nieznana liczba kroków - pasek „w toku”
+
+    def _cancel_current(self):
+        if self.current_job is not None:
+            self.scheduler.cancel(self.current_job)
+
+
+# -----------------------------------------------------
+# SCHEDULER APLIKACJI (ustawiany przez MainApp)
+# -----------------------------------------------------
+
+_scheduler = None
+
+
+def set_job_scheduler(scheduler):
+    global _scheduler
+    _scheduler = scheduler
+
+
+def job_scheduler():
+    """Scheduler aplikacji albo None (widżety poza MainApp, np. w benchmarkach, działają jak dotąd)."""
+    return _scheduler
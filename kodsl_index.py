@@ -0,0 +1,89 @@
+# kodsl_index.py
+
+import heapq
+from array import array
+from bisect import bisect_left
+
+# Przesunięcie (offset) w nazwie zapisujemy w dolnych 8 bitach wpisu tablicy sufiksów.
+_OFFSET_BITS = 8
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+_MAX_NAME_LEN = _OFFSET_MASK
+_SENTINEL = "\uffff"
+
+
+class KodSLSearchIndex:
+    """
+    Indeks wyszukiwania KodSL (bez zależności od Qt).
+
+    Przechowuje posortowaną tablicę sufiksów wszystkich nazw. Każde wyszukiwanie
+    podciągu to dwa wyszukiwania binarne + odczyt zakresu, więc koszt nie zależy
+    od liczby składników, tylko od liczby trafień.
+    Wpisy są liczbami (wiersz << 8 | offset) w array('Q'), żeby indeks dla
+    100k składników zajmował kilka MB zamiast setek tysięcy krotek.
+    """
+
+    def __init__(self, names=None):
+        self._names = []
+        self._suffixes = array('Q')
+        self._prefix_order = array('Q')
+        if names:
+            self.add(names)
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def normalize(text):
+        return (text or "").strip().upper()
+
+    def _suffix_key(self, entry):
+        return self._names[entry >> _OFFSET_BITS][entry & _OFFSET_MASK:]
+
+    def _name_key(self, row):
+        return self._names[row]
+
+    def clear(self):
+        self._names = []
+        self._suffixes = array('Q')
+        self._prefix_order = array('Q')
+
+    def add(self, names):
+        """
+        Dopisuje kolejne nazwy (np. następną stronę listy) bez przebudowy indeksu:
+        sortowane są tylko nowe wpisy, a potem scalane liniowo z istniejącymi.
+        Numery wierszy odpowiadają kolejności dopisywania.
+        """
+        first_row = len(self._names)
+        self._names.extend(self.normalize(name)[:_MAX_NAME_LEN] for name in names)
+        new_rows = range(first_row, len(self._names))
+        if not new_rows:
+            return
+
+        new_suffixes = sorted(
+            ((row << _OFFSET_BITS) | offset
+             for row in new_rows for offset in range(len(self._names[row]))),
+            key=self._suffix_key
+        )
+        new_prefix_order = sorted(new_rows, key=self._name_key)
+
+        self._suffixes = array('Q', heapq.merge(self._suffixes, new_suffixes, key=self._suffix_key))
+        self._prefix_order = array('Q', heapq.merge(self._prefix_order, new_prefix_order, key=self._name_key))
+
+    def _range(self, entries, key, text):
+        lo = bisect_left(entries, text, key=key)
+        hi = bisect_left(entries, text + _SENTINEL, lo=lo, key=key)
+        return entries[lo:hi]
+
+    def prefix_rows(self, text):
+        """Zwraca wiersze, których nazwa zaczyna się od text, w kolejności alfabetycznej."""
+        text = self.normalize(text)
+        if not text:
+            return list(range(len(self._names)))
+        return list(self._range(self._prefix_order, self._name_key, text))
+
+    def substring_rows(self, text):
+        """Zwraca zbiór wierszy, których nazwa zawiera text (bez rozróżniania wielkości liter)."""
+        text = self.normalize(text)
+        if not text:
+            return set(range(len(self._names)))
+        return {entry >> _OFFSET_BITS for entry in self._range(self._suffixes, self._suffix_key, text)}
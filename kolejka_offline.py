@@ -0,0 +1,180 @@
+# kolejka_offline.py
+"""
+Trwała kolejka zmian wykonanych bez połączenia z serwerem i lokalna kopia definicji
+(bez zależności od Qt).
+
+Każda zmiana to jedna linia JSON dopisywana do pliku (flush + fsync), więc po awarii
+aplikacji kolejka zostaje na dysku. Pierwszy rekord KodSL w kolejce niesie token wersji,
+na którym oparto zmianę (pole "Wersja"). Po powrocie serwera cała kolejka jest odtwarzana
+jedną transakcją (apply_parameter_changes) z kontrolą tych tokenów - zmiany innych
+użytkowników z czasu pracy offline nie są po cichu nadpisywane - a z pliku usuwane są
+tylko odtworzone linie.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from db_utils import CONFIG_FOLDER
+from skladniki_db import apply_parameter_changes
+
+OFFLINE_QUEUE_FILE = os.path.join(CONFIG_FOLDER, "kolejka_offline.jsonl")
+SNAPSHOT_FILE = os.path.join(CONFIG_FOLDER, "migawka_definicji.json")
+
+OP_CHANGE = "zmiana"
+OP_DELETE = "usuniecie"
+
+
+def change_record(kod_sl, parametr, wartosc):
+    return {"op": OP_CHANGE, "KodSL": kod_sl, "Parametr": parametr, "Wartosc": wartosc}
+
+
+def delete_record(kod_sl):
+    return {"op": OP_DELETE, "KodSL": kod_sl}
+
+
+def encode_version(token):
+    """Token wersji (rowversion, liczba wierszy) -> wartość JSON (rowversion jako tekst szesnastkowy)."""
+    version, count = token
+    if isinstance(version, (bytes, bytearray)):
+        version = {"rowversion": bytes(version).hex()}
+    return [version, count]
+
+
+def decode_version(value):
+    version, count = value
+    if isinstance(version, dict):
+        version = bytes.fromhex(version["rowversion"])
+    return version, count
+
+
+def queued_versions(records):
+    """{KodSL: token wersji} z pierwszego rekordu każdego KodSL, który ma token."""
+    versions = OrderedDict()
+    for record in records:
+        if "Wersja" in record and record["KodSL"] not in versions:
+            versions[record["KodSL"]] = decode_version(record["Wersja"])
+    return versions
+
+
+class OfflineQueue:
+    """Kolejka zmian w pliku JSONL (bezpieczna wątkowo: GUI dopisuje, wątek w tle odtwarza)."""
+
+    def __init__(self, path=OFFLINE_QUEUE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, records):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self):
+        with self._lock:
+            return self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Niedopisana ostatnia linia (awaria w trakcie zapisu) - pomijamy.
+                    continue
+        return records
+
+    def drop(self, count):
+        """Usuwa z początku kolejki count odtworzonych rekordów (dopisane w międzyczasie zostają)."""
+        with self._lock:
+            self._rewrite(self._read()[count:])
+
+    def discard(self, kod_sl_list):
+        """Usuwa z kolejki wszystkie rekordy podanych KodSL (zmiany odrzucone przez użytkownika)."""
+        kod_sl_set = set(kod_sl_list)
+        with self._lock:
+            self._rewrite([record for record in self._read() if record["KodSL"] not in kod_sl_set])
+
+    def _rewrite(self, remaining):
+        if not remaining:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in remaining:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def __len__(self):
+        return len(self.read())
+
+
+def fold_records(records):
+    """
+    Zwija kolejkę do (changes, deleted_variants) dla apply_parameter_changes: usunięcie KodSL
+    unieważnia jego wcześniejsze zmiany, a późniejsze zmiany są stosowane po usunięciu.
+    """
+    changes = OrderedDict()
+    deleted = OrderedDict()
+    for record in records:
+        kod_sl = record["KodSL"]
+        if record["op"] == OP_DELETE:
+            for key in [key for key in changes if key[0] == kod_sl]:
+                del changes[key]
+            deleted[kod_sl] = True
+        else:
+            changes[(kod_sl, record["Parametr"])] = record["Wartosc"]
+    return [(kod_sl, parametr, wartosc) for (kod_sl, parametr), wartosc in changes.items()], list(deleted)
+
+
+def replay_queue(conn, queue, overwrite=()):
+    """
+    Odtwarza całą kolejkę jedną transakcją z kontrolą wersji KodSL, dla których kolejka ma token
+    (KodSL bez tokenu, np. edytowane na lokalnej kopii od startu aplikacji, są zapisywane bez kontroli).
+    ConflictError - nic nie jest zapisywane, a kolejka zostaje; overwrite - KodSL, które użytkownik
+    kazał nadpisać. Zwraca listę KodSL, których dotyczyła kolejka.
+    """
+    records = queue.read()
+    if not records:
+        return []
+    changes, deleted = fold_records(records)
+    expected = {kod_sl: token for kod_sl, token in queued_versions(records).items() if kod_sl not in overwrite}
+    apply_parameter_changes(conn, changes, deleted, expected_versions=expected or None)
+    queue.drop(len(records))
+    return list(OrderedDict.fromkeys(record["KodSL"] for record in records))
+
+
+def apply_records(definitions, records):
+    """Nakłada kolejkę na lokalną kopię {KodSL: {Parametr: Wartosc}} (w miejscu)."""
+    for record in records:
+        if record["op"] == OP_DELETE:
+            definitions.pop(record["KodSL"], None)
+        else:
+            definitions.setdefault(record["KodSL"], OrderedDict())[record["Parametr"]] = record["Wartosc"]
+    return definitions
+
+
+def save_snapshot(definitions, path=SNAPSHOT_FILE):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(definitions, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    if not os.path.exists(path):
+        return OrderedDict()
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f, object_pairs_hook=OrderedDict)
+    except json.JSONDecodeError:
+        return OrderedDict()
@@ -0,0 +1,393 @@
+# kolejka_shardow.py
+"""
+Weryfikacja podzielona na części (shardy) liczone na kilku stanowiskach (bez zależności od Qt).
+
+Kolejka to plik SQLite na wspólnym dysku: plan_shards dzieli źródło na okresy x zakresy
+pracowników i zapisuje w kolejce identyfikator przebiegu oraz migawkę definicji, więc wszystkie
+części są sprawdzane tymi samymi definicjami. Każde stanowisko uruchamia run_worker
+(weryfikator_cli.py pracuj): pobiera wolną część (BEGIN IMMEDIATE - jedna część trafia do jednego
+procesu), weryfikuje ją i zapisuje rozbieżności przez ResultsSink ze wspólnym IdPrzebiegu - wyniki
+wszystkich stanowisk tworzą jeden przebieg w dbo.wer_t_Wyniki_Weryfikacji. Stanowiska łączą się
+według własnego db_config.json; kolejka zapamiętuje tylko serwer i bazę, żeby wykryć pomyłkę.
+
+W trakcie pracy wątek pulsu co heartbeat_s odświeża znacznik czasu części. Część bez pulsu
+dłużej niż timeout_s (np. stanowisko wyłączone) wraca do kolejki i przejmuje ją inny proces;
+rozbieżności części są zbierane w pamięci (część jest mała) i zapisywane dopiero po jej sprawdzeniu:
+usunięcie wyników poprzedniej próby i wstawienie nowych to jedna transakcja SQL Server, zatwierdzana
+wewnątrz transakcji kolejki, która sprawdza token części i oznacza ją jako gotową. Proces, który
+stracił część (inny ją przejął), przerywa ją przy najbliższym sprawdzeniu, a jeśli zdążył ją
+policzyć - wycofuje zapis, więc wiersze części nie trafiają do przebiegu dwa razy. Zegary stanowisk powinny być zsynchronizowane
+z dokładnością dużo lepszą niż timeout_s. Część, która nie powiodła się MAX_ATTEMPTS razy, ma stan
+"blad" i wymaga sprawdzenia (postep pokazuje komunikat błędu).
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from db_utils import open_db_connection
+from weryfikacja import VerificationStats, fetch_source_values, run_verification
+from wyniki_db import ResultsSinkError, has_results_table, register_run, replace_results
+
+EMPLOYEES_PER_SHARD = 2000
+HEARTBEAT_S = 10
+SHARD_TIMEOUT_S = 120
+IDLE_WAIT_S = 5
+MAX_ATTEMPTS = 3
+CANCEL_CHECK_ROWS = 1000
+
+STATE_PENDING = "oczekuje"
+STATE_RUNNING = "w_toku"
+STATE_DONE = "gotowy"
+STATE_FAILED = "blad"
+STATES = [STATE_PENDING, STATE_RUNNING, STATE_DONE, STATE_FAILED]
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (klucz TEXT PRIMARY KEY, wartosc TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS shardy (
+        id INTEGER PRIMARY KEY,
+        okres NOT NULL,  -- bez typu: wartości zostają w typie ze źródła (liczba albo tekst)
+        pracownik_od,
+        pracownik_do,
+        stan TEXT NOT NULL DEFAULT 'oczekuje',
+        proces TEXT,
+        token TEXT,
+        puls REAL,
+        proby INTEGER NOT NULL DEFAULT 0,
+        sprawdzono INTEGER,
+        rozbieznosci INTEGER,
+        sekundy REAL,
+        blad TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ix_shardy_stan ON shardy (stan, id);
+"""
+
+
+class ShardQueueError(Exception):
+    """Błąd kolejki części (np. brak pliku, kolejka już zaplanowana)."""
+
+
+class ShardLost(Exception):
+    """Część przejął inny proces (brak pulsu dłużej niż timeout)."""
+
+
+class Shard:
+    def __init__(self, shard_id, okres, pracownik_od, pracownik_do, token, attempt):
+        self.id = shard_id
+        self.okres = okres
+        self.pracownik_od = pracownik_od
+        self.pracownik_do = pracownik_do
+        self.token = token
+        self.attempt = attempt
+
+    def conditions(self):
+        """Warunki SQL części (do weryfikacja.source_query i usuwania wyników): okres i [od, do)."""
+        conditions, params = ["Okres = ?"], [self.okres]
+        if self.pracownik_od is not None:
+            conditions.append("Pracownik >= ?")
+            params.append(self.pracownik_od)
+        if self.pracownik_do is not None:
+            conditions.append("Pracownik < ?")
+            params.append(self.pracownik_do)
+        return conditions, params
+
+    def __str__(self):
+        return f"część {self.id} (okres {self.okres}, pracownicy {self.pracownik_od or '…'} - {self.pracownik_do or '…'})"
+
+
+def _database_name(db_config):
+    return f"{db_config.get('migration_server')}/{db_config.get('migration_db')}"
+
+
+def employee_ranges(employees, per_shard=EMPLOYEES_PER_SHARD):
+    """Zakresy [od, do) po per_shard pracowników; pierwszy bez dolnej, ostatni bez górnej granicy."""
+    bounds = employees[per_shard::per_shard]
+    lower = [None] + bounds
+    upper = bounds + [None]
+    return list(zip(lower, upper))
+
+
+class ShardQueue:
+    """Kolejka części w pliku SQLite (każde połączenie krótkotrwałe - plik może leżeć na udziale sieciowym)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self, create=False):
+        if not create and not os.path.exists(self.path):
+            raise ShardQueueError(f"Brak kolejki {self.path} - utwórz ją poleceniem: weryfikator_cli.py shardy")
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def create(self, run_id, db_config, definitions, shards, source=None):
+        """Zakłada kolejkę: przebieg, baza, migawka definicji i lista (okres, od, do)."""
+        if os.path.exists(self.path):
+            raise ShardQueueError(f"Kolejka {self.path} już istnieje - usuń plik, aby zaplanować nowy przebieg.")
+
+        def work(conn):
+            conn.executemany("INSERT INTO meta (klucz, wartosc) VALUES (?, ?)", [
+                ("przebieg", run_id),
+                ("baza", _database_name(db_config)),
+                ("zrodlo", source or db_config.get("migration_db") or ""),
+                ("definicje", json.dumps(definitions, ensure_ascii=False)),
+                ("utworzono", time.strftime("%Y-%m-%d %H:%M:%S")),
+            ])
+            conn.executemany("INSERT INTO shardy (okres, pracownik_od, pracownik_do) VALUES (?, ?, ?)", shards)
+
+        conn = self._connect(create=True)
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._transaction(work)
+
+    def meta(self):
+        conn = self._connect()
+        try:
+            return {row["klucz"]: row["wartosc"] for row in conn.execute("SELECT klucz, wartosc FROM meta")}
+        finally:
+            conn.close()
+
+    def claim(self, worker, run_id, timeout_s=SHARD_TIMEOUT_S):
+        """
+        Pobiera wolną część przebiegu run_id (najpierw zwraca do kolejki części bez pulsu dłużej
+        niż timeout_s). Zwraca Shard, None gdy nic nie czeka, a inne procesy jeszcze pracują,
+        albo False, gdy wszystkie części są zakończone.
+        """
+        def work(conn):
+            current = conn.execute("SELECT wartosc FROM meta WHERE klucz = 'przebieg'").fetchone()
+            if current is None or current[0] != run_id:
+                raise ShardQueueError(f"Kolejka {self.path} została zaplanowana od nowa (inny przebieg).")
+            now = time.time()
+            conn.execute("UPDATE shardy SET stan = ?, token = NULL WHERE stan = ? AND puls < ?",
+                         (STATE_PENDING, STATE_RUNNING, now - timeout_s))
+            row = conn.execute("SELECT * FROM shardy WHERE stan = ? ORDER BY id LIMIT 1", (STATE_PENDING,)).fetchone()
+            if row is None:
+                running = conn.execute("SELECT COUNT(*) FROM shardy WHERE stan = ?", (STATE_RUNNING,)).fetchone()[0]
+                return None if running else False
+            token = uuid.uuid4().hex
+            conn.execute("UPDATE shardy SET stan = ?, proces = ?, token = ?, puls = ?, proby = proby + 1 WHERE id = ?",
+                         (STATE_RUNNING, worker, token, now, row["id"]))
+            return Shard(row["id"], row["okres"], row["pracownik_od"], row["pracownik_do"], token, row["proby"] + 1)
+
+        return self._transaction(work)
+
+    def heartbeat(self, shard):
+        """Odświeża puls części; False, gdy część przejął inny proces."""
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE shardy SET puls = ? WHERE id = ? AND token = ?", (time.time(), shard.id, shard.token)
+        ).rowcount == 1)
+
+    def complete(self, shard, stats, seconds, commit_results=None):
+        """
+        Oznacza część jako gotową, jeśli nadal należy do tego procesu (token). commit_results() -
+        zatwierdzenie wyników części - jest wołane wewnątrz tej transakcji: nikt nie przejmie części
+        między sprawdzeniem tokenu a zapisem, a błąd zatwierdzenia zostawia część w toku.
+        Zwraca False, gdy część przejął inny proces (commit_results nie jest wtedy wołane).
+        """
+        def work(conn):
+            owned = conn.execute(
+                "UPDATE shardy SET stan = ?, token = NULL, sprawdzono = ?, rozbieznosci = ?, sekundy = ?, blad = NULL "
+                "WHERE id = ? AND token = ?",
+                (STATE_DONE, stats.checked_periods, stats.discrepancies, seconds, shard.id, shard.token)
+            ).rowcount == 1
+            if owned and commit_results is not None:
+                commit_results()
+            return owned
+
+        return self._transaction(work)
+
+    def fail(self, shard, error, max_attempts=MAX_ATTEMPTS):
+        """Błąd części: wraca do kolejki, a po max_attempts próbach dostaje stan "blad"."""
+        state = STATE_FAILED if shard.attempt >= max_attempts else STATE_PENDING
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE shardy SET stan = ?, token = NULL, blad = ? WHERE id = ? AND token = ?",
+            (state, str(error), shard.id, shard.token)
+        ))
+
+    def progress(self):
+        """Liczba części w każdym stanie, sumy liczników i części z błędami."""
+        conn = self._connect()
+        try:
+            counts = OrderedDict((state, 0) for state in STATES)
+            for row in conn.execute("SELECT stan, COUNT(*) FROM shardy GROUP BY stan"):
+                counts[row[0]] = row[1]
+            totals = conn.execute(
+                "SELECT COALESCE(SUM(sprawdzono), 0), COALESCE(SUM(rozbieznosci), 0), COALESCE(SUM(sekundy), 0), "
+                "COUNT(DISTINCT proces) FROM shardy WHERE stan = ?", (STATE_DONE,)
+            ).fetchone()
+            failed = [dict(row) for row in conn.execute(
+                "SELECT id, okres, pracownik_od, pracownik_do, proby, blad FROM shardy WHERE stan = ? ORDER BY id",
+                (STATE_FAILED,)
+            )]
+            return counts, tuple(totals), failed
+        finally:
+            conn.close()
+
+
+def plan_shards(queue_path, db_config, definitions, per_shard=EMPLOYEES_PER_SHARD, source=None):
+    """
+    Dzieli weryfikację bazy db_config na okresy x zakresy pracowników i zakłada kolejkę.
+    Zwraca (IdPrzebiegu, liczba części).
+    """
+    conn = open_db_connection(db_config)
+    try:
+        if not has_results_table(conn):
+            raise ResultsSinkError("Brak tabeli wyników - uruchom: weryfikator_cli.py schemat --zainstaluj")
+        periods = fetch_source_values(conn, db_config, "Okres")
+        employees = fetch_source_values(conn, db_config, "Pracownik")
+        ranges = employee_ranges(employees, per_shard)
+        shards = [(okres if isinstance(okres, (int, str)) else str(okres), od, do) for okres in periods for od, do in ranges]
+        run_id = str(uuid.uuid4())
+        ShardQueue(queue_path).create(run_id, db_config, definitions, shards, source)
+        register_run(conn, run_id, source)
+    finally:
+        conn.close()
+    return run_id, len(shards)
+
+
+class _Heartbeat:
+    """Wątek pulsu części; lost ustawiane, gdy część przejął inny proces."""
+
+    def __init__(self, queue, shard, interval_s):
+        self.queue = queue
+        self.shard = shard
+        self.interval_s = interval_s
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ShardHeartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                if not self.queue.heartbeat(self.shard):
+                    self.lost.set()
+                    return
+            except sqlite3.Error as ex:  # chwilowy błąd udziału - spróbujemy przy następnym pulsie
+                print(f"Puls części {self.shard.id} nieudany: {ex}")
+
+    def checked(self, rows):
+        for count, row in enumerate(rows, 1):
+            if count % CANCEL_CHECK_ROWS == 0 and self.lost.is_set():
+                raise ShardLost(f"{self.shard} przejęta przez inny proces")
+            yield row
+
+
+def _verify_shard(queue, db_config, definitions, run_id, source, shard, heartbeat, started):
+    """
+    Weryfikuje część i zastępuje jej wyniki (także poprzedniej, przerwanej próby) jedną transakcją,
+    zatwierdzaną w queue.complete po sprawdzeniu tokenu części. Zwraca (statystyki, sekundy);
+    ShardLost - część przejął inny proces, nic nie zapisano.
+    """
+    conditions, params = shard.conditions()
+    stats = VerificationStats()
+    conn = open_db_connection(db_config)
+    try:
+        discrepancies = list(run_verification(conn, db_config, definitions, conditions, params, stats,
+                                              wrap_rows=heartbeat.checked))
+        if heartbeat.lost.is_set():
+            raise ShardLost(f"{shard} przejęta przez inny proces")
+        removed = replace_results(conn, run_id, discrepancies, source, conditions, params)
+        seconds = time.perf_counter() - started
+        if not queue.complete(shard, stats, seconds, commit_results=conn.commit):
+            conn.rollback()
+            raise ShardLost(f"{shard} przejęta przez inny proces przed zakończeniem - wyniki wycofane")
+    finally:
+        conn.close()
+    if removed:
+        print(f"Usunięto {removed} wyników poprzedniej próby: {shard}.")
+    return stats, seconds
+
+
+def run_worker(queue_path, db_config, worker=None, heartbeat_s=HEARTBEAT_S, timeout_s=SHARD_TIMEOUT_S,
+               idle_wait_s=IDLE_WAIT_S, max_shards=None):
+    """
+    Pętla stanowiska: pobiera i weryfikuje części do wyczerpania kolejki (albo max_shards)
+    na bazie db_config (tej samej, dla której zaplanowano kolejkę).
+    Gdy nic nie czeka, a inne procesy jeszcze pracują, czeka - ich części mogą wrócić do kolejki.
+    Zwraca liczbę części zakończonych przez ten proces.
+    """
+    queue = ShardQueue(queue_path)
+    meta = queue.meta()
+    run_id = meta["przebieg"]
+    if meta["baza"] != _database_name(db_config):
+        raise ShardQueueError(f"Kolejka {queue_path} dotyczy bazy {meta['baza']}, a konfiguracja - "
+                              f"{_database_name(db_config)}.")
+    definitions = json.loads(meta["definicje"])
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    done = 0
+    print(f"Proces {worker}: przebieg {run_id}, kolejka {queue_path}.")
+
+    while max_shards is None or done < max_shards:
+        shard = queue.claim(worker, run_id, timeout_s)
+        if shard is False:
+            break
+        if shard is None:
+            time.sleep(idle_wait_s)
+            continue
+        started = time.perf_counter()
+        try:
+            with _Heartbeat(queue, shard, heartbeat_s) as heartbeat:
+                stats, seconds = _verify_shard(queue, db_config, definitions, run_id, meta["zrodlo"] or None,
+                                               shard, heartbeat, started)
+        except ShardLost as ex:
+            print(f"{ex} - pomijam.")
+            continue
+        except Exception as ex:
+            print(f"Błąd: {shard}, próba {shard.attempt}: {ex}")
+            queue.fail(shard, ex)
+            continue
+        done += 1
+        print(f"Zakończono {shard}: {stats} ({seconds:.1f} s).")
+    return done
+
+
+def format_progress(queue_path):
+    queue = ShardQueue(queue_path)
+    meta = queue.meta()
+    counts, (checked, discrepancies, seconds, workers), failed = queue.progress()
+    total = sum(counts.values())
+    lines = [
+        f"Przebieg {meta['przebieg']} (utworzono {meta['utworzono']}): {counts[STATE_DONE]} z {total} części gotowe, "
+        + ", ".join(f"{state}: {count}" for state, count in counts.items()),
+        f"Sprawdzono par pracownik/okres: {checked}, rozbieżności: {discrepancies}, "
+        f"łączny czas części: {seconds:.0f} s, stanowisk: {workers}.",
+    ]
+    for shard in failed:
+        lines.append(f"  BŁĄD części {shard['id']} (okres {shard['okres']}, {shard['pracownik_od'] or '…'} - "
+                     f"{shard['pracownik_do'] or '…'}, prób: {shard['proby']}): {shard['blad']}")
+    return "\n".join(lines)
+
+
+def is_finished(queue_path):
+    counts, _, _ = ShardQueue(queue_path).progress()
+    return counts[STATE_PENDING] == 0 and counts[STATE_RUNNING] == 0
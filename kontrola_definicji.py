@@ -0,0 +1,227 @@
+# kontrola_definicji.py
+"""
+Kontrola wiarygodności definicji składników z wer_t_Skladniki_Parametry (bez zależności od Qt).
+
+Macierz definicji (KodSL x parametry) jest trzymana kolumnami jako maski bitowe - int Pythona,
+w którym bit i odpowiada i-temu KodSL: dla każdego parametru osobno wartości 'tak', 'nie'
+i wartości niepoprawne, do tego maska KodSL z nieznanymi kluczami Parametr. Reguły (RULES) są
+wyrażeniami na całych kolumnach (&, |, dopełnienie), więc sprawdzenie wszystkich KodSL to kilkanaście
+operacji na liczbach całkowitych, a edycja komórki przestawia jeden bit. Każda reguła dotyczy
+pojedynczego wiersza, więc po edycji wystarczy zebrać zgłoszenia zmienionych wierszy (maska dirty) -
+koszt sprawdzenia po zmianie w tabeli nie rośnie z liczbą zgłoszeń w pozostałych KodSL.
+
+Wyjątki dla pojedynczych KodSL ustawia definition_lint_exemptions w db_config.json, np.
+{"ZDROWOTNA_BEZ_ZUS": ["KODSL1", "KODSL2"]}.
+"""
+
+from collections import namedtuple
+
+from db_utils import ALL_EXPECTED_HEADERS
+
+ZUS = "do_podstawa_zus"
+PODATEK = "do_podstawa_podatek"
+ZDROWOTNA = "do_podstawa_zdrowotna"
+POTRACENIE = "do_potracenie"
+ZASILEK = "do_zasilek"
+KOSZTY_AUTORSKIE = "do_koszty_autorskie"
+
+VALUE_YES = "tak"
+VALUE_NO = "nie"
+
+Rule = namedtuple("Rule", ["id", "columns", "message", "mask"])
+Finding = namedtuple("Finding", ["kod_sl", "parametr", "regula", "komunikat"])
+
+
+def _insert_bit(mask, index, value=False):
+    """Wstawia bit na pozycji index (wyższe bity przesuwają się o jeden w górę)."""
+    low = mask & ((1 << index) - 1)
+    return ((mask >> index) << (index + 1)) | low | (int(value) << index)
+
+
+def _remove_bit(mask, index):
+    low = mask & ((1 << index) - 1)
+    return ((mask >> (index + 1)) << index) | low
+
+
+def _normalize(value):
+    return str(value if value is not None else "").strip().lower()
+
+
+def _column_mask(flags):
+    """Maska z listy wartości logicznych (element i -> bit i)."""
+    return int("".join("1" if flag else "0" for flag in reversed(flags)) or "0", 2)
+
+
+def bit_indices(mask):
+    """Numery ustawionych bitów maski (rosnąco), np. wierszy z DefinitionMatrix.take_dirty."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class DefinitionMatrix:
+    """Definicje składników jako maski bitowe kolumn; aktualizowane punktowo przy edycji."""
+
+    def __init__(self, definitions=None, headers=ALL_EXPECTED_HEADERS):
+        self.headers = list(headers)
+        self.kod_sl = []
+        self.yes = {header: 0 for header in self.headers}
+        self.no = {header: 0 for header in self.headers}
+        self.invalid = {header: 0 for header in self.headers}
+        self.unknown = 0
+        self.unknown_keys = {}  # KodSL -> nieznane klucze Parametr (do komunikatów)
+        self.dirty = 0  # wiersze zmienione od ostatniego take_dirty
+        self._index = None
+        if definitions:
+            self._build(definitions)
+
+    def _build(self, definitions):
+        """Maski całych kolumn naraz (czas liniowy względem liczby KodSL, bez przesuwania bitów)."""
+        self.kod_sl = list(definitions)
+        for header in self.headers:
+            values = [_normalize(params.get(header, "")) for params in definitions.values()]
+            self.yes[header] = _column_mask([value == VALUE_YES for value in values])
+            self.no[header] = _column_mask([value == VALUE_NO for value in values])
+            self.invalid[header] = _column_mask([value not in (VALUE_YES, VALUE_NO, "") for value in values])
+        for kod_sl, params in definitions.items():
+            unknown = tuple(sorted(key for key in params if key not in self.yes))
+            if unknown:
+                self.unknown_keys[kod_sl] = unknown
+        self.unknown = _column_mask([kod_sl in self.unknown_keys for kod_sl in self.kod_sl])
+        self.dirty = self.all
+
+    @property
+    def all(self):
+        return (1 << len(self.kod_sl)) - 1
+
+    def not_yes(self, header):
+        return self.all ^ self.yes[header]
+
+    def index_of(self, kod_sl):
+        if self._index is None:
+            self._index = {name: index for index, name in enumerate(self.kod_sl)}
+        return self._index.get(kod_sl)
+
+    def take_dirty(self):
+        """Zwraca maskę wierszy zmienionych od poprzedniego wywołania i ją zeruje."""
+        dirty, self.dirty = self.dirty, 0
+        return dirty
+
+    def mask_of(self, kod_sl_list):
+        mask = 0
+        for kod_sl in kod_sl_list:
+            index = self.index_of(kod_sl)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def set_value(self, index, header, value):
+        """Ustawia jedną komórkę (wiersz index, parametr header)."""
+        if header not in self.yes:
+            return
+        bit = 1 << index
+        self.dirty |= bit
+        value = _normalize(value)
+        for masks, matches in ((self.yes, value == VALUE_YES), (self.no, value == VALUE_NO),
+                               (self.invalid, value not in (VALUE_YES, VALUE_NO, ""))):
+            masks[header] = masks[header] | bit if matches else masks[header] & ~bit
+
+    def set_row(self, index, params):
+        """Ustawia wszystkie parametry wiersza index (klucze spoza headers są nieznanymi parametrami)."""
+        for header in self.headers:
+            self.set_value(index, header, params.get(header, ""))
+        kod_sl = self.kod_sl[index]
+        self.dirty |= 1 << index
+        unknown = tuple(sorted(key for key in params if key not in self.yes))
+        if unknown:
+            self.unknown_keys[kod_sl] = unknown
+            self.unknown |= 1 << index
+        else:
+            self.unknown_keys.pop(kod_sl, None)
+            self.unknown &= ~(1 << index)
+
+    def insert_row(self, index, kod_sl, params):
+        """Wstawia KodSL na pozycji index (jak wiersz wstawiany do tabeli)."""
+        self.kod_sl.insert(index, kod_sl)
+        self._index = None
+        for masks in (self.yes, self.no, self.invalid):
+            for header in self.headers:
+                masks[header] = _insert_bit(masks[header], index)
+        self.unknown = _insert_bit(self.unknown, index)
+        self.dirty = _insert_bit(self.dirty, index)
+        self.set_row(index, params)
+
+    def remove_row(self, index):
+        kod_sl = self.kod_sl.pop(index)
+        self._index = None
+        self.unknown_keys.pop(kod_sl, None)
+        for masks in (self.yes, self.no, self.invalid):
+            for header in self.headers:
+                masks[header] = _remove_bit(masks[header], index)
+        self.unknown = _remove_bit(self.unknown, index)
+        self.dirty = _remove_bit(self.dirty, index)
+
+
+RULES = [
+    Rule("ZDROWOTNA_BEZ_ZUS", (ZDROWOTNA, ZUS),
+         "Składnik w podstawie zdrowotnej, ale nie w podstawie ZUS (bez zwolnienia - np. zasiłku).",
+         lambda m: m.yes[ZDROWOTNA] & m.not_yes(ZUS) & m.not_yes(ZASILEK)),
+    Rule("ZASILEK_BEZ_PODATKU", (ZASILEK, PODATEK),
+         "Zasiłek oznaczony jako zwolniony z podatku - zasiłki wchodzą do podstawy podatku.",
+         lambda m: m.yes[ZASILEK] & m.no[PODATEK]),
+    Rule("ZASILEK_W_ZUS", (ZASILEK, ZUS),
+         "Zasiłek w podstawie składek ZUS - zasiłki nie są oskładkowane.",
+         lambda m: m.yes[ZASILEK] & m.yes[ZUS]),
+    Rule("KOSZTY_AUTORSKIE_BEZ_PODATKU", (KOSZTY_AUTORSKIE, PODATEK),
+         "Koszty autorskie dla składnika spoza podstawy podatku.",
+         lambda m: m.yes[KOSZTY_AUTORSKIE] & m.not_yes(PODATEK)),
+    Rule("POTRACENIE_W_PODSTAWIE", (POTRACENIE,),
+         "Potrącenie wliczane do podstawy ZUS, podatku lub zdrowotnej.",
+         lambda m: m.yes[POTRACENIE] & (m.yes[ZUS] | m.yes[PODATEK] | m.yes[ZDROWOTNA])),
+] + [
+    Rule("NIEPOPRAWNA_WARTOSC", (header,), "Wartość inna niż 'tak', 'nie' lub pusta.",
+         lambda m, header=header: m.invalid[header])
+    for header in ALL_EXPECTED_HEADERS
+] + [
+    # Bez kolumn - nieznany klucz nie ma komórki w tabeli, zgłaszany jest cały KodSL.
+    Rule("NIEZNANY_PARAMETR", (), "Parametr spoza listy znanych parametrów.", lambda m: m.unknown),
+]
+
+
+def lint_matrix(matrix, exemptions=None, rules=RULES, rows=None):
+    """
+    Sprawdza wszystkie reguły na macierzy; zwraca listę Finding (po KodSL w kolejności macierzy).
+    exemptions - {id reguły: lista KodSL}, np. db_config.get("definition_lint_exemptions").
+    rows - maska wierszy, dla których zbierane są zgłoszenia (None = wszystkie), np. matrix.take_dirty().
+    """
+    findings = []
+    exemptions = exemptions or {}
+    for rule in rules:
+        mask = rule.mask(matrix)
+        if rows is not None:
+            mask &= rows
+        if rule.id in exemptions:
+            mask &= ~matrix.mask_of(exemptions[rule.id])
+        for index in bit_indices(mask):
+            kod_sl = matrix.kod_sl[index]
+            if rule.columns:
+                findings.extend((index, Finding(kod_sl, column, rule.id, rule.message)) for column in rule.columns)
+            else:
+                findings.extend((index, Finding(kod_sl, key, rule.id, f"{rule.message} ({key})"))
+                                for key in matrix.unknown_keys.get(kod_sl, ()))
+    findings.sort(key=lambda item: item[0])
+    return [finding for _, finding in findings]
+
+
+def lint_definitions(definitions, exemptions=None):
+    """Kontrola słownika {KodSL: {Parametr: wartość}} (np. z fetch_all_parameters)."""
+    return lint_matrix(DefinitionMatrix(definitions), exemptions)
+
+
+def findings_by_cell(findings):
+    """{(KodSL, Parametr): [komunikaty]} - do oznaczania komórek tabel."""
+    cells = {}
+    for finding in findings:
+        cells.setdefault((finding.kod_sl, finding.parametr), []).append(finding.komunikat)
+    return cells
@@ -1,12 +1,159 @@
 # master_list_widget.py
 
 import pyodbc
-from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
-from PyQt5.QtCore import pyqtSignal
-from db_utils import load_db_config, get_db_connection
+from PyQt5.QtWidgets import QTableView, QHeaderView, QMessageBox, QAbstractItemView
+from PyQt5.QtCore import (
+    pyqtSignal, Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QItemSelectionModel, QTimer
+)
+from db_utils import load_db_config
+from job_scheduler import PRIORITY_INTERACTIVE
+from kodsl_index import KodSLSearchIndex
+from offline_manager import handle_connection_error, is_offline, offline_manager, run_db_job
+from skladniki_db import fetch_kodsl_page, KODSL_PAGE_SIZE
 
 
-class MasterListWidget(QTableWidget):
+class KodSLListModel(QAbstractTableModel):
+    """
+    Model źródłowy: jedna kolumna z listą KodSL, doczytywaną stronami.
+    Widok woła canFetchMore/fetchMore, gdy użytkownik przewinie do końca
+    załadowanej części; każda strona to jedno zapytanie z paginacją kluczem,
+    w MainApp wykonywane w tle (wiersze są wstawiane po nadejściu strony, pageLoaded).
+    """
+    loadError = pyqtSignal(str)
+    pageLoaded = pyqtSignal()
+
+    def __init__(self, db_config, search_index, page_size=KODSL_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.db_config = db_config
+        self.search_index = search_index
+        self.page_size = page_size
+        self.variant_names = []
+        self.fetching = False  # strona w drodze - następna dopiero po niej
+        self._has_more = False
+        self._generation = 0  # rośnie przy reload; strony sprzed przeładowania są pomijane
+        self._fetch_all = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.variant_names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            return self.variant_names[index.row()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return "Składnik (KodSL)"
+        return None
+
+    def reload(self):
+        """Czyści model i pobiera pierwszą stronę."""
+        self.beginResetModel()
+        self.variant_names.clear()
+        self.search_index.clear()
+        self._has_more = True
+        self.fetching = False
+        self._fetch_all = False
+        self._generation += 1
+        self.endResetModel()
+        self.fetchMore()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and not self.fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+
+        after = self.variant_names[-1] if self.variant_names else None
+        page_size = self.page_size
+        generation = self._generation
+        self.fetching = True
+        run_db_job(self.db_config, "Odczyt listy składników",
+                   lambda conn: fetch_kodsl_page(conn, after, page_size), PRIORITY_INTERACTIVE,
+                   on_result=lambda names: self._on_page_loaded(generation, names),
+                   on_error=lambda ex: self._on_page_failed(generation, after, ex))
+
+    def _on_page_failed(self, generation, after, ex):
+        if generation != self._generation:
+            return
+        if ex is None or (isinstance(ex, pyodbc.Error) and handle_connection_error(ex)):
+            if is_offline():
+                # Tryb offline: strony z lokalnej kopii definicji.
+                self._on_page_loaded(generation, offline_manager().local_kodsl_page(after, self.page_size))
+                return
+        else:
+            self.loadError.emit(str(ex))
+        self.fetching = False
+        self._has_more = False
+        self._fetch_all = False
+
+    def _on_page_loaded(self, generation, names):
+        if generation != self._generation:
+            return
+        self.fetching = False
+        self._has_more = len(names) == self.page_size
+        self._fetch_all = self._fetch_all and self._has_more
+        if names:
+            # Indeks musi znać nowe nazwy, zanim proxy zacznie filtrować wstawiane wiersze.
+            self.search_index.add(names)
+            first = len(self.variant_names)
+            self.beginInsertRows(QModelIndex(), first, first + len(names) - 1)
+            self.variant_names.extend(names)
+            self.endInsertRows()
+        if self._fetch_all and self.canFetchMore():
+            # Kolejna strona w następnym obiegu pętli zdarzeń (bez rekurencji przy odczycie bez tła).
+            QTimer.singleShot(0, self.fetchMore)
+        self.pageLoaded.emit()
+
+    def fetch_all(self):
+        """Doczytuje wszystkie pozostałe strony (w tle - każdą po nadejściu poprzedniej)."""
+        self._fetch_all = True
+        while self.canFetchMore():
+            self.fetchMore()
+
+
+class KodSLFilterProxyModel(QSortFilterProxyModel):
+    """
+    Proxy ukrywające wiersze niepasujące do wyszukiwanego tekstu.
+    Dopasowanie liczy KodSLSearchIndex, proxy sprawdza tylko przynależność do zbioru.
+    """
+
+    def __init__(self, search_index, parent=None):
+        super().__init__(parent)
+        self.search_index = search_index
+        self.search_text = ""
+        self.matching_rows = None  # None = brak filtra
+        self._indexed_count = 0
+
+    def set_search_text(self, text):
+        self.search_text = KodSLSearchIndex.normalize(text)
+        self.refresh_matches()
+
+    def refresh_matches(self):
+        """Przelicza zbiór pasujących wierszy i ponownie filtruje cały model."""
+        self._update_matches()
+        self.invalidateFilter()
+
+    def _update_matches(self):
+        self._indexed_count = len(self.search_index)
+        if self.search_text:
+            self.matching_rows = self.search_index.substring_rows(self.search_text)
+        else:
+            self.matching_rows = None
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        # Po doczytaniu strony indeks jest dłuższy niż przy ostatnim wyszukiwaniu -
+        # dopasowania liczymy na nowo (jedno zapytanie do indeksu na stronę).
+        if self._indexed_count != len(self.search_index):
+            self._update_matches()
+        return self.matching_rows is None or source_row in self.matching_rows
+
+
+class MasterListWidget(QTableView):
     """
     Tabela Master: Wyświetla listę KodSL.
     Emituje KodSL po kliknięciu.
@@ -17,18 +164,30 @@ class MasterListWidget(QTableWidget):
         super().__init__(parent)
         self.styles = styles
         self.db_config = load_db_config()
-        self.variant_names = []
 
-        self.setSelectionBehavior(QTableWidget.SelectRows)
-        self.setSelectionMode(QTableWidget.SingleSelection)
-        self.setColumnCount(1)
-        self.setHorizontalHeaderLabels(["Składnik (KodSL)"])
+        self.search_index = KodSLSearchIndex()
+        self.source_model = KodSLListModel(self.db_config, self.search_index,
+                                           page_size=self.db_config.get("kodsl_page_size", KODSL_PAGE_SIZE),
+                                           parent=self)
+        self.source_model.loadError.connect(
+            lambda message: QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu listy składników: {message}")
+        )
+        self.proxy_model = KodSLFilterProxyModel(self.search_index, self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.setModel(self.proxy_model)
+        # Strony przychodzą w tle: pierwsza zaznacza pierwszy KodSL, kolejne ponawiają szukanie (Enter).
+        self._select_first = False
+        self._jump_pending = False
+        self.source_model.pageLoaded.connect(self._on_page_loaded)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
         self.verticalHeader().hide()
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         self.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: {self.styles.get('table_bg', '#FFFFFF')};
                 border: 1px solid #D1D5DB;
                 selection-background-color: {self.styles.get('row_highlight', '#D7E1F2')};
@@ -38,52 +197,87 @@ class MasterListWidget(QTableWidget):
                 background-color: {self.styles['header_bg']};
                 color: {self.styles['header_color']};
                 border: none;
-                border-bottom: 1px solid #D1D5DB; 
+                border-bottom: 1px solid #D1D5DB;
                 padding: 6px;
                 font-weight: bold;
             }}
         """)
 
         self.load_data()
-        self.itemSelectionChanged.connect(self._emit_selected_variant)
+        self.selectionModel().selectionChanged.connect(self._emit_selected_variant)
 
-    def get_db_connection(self):
-        return get_db_connection(self.db_config)
+    def rowCount(self):
+        """Liczba wierszy widocznych po filtrowaniu."""
+        return self.proxy_model.rowCount()
+
+    @property
+    def variant_names(self):
+        """KodSL załadowane do tej pory (w kolejności alfabetycznej)."""
+        return self.source_model.variant_names
 
     def load_data(self):
-        """Ładuje unikalne KodSL z bazy i wypełnia tabelę."""
-        conn = self.get_db_connection()
-        if not conn:
-            self.setRowCount(0)
-            return
+        """Ładuje pierwszą stronę KodSL; kolejne strony doczytuje widok podczas przewijania."""
+        self._select_first = True
+        self.source_model.reload()
+        self.proxy_model.refresh_matches()
 
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT DISTINCT KodSL 
-                FROM wer_t_Skladniki_Parametry 
-                ORDER BY KodSL
-            """)
-            rows = cursor.fetchall()
-            conn.close()
-        except pyodbc.Error as ex:
-            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu listy składników: {ex}")
-            conn.close()
+    def _on_page_loaded(self):
+        if self._select_first and self.rowCount() > 0:
+            self._select_first = False
+            self.selectRow(0)
+        if self._jump_pending:
+            self.jump_to_search_match()
+
+    def set_search_text(self, text):
+        """SLOT: Filtruje listę do KodSL zawierających tekst (wywoływany przy każdym znaku)."""
+        self._jump_pending = False
+        self.proxy_model.set_search_text(text)
+
+    def jump_to_search_match(self):
+        """SLOT: Zaznacza pierwszy KodSL zaczynający się od szukanego tekstu (a gdy brak - pierwszy pasujący)."""
+        text = self.proxy_model.search_text
+        prefix_rows = self.search_index.prefix_rows(text)
+        # Szukany KodSL może leżeć na jeszcze niepobranej stronie (w tle - szukamy ponownie po jej nadejściu).
+        while text and not prefix_rows and self.source_model.canFetchMore():
+            self.source_model.fetchMore()
+            prefix_rows = self.search_index.prefix_rows(text)
+        self._jump_pending = bool(text and not prefix_rows and self.source_model.fetching)
+        if self._jump_pending:
             return
+        if prefix_rows:
+            self.select_source_row(prefix_rows[0])
+        elif self.rowCount() > 0:
+            self.selectRow(0)
 
-        self.variant_names = [row[0] for row in rows]
+    def select_source_row(self, source_row):
+        proxy_index = self.proxy_model.mapFromSource(self.source_model.index(source_row, 0))
+        if proxy_index.isValid():
+            self.selectionModel().select(proxy_index, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+            self.scrollTo(proxy_index)
 
-        self.setRowCount(len(self.variant_names))
-        for r, name in enumerate(self.variant_names):
-            item = QTableWidgetItem(name)
-            self.setItem(r, 0, item)
+    def selected_variant(self):
+        """Zwraca KodSL zaznaczonego wiersza albo None."""
+        selected_rows = self.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        source_index = self.proxy_model.mapToSource(selected_rows[0])
+        return self.variant_names[source_index.row()]
 
-        if self.rowCount() > 0:
-            self.selectRow(0)
+    def neighbour_variants(self):
+        """Zwraca KodSL widocznych wierszy bezpośrednio nad i pod zaznaczeniem."""
+        selected_rows = self.selectionModel().selectedRows()
+        if not selected_rows:
+            return []
+        row = selected_rows[0].row()
+        neighbours = []
+        for neighbour_row in (row + 1, row - 1):
+            if 0 <= neighbour_row < self.proxy_model.rowCount():
+                source_index = self.proxy_model.mapToSource(self.proxy_model.index(neighbour_row, 0))
+                neighbours.append(self.variant_names[source_index.row()])
+        return neighbours
 
     def _emit_selected_variant(self):
         """Emituje sygnał z nazwą wybranego wariantu."""
-        selected_rows = self.selectedItems()
-        if selected_rows:
-            kod_sl = selected_rows[0].text()
-            self.variantSelected.emit(kod_sl)
\ No newline at end of file
+        kod_sl = self.selected_variant()
+        if kod_sl:
+            self.variantSelected.emit(kod_sl)
@@ -0,0 +1,301 @@
+# offline_manager.py
+"""
+Tryb offline GUI: stan połączenia, sonda zdrowia serwera i odtwarzanie kolejki zmian.
+
+Gdy serwer jest niedostępny, widżety nie próbują się łączyć (brak czekania na timeout
+i okien błędów przy każdej edycji) - czytają lokalną kopię definicji, a zmiany dopisują
+do trwałej kolejki (kolejka_offline.py). QTimer co offline_probe_interval_ms sprawdza
+w tle połączenie; po udanej sondzie kolejka jest odtwarzana jedną transakcją z kontrolą
+wersji KodSL. Jeśli inny użytkownik zmienił w tym czasie te same KodSL, decyzję podejmuje
+użytkownik (conflict_dialog): Nadpisz, Wczytaj ponownie (odrzucenie zmian z kolejki) albo
+Anuluj (zmiany czekają w kolejce, a kolejna sonda zapyta ponownie).
+"""
+
+import bisect
+
+import pyodbc
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from conflict_dialog import CONFLICT_OVERWRITE, CONFLICT_RELOAD, ask_conflict_resolution
+from db_utils import DBConfigError, get_db_connection, is_connection_error, open_db_connection, report_error
+from job_scheduler import job_scheduler
+from kolejka_offline import (
+    OFFLINE_QUEUE_FILE, SNAPSHOT_FILE, OfflineQueue, apply_records, change_record, delete_record,
+    encode_version, load_snapshot, replay_queue, save_snapshot
+)
+from skladniki_db import ConflictError, fetch_all_parameters
+
+OFFLINE_PROBE_INTERVAL_MS = 10000
+
+
+class _ProbeSignals(QObject):
+    finished = pyqtSignal(bool, list, object)
+    failed = pyqtSignal(str)
+    # KodSL z kolejki zmienione w międzyczasie przez innego użytkownika (nic nie zapisano)
+    conflict = pyqtSignal(list)
+
+
+class _ProbeTask(QRunnable):
+    """Sprawdza połączenie, odtwarza kolejkę i odświeża lokalną kopię definicji (w tle, bez okien)."""
+
+    def __init__(self, db_config, queue, snapshot_path, overwrite=()):
+        super().__init__()
+        self.db_config = db_config
+        self.queue = queue
+        self.snapshot_path = snapshot_path
+        self.overwrite = set(overwrite)
+        self.signals = _ProbeSignals()
+
+    def run(self):
+        conn = get_db_connection(self.db_config, show_errors=False)
+        if not conn:
+            self.signals.finished.emit(False, [], None)
+            return
+        try:
+            replayed = replay_queue(conn, self.queue, self.overwrite)
+            definitions = fetch_all_parameters(conn, db_config=self.db_config)
+            save_snapshot(definitions, self.snapshot_path)
+        except ConflictError as ex:
+            self.signals.conflict.emit(ex.kod_sl_list)
+            return
+        except (pyodbc.Error, OSError) as ex:
+            self.signals.failed.emit(str(ex))
+            self.signals.finished.emit(False, [], None)
+            return
+        finally:
+            conn.close()
+        self.signals.finished.emit(True, replayed, definitions)
+
+
+class OfflineManager(QObject):
+    onlineChanged = pyqtSignal(bool)
+    # KodSL, których zmiany z kolejki trafiły właśnie do bazy (tokeny wersji i cache do odświeżenia)
+    replayed = pyqtSignal(list)
+    pendingChanged = pyqtSignal(int)
+    # Komunikaty stanu (przejście offline/online, nieudana sonda, odtworzona kolejka) - pasek stanu okna
+    message = pyqtSignal(str)
+
+    def __init__(self, db_config, queue_path=OFFLINE_QUEUE_FILE, snapshot_path=SNAPSHOT_FILE, parent=None):
+        super().__init__(parent)
+        self.db_config = db_config
+        self.online = True
+        self.queue = OfflineQueue(queue_path)
+        self.snapshot_path = snapshot_path
+        self._snapshot = None  # wczytywana leniwie (tylko gdy potrzebna offline)
+        self._local_names = None  # posortowane KodSL lokalnej kopii (unieważniane przy zmianach)
+        self._replayed = []  # KodSL odtworzone od przejścia w tryb offline
+        self._overwrite = set()  # KodSL z konfliktem, które użytkownik kazał nadpisać przy odtwarzaniu
+        self._pending = self.queue.read()
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._probe_task = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(db_config.get("offline_probe_interval_ms", OFFLINE_PROBE_INTERVAL_MS))
+        self._timer.timeout.connect(self.probe)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    # --- Połączenie ---
+
+    def connection(self):
+        """
+        Połączenie albo None. Offline zwraca None bez prób łączenia i okien błędów; w tryb offline
+        przełącza tylko utrata połączenia - błędna konfiguracja albo logowanie są zgłaszane jak dotąd.
+        """
+        if not self.online:
+            return None
+        try:
+            return open_db_connection(self.db_config)
+        except DBConfigError as ex:
+            report_error("Błąd Połączenia", str(ex))
+        except pyodbc.Error as ex:
+            if not self.handle_error(ex):
+                report_error("Błąd Połączenia SQL", f"Nie można nawiązać połączenia. SQL State: {ex.args[0]}")
+        return None
+
+    def handle_error(self, ex):
+        """Zwraca True, gdy błąd oznacza utratę połączenia (przejście w tryb offline)."""
+        if is_connection_error(ex):
+            self.set_offline()
+            return True
+        return False
+
+    def set_offline(self):
+        if self.online:
+            self.online = False
+            self.onlineChanged.emit(False)
+            self.message.emit("Brak połączenia z serwerem - tryb offline.")
+        self._timer.start()
+
+    def probe(self):
+        """Uruchamia sondę w tle (przy pracy online tylko odświeża lokalną kopię definicji)."""
+        if self._probe_task is not None:
+            return
+        self._probe_task = _ProbeTask(self.db_config, self.queue, self.snapshot_path, self._overwrite)
+        self._probe_task.signals.finished.connect(self._on_probe_finished)
+        self._probe_task.signals.conflict.connect(self._on_replay_conflict)
+        self._probe_task.signals.failed.connect(lambda error: self.message.emit(f"Sonda połączenia nieudana: {error}"))
+        self._pool.start(self._probe_task)
+
+    def _on_replay_conflict(self, kod_sl_list):
+        # Sonda zostaje "w toku" do decyzji - timer nie otworzy w tym czasie kolejnego okna.
+        choice = ask_conflict_resolution(self.parent(), kod_sl_list)
+        self._probe_task = None
+        if choice == CONFLICT_OVERWRITE:
+            self._overwrite.update(kod_sl_list)
+        elif choice == CONFLICT_RELOAD:
+            # Zmiany z kolejki odrzucone - widżety wczytają te KodSL z bazy po odtworzeniu reszty.
+            self.queue.discard(kod_sl_list)
+            self._pending = self.queue.read()
+            self._local_names = None
+            self.pendingChanged.emit(len(self._pending))
+            self._replayed.extend(kod_sl for kod_sl in kod_sl_list if kod_sl not in self._replayed)
+        else:
+            self.set_offline()  # zmiany czekają w kolejce; kolejna sonda zapyta ponownie
+            return
+        self.probe()
+
+    def _on_probe_finished(self, ok, replayed, definitions):
+        self._probe_task = None
+        if not ok:
+            if self.online and self._pending:
+                self.set_offline()
+            return
+        self._snapshot = definitions
+        self._overwrite.clear()
+        self._pending = self.queue.read()
+        self._local_names = None
+        self.pendingChanged.emit(len(self._pending))
+        self._replayed.extend(kod_sl for kod_sl in replayed if kod_sl not in self._replayed)
+        if self._pending:
+            # W trakcie odtwarzania dopisano kolejne zmiany - odtwarzamy je przed powrotem online.
+            self.probe()
+            return
+        self._timer.stop()
+        if not self.online:
+            self.online = True
+            self.onlineChanged.emit(True)
+            self.message.emit("Połączenie z serwerem przywrócone.")
+        # Już online - odbiorcy mogą od razu wczytać z bazy dane i tokeny wersji tych KodSL.
+        replayed, self._replayed = self._replayed, []
+        if replayed:
+            self.message.emit(f"Odtworzono kolejkę offline ({len(replayed)} składników).")
+            self.replayed.emit(replayed)
+
+    # --- Kolejka i lokalna kopia ---
+
+    def enqueue(self, changes=(), deleted_variants=(), versions=None):
+        records = [delete_record(kod_sl) for kod_sl in deleted_variants]
+        records.extend(change_record(kod_sl, parametr, wartosc) for kod_sl, parametr, wartosc in changes)
+        # Token wersji, na którym oparto zmianę, niesie pierwszy rekord KodSL w kolejce (dalsze
+        # zmiany offline opierają się już na poprzednich z kolejki).
+        queued = {record["KodSL"] for record in self._pending}
+        for record in records:
+            kod_sl = record["KodSL"]
+            if kod_sl not in queued:
+                queued.add(kod_sl)
+                if versions and kod_sl in versions:
+                    record["Wersja"] = encode_version(versions[kod_sl])
+        self.queue.append(records)
+        self._pending.extend(records)
+        self._local_names = None
+        self.set_offline()
+        self.pendingChanged.emit(len(self._pending))
+
+    def _loaded_snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = load_snapshot(self.snapshot_path)
+        return self._snapshot
+
+    def local_definitions(self):
+        """Lokalna kopia definicji z nałożonymi zmianami z kolejki."""
+        definitions = {kod_sl: dict(params) for kod_sl, params in self._loaded_snapshot().items()}
+        return apply_records(definitions, self._pending)
+
+    def local_parameters(self, kod_sl):
+        """Parametry jednego KodSL z lokalnej kopii (bez kopiowania całej migawki)."""
+        definitions = {kod_sl: dict(self._loaded_snapshot().get(kod_sl, {}))}
+        apply_records(definitions, [record for record in self._pending if record["KodSL"] == kod_sl])
+        return definitions.get(kod_sl, {})
+
+    def local_kodsl_page(self, after_kod_sl, page_size):
+        if self._local_names is None:
+            self._local_names = sorted(self.local_definitions())
+        start = 0 if after_kod_sl is None else bisect.bisect_right(self._local_names, after_kod_sl)
+        return self._local_names[start:start + page_size]
+
+
+_manager = None
+
+
+def set_offline_manager(manager):
+    global _manager
+    _manager = manager
+
+
+def offline_manager():
+    return _manager
+
+
+def is_offline():
+    return _manager is not None and not _manager.online
+
+
+def open_connection(db_config):
+    """Połączenie dla widżetów: przez menedżera offline (None offline, bez okien) albo zwykłe."""
+    if _manager is not None:
+        return _manager.connection()
+    return get_db_connection(db_config)
+
+
+def run_db_job(db_config, name, work, priority, on_result, on_error):
+    """
+    Wykonuje work(conn) na osobnym połączeniu: w MainApp jako zadanie w tle (job_scheduler),
+    poza nim (benchmarki) albo offline - od razu. on_result(wynik) i on_error(wyjątek) są wołane
+    w wątku GUI; bez połączenia (offline albo nieudane otwarcie, już zgłoszone) - on_error(None).
+    """
+    scheduler = job_scheduler()
+    if scheduler is not None and not is_offline():
+        def job(token, progress):
+            conn = open_db_connection(db_config)
+            try:
+                return work(conn)
+            finally:
+                conn.close()
+
+        scheduler.submit(name, job, priority, on_result=on_result, on_error=on_error)
+        return
+
+    conn = open_connection(db_config)
+    if not conn:
+        on_error(None)
+        return
+    try:
+        result, error = work(conn), None
+    except (pyodbc.Error, ConflictError) as ex:
+        result, error = None, ex
+    finally:
+        conn.close()
+    if error is not None:
+        on_error(error)
+    else:
+        on_result(result)
+
+
+def queue_offline_changes(changes=(), deleted_variants=(), versions=None):
+    """
+    Offline dopisuje zmiany do kolejki i zwraca True; online (albo bez menedżera) zwraca False.
+    versions - {KodSL: token wersji} z chwili odczytu, sprawdzane przy odtwarzaniu kolejki.
+    """
+    if not is_offline():
+        return False
+    _manager.enqueue(changes, deleted_variants, versions)
+    return True
+
+
+def handle_connection_error(ex):
+    """True, gdy ex to utrata połączenia - aplikacja przechodzi wtedy w tryb offline."""
+    return _manager is not None and _manager.handle_error(ex)
@@ -0,0 +1,148 @@
+# porownanie.py
+"""
+Szybkie porównanie definicji składników (wer_t_Skladniki_Parametry) między dwiema bazami
+migracyjnymi - drzewo skrótów (Merkle) liczone po stronie serwera, bez zależności od Qt.
+
+1. Każdy bieżący wiersz (bez dat) dostaje 64-bitowy skrót HASHBYTES('MD5', KodSL|Parametr|Wartosc),
+   a każdy KodSL - kubełek z HASHBYTES('MD5', KodSL). Serwer zwraca dla każdego kubełka
+   (liczba wierszy, suma skrótów) - suma nie zależy od kolejności wierszy.
+2. Tylko dla kubełków, które się różnią, pobierane są skróty per KodSL.
+3. Tylko dla KodSL, które się różnią, pobierane są wiersze - i z nich lista różnic komórek.
+
+Dla identycznych baz przesyłane jest tylko N_BUCKETS krótkich wierszy z każdej strony.
+"""
+
+from collections import OrderedDict, namedtuple
+
+from db_utils import ALL_EXPECTED_HEADERS
+from skladniki_db import CHANGES_BATCH_SIZE, fetch_variant_parameters, normalize_value
+from wiele_baz import fan_out
+
+N_BUCKETS = 1024  # najwyżej 65536 (kubełek to pierwsze 2 bajty skrótu KodSL)
+
+_KODSL_TEXT = "CAST(KodSL AS NVARCHAR(100))"
+_BUCKET_SQL = f"CAST(CAST(HASHBYTES('MD5', {_KODSL_TEXT}) AS BINARY(2)) AS INT) % ?"
+_ROW_HASH_SQL = (
+    f"CAST(CAST(HASHBYTES('MD5', CONCAT({_KODSL_TEXT}, N'|', Parametr, N'|', "
+    f"LOWER(LTRIM(RTRIM(Wartosc))))) AS BINARY(8)) AS BIGINT)"
+)
+_HASHED_ROWS_SQL = f"""
+    SELECT KodSL, {_BUCKET_SQL} AS Kubelek, {_ROW_HASH_SQL} AS Skrot
+    FROM dbo.wer_t_Skladniki_Parametry
+    WHERE Data_Od IS NULL AND Data_Do IS NULL
+"""
+
+# only_left / only_right - KodSL obecne tylko w jednej bazie,
+# different - {KodSL: [(Parametr, wartość lewa, wartość prawa), ...]},
+# stats - liczniki przesłanych danych (ComparisonStats).
+ComparisonResult = namedtuple("ComparisonResult", ["only_left", "only_right", "different", "stats"])
+
+
+class ComparisonStats:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.different_buckets = 0
+        self.compared_kodsl = 0
+        self.different_kodsl = 0
+
+    def __str__(self):
+        return (f"kubełki: {self.different_buckets}/{self.buckets} różnych, "
+                f"skróty KodSL pobrane dla {self.compared_kodsl}, wiersze pobrane dla {self.different_kodsl} KodSL")
+
+
+def _on_both(targets, task):
+    """Wykonuje task równolegle na obu bazach; błąd którejkolwiek jest zgłaszany dalej."""
+    results = fan_out(targets, task)
+    for target_result in results:
+        if target_result.error is not None:
+            raise target_result.error
+    return [target_result.result for target_result in results]
+
+
+def fetch_bucket_hashes(conn, n_buckets=N_BUCKETS):
+    """{kubełek: (liczba wierszy, suma skrótów)} dla całej tabeli."""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT Kubelek, COUNT(*), SUM(CAST(Skrot AS DECIMAL(38, 0)))
+        FROM ({_HASHED_ROWS_SQL}) AS h
+        GROUP BY Kubelek
+    """, (n_buckets,))
+    return {bucket: (count, digest) for bucket, count, digest in cursor.fetchall()}
+
+
+def fetch_kodsl_hashes(conn, buckets, n_buckets=N_BUCKETS):
+    """{KodSL: (liczba wierszy, suma skrótów)} dla KodSL z podanych kubełków."""
+    buckets = sorted(buckets)
+    hashes = {}
+    cursor = conn.cursor()
+    for start in range(0, len(buckets), CHANGES_BATCH_SIZE):
+        batch = buckets[start:start + CHANGES_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f"""
+            SELECT KodSL, COUNT(*), SUM(CAST(Skrot AS DECIMAL(38, 0)))
+            FROM ({_HASHED_ROWS_SQL}) AS h
+            WHERE Kubelek IN ({placeholders})
+            GROUP BY KodSL
+        """, [n_buckets] + batch)
+        hashes.update((kod_sl, (count, digest)) for kod_sl, count, digest in cursor.fetchall())
+    return hashes
+
+
+def _fetch_parameters(conn, kod_sl_list):
+    parameters = {}
+    for start in range(0, len(kod_sl_list), CHANGES_BATCH_SIZE):
+        parameters.update(fetch_variant_parameters(conn, kod_sl_list[start:start + CHANGES_BATCH_SIZE]))
+    return parameters
+
+
+def _differing_keys(left, right):
+    return {key for key in left.keys() | right.keys() if left.get(key) != right.get(key)}
+
+
+def compare_definitions(left_target, right_target, n_buckets=N_BUCKETS):
+    """Porównuje definicje składników dwóch baz (konfiguracje z db_utils.load_targets)."""
+    if not 1 <= n_buckets <= 65536:
+        raise ValueError(f"Liczba kubełków musi być z zakresu 1-65536 (podano {n_buckets}).")
+    targets = [left_target, right_target]
+    stats = ComparisonStats(n_buckets)
+
+    left_buckets, right_buckets = _on_both(targets, lambda t, conn: fetch_bucket_hashes(conn, n_buckets))
+    buckets = _differing_keys(left_buckets, right_buckets)
+    stats.different_buckets = len(buckets)
+    if not buckets:
+        return ComparisonResult([], [], OrderedDict(), stats)
+
+    left_kodsl, right_kodsl = _on_both(targets, lambda t, conn: fetch_kodsl_hashes(conn, buckets, n_buckets))
+    stats.compared_kodsl = len(left_kodsl.keys() | right_kodsl.keys())
+    only_left = sorted(left_kodsl.keys() - right_kodsl.keys())
+    only_right = sorted(right_kodsl.keys() - left_kodsl.keys())
+    changed = sorted(kod_sl for kod_sl in left_kodsl.keys() & right_kodsl.keys()
+                     if left_kodsl[kod_sl] != right_kodsl[kod_sl])
+    stats.different_kodsl = len(changed)
+
+    different = OrderedDict()
+    if changed:
+        left_params, right_params = _on_both(targets, lambda t, conn: _fetch_parameters(conn, changed))
+        parameters = list(ALL_EXPECTED_HEADERS) + sorted(
+            {p for kod_sl in changed for p in (*left_params[kod_sl], *right_params[kod_sl])}
+            - set(ALL_EXPECTED_HEADERS))
+        for kod_sl in changed:
+            cells = [(param, left_params[kod_sl].get(param, ""), right_params[kod_sl].get(param, ""))
+                     for param in parameters]
+            cells = [(param, left, right) for param, left, right in cells
+                     if normalize_value(left) != normalize_value(right) or
+                     (param not in ALL_EXPECTED_HEADERS and left != right)]
+            if cells:  # sam skrót mógł się różnić przez zdublowane wiersze
+                different[kod_sl] = cells
+    return ComparisonResult(only_left, only_right, different, stats)
+
+
+def format_comparison(result, left_name, right_name):
+    lines = [f"Porównanie {left_name} <-> {right_name}: tylko w {left_name}: {len(result.only_left)}, "
+             f"tylko w {right_name}: {len(result.only_right)}, różne definicje: {len(result.different)} "
+             f"({result.stats})."]
+    lines.extend(f"< {kod_sl}" for kod_sl in result.only_left)
+    lines.extend(f"> {kod_sl}" for kod_sl in result.only_right)
+    for kod_sl, cells in result.different.items():
+        lines.append(f"~ {kod_sl}: " + ", ".join(f"{param}: '{left}' / '{right}'" for param, left, right in cells))
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+# probkowanie.py
+"""
+Szybka weryfikacja na losowej próbie pracowników (bez zależności od Qt).
+
+Pracownicy są dzieleni na warstwy według tego, jak rzadki jest ich najrzadszy KodSL (rzadkie
+składniki to najczęstsze źródło błędnych definicji, więc każda klasa ma w próbie swoich
+przedstawicieli) i - gdy ustawiono weryfikacja_zrodlo_umow - według rodzaju umowy. Z każdej
+warstwy losowanych jest proporcjonalnie tylu pracowników, ilu wymaga wielkość próby (co najmniej
+MIN_PER_STRATUM, jeśli próba na to pozwala), a weryfikacja obejmuje tylko ich wiersze źródłowe.
+
+Wynik to oszacowanie dla całej bazy: odsetek pracowników z rozbieżnością (ogółem i według typu)
+z przedziałem ufności Wilsona dla estymatora warstwowego oraz szacowana liczba rozbieżności.
+To samo ziarno i ta sama wielkość próby dają tę samą próbę (przy niezmienionym źródle), więc po
+poprawce definicji można sprawdzić dokładnie tych samych pracowników.
+"""
+
+import math
+import random
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from statistics import NormalDist
+
+from skladniki_db import fetch_all_parameters
+from weryfikacja import (
+    TYP_BRAK_DEFINICJI, TYP_PODSTAWA, VerificationStats, fetch_contract_types, fetch_rarest_component_usage,
+    fetch_source_values, run_verification
+)
+
+DEFAULT_SAMPLE_PERCENT = 1.0
+DEFAULT_CONFIDENCE = 0.95
+MIN_PER_STRATUM = 2
+SAMPLE_CHUNK_SIZE = 1000  # parametrów IN w jednym zapytaniu (SQL Server przyjmuje do 2100)
+MAX_SEED = 10 ** 6
+
+# Klasy rzadkości najrzadszego KodSL pracownika: (górna granica udziału pracowników, etykieta).
+USAGE_CLASSES = [
+    (0.01, "rzadki KodSL (<1% pracowników)"),
+    (0.10, "nietypowy KodSL (1-10%)"),
+    (0.50, "częsty KodSL (10-50%)"),
+    (1.00, "powszechne KodSL (>50%)"),
+]
+NO_COMPONENTS = "bez składników"
+
+Stratum = namedtuple("Stratum", ["key", "population", "sampled", "with_discrepancies"])
+Estimate = namedtuple("Estimate", ["label", "value", "low", "high"])
+
+
+class SampleResult:
+    def __init__(self, seed, population, sample, strata, stats, discrepancies, estimates, totals, confidence,
+                 seconds):
+        self.seed = seed
+        self.population = population
+        self.sample = sample
+        self.strata = strata
+        self.stats = stats
+        self.discrepancies = discrepancies
+        self.estimates = estimates
+        self.totals = totals
+        self.confidence = confidence
+        self.seconds = seconds
+
+
+def usage_class(usage, employees):
+    """Etykieta klasy rzadkości dla liczby pracowników z danym KodSL (None - brak składników)."""
+    if usage is None or not employees:
+        return NO_COMPONENTS
+    share = usage / employees
+    for limit, label in USAGE_CLASSES:
+        if share < limit:
+            return label
+    return USAGE_CLASSES[-1][1]
+
+
+def build_strata(employees, rarest_usage, contract_types):
+    """Warstwy (klasa rzadkości, rodzaj umowy) -> lista pracowników; kolejność warstw stała."""
+    strata = defaultdict(list)
+    for pracownik in employees:
+        key = (usage_class(rarest_usage.get(pracownik), len(employees)), contract_types.get(pracownik, ""))
+        strata[key].append(pracownik)
+    return OrderedDict((key, strata[key]) for key in sorted(strata, key=str))
+
+
+def sample_size(population, percent=DEFAULT_SAMPLE_PERCENT, size=None):
+    """Wielkość próby: size albo percent% populacji (co najmniej 1, nie więcej niż populacja)."""
+    wanted = size if size is not None else math.ceil(population * percent / 100)
+    return max(0, min(population, max(1, wanted)))
+
+
+def allocate_sample(sizes, total):
+    """
+    Przydział total pracowników do warstw o licznościach sizes (słownik klucz -> liczność):
+    najpierw MIN_PER_STRATUM w każdej warstwie (gdy próba na to pozwala), reszta proporcjonalnie
+    metodą największych reszt.
+    """
+    total = min(total, sum(sizes.values()))
+    base = {key: min(MIN_PER_STRATUM, size) for key, size in sizes.items()}
+    if sum(base.values()) > total:
+        base = {key: 0 for key in sizes}
+    capacity = {key: sizes[key] - base[key] for key in sizes}
+    rest = total - sum(base.values())
+    free = sum(capacity.values())
+    quotas = {key: rest * capacity[key] / free if free else 0 for key in sizes}
+    allocation = {key: base[key] + int(quotas[key]) for key in sizes}
+    leftover = total - sum(allocation.values())
+    for key in sorted(sizes, key=lambda k: quotas[k] - int(quotas[k]), reverse=True)[:leftover]:
+        allocation[key] = min(sizes[key], allocation[key] + 1)
+    return allocation
+
+
+def draw_sample(strata, total, seed):
+    """Losuje próbę warstwową; zwraca słownik klucz warstwy -> wylosowani pracownicy."""
+    rnd = random.Random(seed)
+    allocation = allocate_sample({key: len(members) for key, members in strata.items()}, total)
+    return OrderedDict(
+        (key, rnd.sample(sorted(members, key=str), allocation[key])) for key, members in strata.items()
+    )
+
+
+def _stratified_mean(groups):
+    """Średnia warstwowa i jej wariancja (z poprawką na skończoną populację); groups: (N_h, wartości)."""
+    population = sum(size for size, _ in groups)
+    mean = variance = 0.0
+    for size, values in groups:
+        if not values:
+            continue
+        weight = size / population
+        n = len(values)
+        group_mean = sum(values) / n
+        mean += weight * group_mean
+        if n > 1:
+            spread = sum((value - group_mean) ** 2 for value in values) / (n - 1)
+            variance += weight ** 2 * (1 - n / size) * spread / n
+    return mean, variance
+
+
+def _wilson(proportion, variance, n, z):
+    """Przedział Wilsona dla odsetka z efektywną liczebnością próby warstwowej."""
+    if n == 0:
+        return 0.0, 1.0
+    effective = proportion * (1 - proportion) / variance if variance > 0 else n
+    center = (proportion + z * z / (2 * effective)) / (1 + z * z / effective)
+    half = z / (1 + z * z / effective) * math.sqrt(
+        proportion * (1 - proportion) / effective + z * z / (4 * effective * effective)
+    )
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate(strata, sample, counts, confidence=DEFAULT_CONFIDENCE):
+    """
+    Oszacowania dla populacji na podstawie próby: counts[pracownik][typ] - liczba rozbieżności
+    wylosowanego pracownika. Zwraca (odsetki pracowników jako Estimate, szacowana liczba rozbieżności).
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    n = sum(len(members) for members in sample.values())
+
+    def groups(value):
+        return [(len(strata[key]), [value(counts.get(p, {})) for p in sample[key]]) for key in strata]
+
+    estimates = []
+    indicators = [("pracownicy z rozbieżnością", None)] + [(f"z rozbieżnością {typ}", typ)
+                                                           for typ in (TYP_PODSTAWA, TYP_BRAK_DEFINICJI)]
+    for label, typ in indicators:
+        proportion, variance = _stratified_mean(groups(lambda c: 1.0 if (c.get(typ) if typ else c) else 0.0))
+        estimates.append(Estimate(label, proportion, *_wilson(proportion, variance, n, z)))
+
+    population = sum(len(members) for members in strata.values())
+    mean, variance = _stratified_mean(groups(lambda c: float(sum(c.values()))))
+    half = z * math.sqrt(variance)
+    totals = Estimate("rozbieżności", mean * population, max(0.0, mean - half) * population,
+                      (mean + half) * population)
+    return estimates, totals
+
+
+def run_sample_verification(conn, db_config, definitions=None, percent=DEFAULT_SAMPLE_PERCENT, size=None,
+                            seed=None, confidence=DEFAULT_CONFIDENCE, stats=None, wrap_rows=None, progress=None):
+    """
+    Weryfikacja losowej próby pracowników. seed=None losuje ziarno (jest w wyniku, żeby można było
+    powtórzyć próbę). progress(opis) - opcjonalne komunikaty o etapach. Zwraca SampleResult.
+    """
+    started = time.perf_counter()
+    report = progress or (lambda message: None)
+    if seed is None:
+        seed = random.SystemRandom().randrange(MAX_SEED)
+    if definitions is None:
+        definitions = fetch_all_parameters(conn, db_config=db_config)
+
+    report("wyznaczanie warstw próby")
+    employees = fetch_source_values(conn, db_config, "Pracownik")
+    strata = build_strata(employees, fetch_rarest_component_usage(conn, db_config),
+                          fetch_contract_types(conn, db_config))
+    sample = draw_sample(strata, sample_size(len(employees), percent, size), seed)
+    sampled = sorted((p for members in sample.values() for p in members), key=str)
+
+    report(f"weryfikacja próby {len(sampled)} z {len(employees)} pracowników")
+    stats = stats if stats is not None else VerificationStats()
+    discrepancies = []
+    counts = defaultdict(lambda: defaultdict(int))
+    for start in range(0, len(sampled), SAMPLE_CHUNK_SIZE):
+        chunk = sampled[start:start + SAMPLE_CHUNK_SIZE]
+        condition = f"Pracownik IN ({', '.join('?' * len(chunk))})"
+        for row in run_verification(conn, db_config, definitions, [condition], chunk, stats, wrap_rows):
+            discrepancies.append(row)
+            counts[row.Pracownik][row.Typ] += 1
+
+    estimates, totals = estimate(strata, sample, counts, confidence)
+    summary = [
+        Stratum(key, len(strata[key]), len(sample[key]), sum(1 for p in sample[key] if p in counts))
+        for key in strata
+    ]
+    return SampleResult(seed, len(employees), len(sampled), summary, stats, discrepancies, estimates, totals,
+                        confidence, time.perf_counter() - started)
+
+
+def _percent(value):
+    return f"{value * 100:.2f}%"
+
+
+def format_sample_result(result):
+    level = f"{result.confidence * 100:g}%"
+    lines = [
+        f"Próba {result.sample} z {result.population} pracowników (ziarno {result.seed}, "
+        f"{len(result.strata)} warstw, {result.seconds:.1f} s): {result.stats}.",
+        f"Szacunek dla całej bazy (przedział ufności {level}):",
+    ]
+    for item in result.estimates:
+        lines.append(f"  {item.label}: {_percent(item.value)} ({_percent(item.low)} - {_percent(item.high)}), "
+                     f"ok. {item.value * result.population:.0f} pracowników")
+    totals = result.totals
+    lines.append(f"  liczba rozbieżności: ok. {totals.value:.0f} ({totals.low:.0f} - {totals.high:.0f})")
+    lines.append("Warstwy (klasa KodSL / rodzaj umowy: w próbie / w bazie, z rozbieżnością):")
+    for stratum in result.strata:
+        usage, contract = stratum.key
+        name = f"{usage} / {contract}" if contract != "" else usage
+        lines.append(f"  {name}: {stratum.sampled} / {stratum.population}, {stratum.with_discrepancies}")
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+# raport.py
+"""
+Strumieniowy zapis raportów rozbieżności do CSV lub XLSX (bez zależności od Qt).
+
+Wiersze są zapisywane jeden po drugim wprost ze strumienia weryfikacji - pamięć nie rośnie
+z liczbą wierszy. XLSX jest pisany w trybie write-only openpyxl (wiersze trafiają od razu do
+pliku tymczasowego); arkusz ma limit 1 048 576 wierszy, więc dłuższy raport jest dzielony na
+kolejne arkusze. Opcjonalne podsumowanie (liczba rozbieżności i suma różnic w grupach
+podstawa / KodSL) jest liczone w locie - w pamięci są tylko sumy grup.
+"""
+
+import csv
+import os
+from collections import defaultdict
+from decimal import Decimal
+
+from db_utils import HEADER_MAPPING
+from weryfikacja import REPORT_COLUMNS
+
+CSV_DELIMITER = ";"
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+
+DATA_SHEET = "Rozbieznosci"
+SUMMARY_SHEET = "Podsumowanie"
+SUMMARY_COLUMNS = ["Podstawa", "KodSL", "Liczba", "SumaRoznic"]
+SUMMARY_SUFFIX = "_podsumowanie"
+XLSX_MAX_ROWS = 1048576
+NO_BASE_LABEL = "(brak definicji)"
+
+
+class ReportError(Exception):
+    """Błąd zapisu raportu (nieznany format, brak openpyxl)."""
+
+
+def detect_report_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".xlsx":
+        return FORMAT_XLSX
+    if extension in (".csv", ".txt"):
+        return FORMAT_CSV
+    raise ReportError(f"Nieznany format raportu '{path}' - użyj rozszerzenia .csv lub .xlsx.")
+
+
+def _require_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ReportError("Raport XLSX wymaga pakietu openpyxl (python -m pip install openpyxl).")
+    return openpyxl
+
+
+def base_label(parametr):
+    """Nazwa podstawy do raportu (HEADER_MAPPING, w jednej linii)."""
+    if not parametr:
+        return NO_BASE_LABEL
+    return HEADER_MAPPING.get(parametr, parametr).replace("\n", "")
+
+
+class GroupTotals:
+    """Liczba rozbieżności i suma różnic w grupach (podstawa, KodSL), liczone w locie."""
+
+    def __init__(self, columns=REPORT_COLUMNS):
+        self._parametr = columns.index("Parametr")
+        self._kod_sl = columns.index("KodSL")
+        self._roznica = columns.index("Roznica")
+        self._groups = defaultdict(lambda: [0, Decimal(0)])
+
+    def add(self, row):
+        group = self._groups[(row[self._parametr], row[self._kod_sl])]
+        group[0] += 1
+        if row[self._roznica] is not None:
+            group[1] += row[self._roznica]
+
+    def rows(self):
+        """Wiersze podsumowania (SUMMARY_COLUMNS), posortowane po podstawie i KodSL."""
+        for (parametr, kod_sl), (count, total) in sorted(self._groups.items()):
+            yield base_label(parametr), kod_sl, count, total
+
+
+def _tracked(rows, totals):
+    for row in rows:
+        totals.add(row)
+        yield row
+
+
+def write_csv_report(path, rows, columns=REPORT_COLUMNS):
+    """Zapisuje wiersze do CSV strumieniowo (wiersz po wierszu); zwraca liczbę wierszy."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=CSV_DELIMITER)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(["" if value is None else value for value in row])
+            count += 1
+    return count
+
+
+def write_xlsx_report(path, rows, columns=REPORT_COLUMNS, summary=None):
+    """
+    Zapisuje wiersze do XLSX w trybie write-only (kolejne arkusze po XLSX_MAX_ROWS wierszy);
+    summary - opcjonalne wiersze podsumowania (dopisywane jako ostatni arkusz).
+    Zwraca liczbę wierszy danych.
+    """
+    openpyxl = _require_openpyxl()
+    workbook = openpyxl.Workbook(write_only=True)
+    count = 0
+    sheet = None
+    sheet_rows = XLSX_MAX_ROWS
+    for row in rows:
+        if sheet_rows >= XLSX_MAX_ROWS:
+            sheet_number = len(workbook.worksheets) + 1
+            sheet = workbook.create_sheet(DATA_SHEET if sheet_number == 1 else f"{DATA_SHEET} ({sheet_number})")
+            sheet.append(columns)
+            sheet_rows = 1
+        sheet.append(row)
+        sheet_rows += 1
+        count += 1
+    if sheet is None:
+        workbook.create_sheet(DATA_SHEET).append(columns)
+    if summary is not None:
+        summary_sheet = workbook.create_sheet(SUMMARY_SHEET)
+        summary_sheet.append(SUMMARY_COLUMNS)
+        for summary_row in summary():
+            summary_sheet.append(summary_row)
+    workbook.save(path)
+    return count
+
+
+def summary_path(path):
+    """Plik podsumowania obok raportu CSV: raport.csv -> raport_podsumowanie.csv."""
+    root, extension = os.path.splitext(path)
+    return root + SUMMARY_SUFFIX + extension
+
+
+def write_report(path, rows, columns=REPORT_COLUMNS, fmt=None, group_totals=False):
+    """
+    Zapisuje raport rozbieżności w formacie z rozszerzenia pliku (albo fmt).
+    group_totals=True dokłada podsumowanie w grupach podstawa / KodSL: w XLSX jako arkusz
+    SUMMARY_SHEET, w CSV jako osobny plik (summary_path). Zwraca liczbę wierszy danych.
+    """
+    fmt = detect_report_format(path, fmt)
+    if fmt == FORMAT_XLSX:
+        _require_openpyxl()  # przed zużyciem strumienia
+    totals = GroupTotals(columns) if group_totals else None
+    if totals is not None:
+        rows = _tracked(rows, totals)
+
+    if fmt == FORMAT_CSV:
+        count = write_csv_report(path, rows, columns)
+        if totals is not None:
+            write_csv_report(summary_path(path), totals.rows(), SUMMARY_COLUMNS)
+        return count
+    if fmt == FORMAT_XLSX:
+        return write_xlsx_report(path, rows, columns, totals.rows if totals is not None else None)
+    raise ReportError(f"Nieobsługiwany format raportu: {fmt}")
@@ -0,0 +1,377 @@
+# results_widget.py
+"""
+Zakładka "Wyniki": przeglądarka rozbieżności zapisanych w dbo.wer_t_Wyniki_Weryfikacji.
+
+Przebieg może mieć miliony wierszy, więc widok nie trzyma ich w QTableWidget: ResultsModel
+doczytuje strony (wyniki_db.fetch_results_page, paginacja kluczem) dopiero przy przewijaniu,
+a filtry i sortowanie liczy serwer. Panel "Wyjaśnienie" pokazuje wyprowadzenie podstaw
+zaznaczonego pracownika w okresie - liczone dopiero po otwarciu panelu, tylko dla tego wiersza.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+import pyodbc
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QDoubleValidator
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QComboBox, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QMessageBox, QPlainTextEdit,
+    QPushButton, QSplitter, QTableView, QVBoxLayout, QWidget
+)
+
+from db_utils import ALL_EXPECTED_HEADERS, load_db_config, load_targets, open_db_connection
+from job_scheduler import PRIORITY_INTERACTIVE, job_scheduler
+from offline_manager import open_connection
+from weryfikacja import TYP_BRAK_DEFINICJI, explain_period, parameter_label
+from wyniki_db import (
+    BROWSER_COLUMNS, RESULT_SORTS, RESULTS_PAGE_SIZE, ResultsFilter, count_results, fetch_results_page,
+    fetch_runs, has_results_browser, page_key
+)
+
+# (nagłówek, kolumna z BROWSER_COLUMNS)
+DISPLAY_COLUMNS = [
+    ("Pracownik", "Pracownik"), ("Okres", "Okres"), ("Podstawa", "Parametr"), ("KodSL", "KodSL"),
+    ("Oczekiwana", "Oczekiwana"), ("Naliczona", "Naliczona"), ("Różnica", "Roznica"), ("Typ", "Typ"),
+    ("Źródło", "Zrodlo"),
+]
+_AMOUNT_COLUMNS = {"Oczekiwana", "Naliczona", "Roznica"}
+_ALL_BASES = "Wszystkie podstawy"
+_MISSING_DEFINITION = "Brak definicji"
+
+
+def _source_config(db_config, zrodlo):
+    """Konfiguracja bazy, z której pochodzi wiersz (kolumna Zrodlo: nazwa celu albo migration_db)."""
+    for target in load_targets(db_config):
+        if zrodlo and zrodlo in (target["name"], target.get("migration_db")):
+            return target
+    return db_config
+
+
+class ResultsModel(QAbstractTableModel):
+    """
+    Wyniki jednego przebiegu doczytywane stronami: widok woła canFetchMore/fetchMore przy
+    przewinięciu do końca załadowanej części, każda strona to jedno zapytanie po indeksie.
+    """
+    loadError = pyqtSignal(str)
+
+    def __init__(self, connection_factory, page_size=RESULTS_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.connection_factory = connection_factory
+        self.page_size = page_size
+        self.results_filter = None
+        self.sort = next(iter(RESULT_SORTS.values()))
+        self.rows = []
+        self._has_more = False
+        self._columns = [BROWSER_COLUMNS.index(column) for _, column in DISPLAY_COLUMNS]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(DISPLAY_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = DISPLAY_COLUMNS[index.column()][1]
+        if role == Qt.DisplayRole:
+            value = self.rows[index.row()][self._columns[index.column()]]
+            if value is None:
+                return ""
+            if column in _AMOUNT_COLUMNS:
+                return f"{Decimal(str(value)):.2f}"
+            if column == "Parametr":
+                return parameter_label(value)
+            return str(value)
+        if role == Qt.TextAlignmentRole and column in _AMOUNT_COLUMNS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return DISPLAY_COLUMNS[section][0]
+        return None
+
+    def row_value(self, row, column):
+        return self.rows[row][BROWSER_COLUMNS.index(column)]
+
+    def set_query(self, results_filter, sort):
+        """Nowy filtr/sortowanie: czyści model i pobiera pierwszą stronę."""
+        self.beginResetModel()
+        self.results_filter = results_filter
+        self.sort = sort
+        self.rows = []
+        self._has_more = results_filter is not None
+        self.endResetModel()
+        self.fetchMore()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+
+        after = page_key(self.rows[-1], self.sort) if self.rows else None
+        conn = self.connection_factory()
+        if not conn:
+            self._has_more = False
+            return
+        try:
+            page = fetch_results_page(conn, self.results_filter, self.sort, after, self.page_size)
+        except pyodbc.Error as ex:
+            self._has_more = False
+            self.loadError.emit(str(ex))
+            return
+        finally:
+            conn.close()
+
+        self._has_more = len(page) == self.page_size
+        if not page:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+
+class ResultsWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.db_config = load_db_config()
+        self._runs_loaded = False
+        self._pending_run = None
+        self._explained_key = None
+        self._count_job = None
+
+        layout = QVBoxLayout(self)
+
+        run_layout = QHBoxLayout()
+        run_layout.addWidget(QLabel("Przebieg:"))
+        self.run_combo = QComboBox()
+        self.run_combo.setMinimumWidth(450)
+        self.run_combo.currentIndexChanged.connect(self.apply_filters)
+        run_layout.addWidget(self.run_combo)
+        refresh_btn = QPushButton("Odśwież")
+        refresh_btn.clicked.connect(self.load_runs)
+        run_layout.addWidget(refresh_btn)
+        run_layout.addStretch()
+        self.count_label = QLabel()
+        run_layout.addWidget(self.count_label)
+        layout.addLayout(run_layout)
+
+        filter_layout = QHBoxLayout()
+        self.kod_sl_edit = QLineEdit()
+        self.kod_sl_edit.setPlaceholderText("KodSL (początek)")
+        self.base_combo = QComboBox()
+        self.base_combo.addItem(_ALL_BASES, None)
+        for header in ALL_EXPECTED_HEADERS:
+            self.base_combo.addItem(parameter_label(header), header)
+        self.base_combo.addItem(_MISSING_DEFINITION, TYP_BRAK_DEFINICJI)
+        self.min_difference_edit = QLineEdit()
+        self.min_difference_edit.setPlaceholderText("|różnica| od")
+        self.min_difference_edit.setValidator(QDoubleValidator(0, 1e15, 2))
+        self.pracownik_edit = QLineEdit()
+        self.pracownik_edit.setPlaceholderText("Pracownik")
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(list(RESULT_SORTS))
+        filter_btn = QPushButton("Filtruj")
+        filter_btn.clicked.connect(self.apply_filters)
+        for edit in (self.kod_sl_edit, self.min_difference_edit, self.pracownik_edit):
+            edit.returnPressed.connect(self.apply_filters)
+        self.sort_combo.currentIndexChanged.connect(self.apply_filters)
+        self.base_combo.currentIndexChanged.connect(self.apply_filters)
+        for widget in (self.kod_sl_edit, self.base_combo, self.min_difference_edit, self.pracownik_edit):
+            filter_layout.addWidget(widget)
+        filter_layout.addWidget(QLabel("Sortuj:"))
+        filter_layout.addWidget(self.sort_combo)
+        filter_layout.addWidget(filter_btn)
+        self.explain_btn = QPushButton("Wyjaśnienie")
+        self.explain_btn.setCheckable(True)
+        self.explain_btn.toggled.connect(self.toggle_explanation)
+        filter_layout.addWidget(self.explain_btn)
+        layout.addLayout(filter_layout)
+
+        self.model = ResultsModel(self.get_db_connection,
+                                  self.db_config.get("results_page_size", RESULTS_PAGE_SIZE), parent=self)
+        self.model.loadError.connect(
+            lambda message: QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu wyników: {message}")
+        )
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.view.verticalHeader().hide()
+        self.view.selectionModel().selectionChanged.connect(self._on_selection_changed)
+
+        self.explanation = QPlainTextEdit()
+        self.explanation.setReadOnly(True)
+        self.explanation.hide()
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.view)
+        splitter.addWidget(self.explanation)
+        splitter.setSizes([1100, 600])
+        layout.addWidget(splitter)
+
+    def get_db_connection(self):
+        return open_connection(self.db_config)
+
+    def showEvent(self, event):
+        # Lista przebiegów jest pobierana dopiero przy pierwszym otwarciu zakładki.
+        super().showEvent(event)
+        if not self._runs_loaded:
+            self.load_runs()
+
+    def load_runs(self):
+        """Pobiera listę przebiegów i zaznacza poprzedni (albo ostatnio zapisany przez show_run)."""
+        conn = self.get_db_connection()
+        if not conn:
+            return
+        try:
+            if not has_results_browser(conn):
+                self.count_label.setText("Brak tabeli wyników w wersji 5 - uruchom: weryfikator_cli.py schemat --zainstaluj")
+                return
+            runs = fetch_runs(conn)
+        except pyodbc.Error as ex:
+            QMessageBox.critical(self, "Błąd SQL", f"Błąd odczytu przebiegów: {ex}")
+            return
+        finally:
+            conn.close()
+        self._runs_loaded = True
+
+        selected = self._pending_run or self.run_combo.currentData()
+        self._pending_run = None
+        self.run_combo.blockSignals(True)
+        self.run_combo.clear()
+        for run_id, zrodlo, zapisano, count in runs:
+            label = f"{zapisano:%Y-%m-%d %H:%M}" if hasattr(zapisano, "strftime") else str(zapisano)
+            self.run_combo.addItem(f"{label}  {zrodlo or ''}  ({count} wierszy)  {run_id}", str(run_id))
+        index = self.run_combo.findData(selected) if selected else -1
+        self.run_combo.setCurrentIndex(max(index, 0) if runs else -1)
+        self.run_combo.blockSignals(False)
+        self.apply_filters()
+
+    def show_run(self, run_id):
+        """SLOT: Nowy przebieg zapisany w bazie (zakładka "Weryfikacja") - odświeża listę i go zaznacza."""
+        self._pending_run = run_id
+        if self._runs_loaded:
+            self.load_runs()
+
+    def current_filter(self):
+        run_id = self.run_combo.currentData()
+        if run_id is None:
+            return None
+        base = self.base_combo.currentData()
+        try:
+            min_difference = Decimal(self.min_difference_edit.text().replace(",", ".").strip())
+        except InvalidOperation:  # puste pole albo niedokończona liczba
+            min_difference = None
+        return ResultsFilter(
+            run_id=run_id,
+            kod_sl=self.kod_sl_edit.text().strip() or None,
+            parametr=base if base in ALL_EXPECTED_HEADERS else None,
+            typ=base if base == TYP_BRAK_DEFINICJI else None,
+            min_difference=min_difference,
+            pracownik=self.pracownik_edit.text().strip() or None,
+        )
+
+    def apply_filters(self):
+        results_filter = self.current_filter()
+        self.model.set_query(results_filter, RESULT_SORTS[self.sort_combo.currentText()])
+        self._update_count(results_filter)
+        self._show_explanation()
+
+    def _update_count(self, results_filter):
+        """Liczba wierszy po filtrach - w tle, żeby COUNT na dużym przebiegu nie blokował okna."""
+        if results_filter is None:
+            self.count_label.setText("")
+            return
+        db_config = self.db_config
+
+        def count(token, progress):
+            conn = open_db_connection(db_config)
+            try:
+                return count_results(conn, results_filter)
+            finally:
+                conn.close()
+
+        def show(total):
+            if self.model.results_filter == results_filter:
+                self.count_label.setText(f"Wierszy: {total}")
+
+        scheduler = job_scheduler()
+        if self._count_job is not None and scheduler is not None:
+            scheduler.cancel(self._count_job)
+        self.count_label.setText("Wierszy: …")
+        if scheduler is None:
+            try:
+                show(count(None, None))
+            except pyodbc.Error as ex:
+                self.count_label.setText(f"Błąd liczenia wierszy: {ex}")
+            return
+        self._count_job = scheduler.submit(
+            "Liczba wyników", count, PRIORITY_INTERACTIVE, on_result=show,
+            on_error=lambda ex: self.count_label.setText(f"Błąd liczenia wierszy: {ex}")
+        )
+
+    # -----------------------------------------------------
+    # WYJAŚNIENIE (na żądanie)
+    # -----------------------------------------------------
+
+    def toggle_explanation(self, visible):
+        self.explanation.setVisible(visible)
+        self._explained_key = None
+        self._show_explanation()
+
+    def _on_selection_changed(self, *args):
+        self._show_explanation()
+
+    def _selected_key(self):
+        rows = self.view.selectionModel().selectedRows()
+        if not rows:
+            return None
+        row = rows[0].row()
+        return tuple(self.model.row_value(row, column) for column in ("Zrodlo", "Pracownik", "Okres"))
+
+    def _show_explanation(self):
+        """Liczy wyprowadzenie tylko przy otwartym panelu i tylko dla zaznaczonego pracownika/okresu."""
+        if not self.explanation.isVisible():
+            return
+        key = self._selected_key()
+        if key is None:
+            self.explanation.setPlainText("Zaznacz wiersz, aby zobaczyć wyprowadzenie podstaw.")
+            return
+        if key == self._explained_key:
+            return
+        self._explained_key = key
+        zrodlo, pracownik, okres = key
+        source_config = _source_config(self.db_config, zrodlo)
+        self.explanation.setPlainText(f"Pracownik {pracownik}, okres {okres} - liczenie…")
+
+        def explain(token, progress):
+            conn = open_db_connection(source_config)
+            try:
+                return explain_period(conn, source_config, pracownik, okres)
+            finally:
+                conn.close()
+
+        def show(lines):
+            if self._explained_key == key:  # zaznaczenie mogło się zmienić w trakcie
+                header = [f"Pracownik {pracownik}, okres {okres}" + (f", baza {zrodlo}" if zrodlo else ""),
+                          "(według bieżących definicji składników)", ""]
+                self.explanation.setPlainText("\n".join(header + lines))
+
+        def failed(ex):
+            if self._explained_key == key:
+                self._explained_key = None
+                self.explanation.setPlainText(f"Nie udało się wyznaczyć wyprowadzenia: {ex}")
+
+        scheduler = job_scheduler()
+        if scheduler is None:
+            try:
+                show(explain(None, None))
+            except pyodbc.Error as ex:
+                failed(ex)
+            return
+        scheduler.submit("Wyjaśnienie", explain, PRIORITY_INTERACTIVE, on_result=show, on_error=failed)
@@ -0,0 +1,236 @@
+# schemat.py
+"""
+Wersjonowane obiekty bazy migracyjnej przyspieszające odczyt definicji (bez zależności od Qt).
+
+Zainstalowane wersje są zapisywane w dbo.wer_t_Wersja_Schematu; install_schema dokłada tylko
+brakujące migracje, każdą w osobnej transakcji. Migracje:
+  1. filtrowany indeks pokrywający (KodSL, Parametr) INCLUDE (Wartosc) dla wierszy bez dat -
+     dokładnie ten warunek stosują wszystkie odczyty,
+  2. widok dbo.wer_v_Skladniki_Macierz - jeden wiersz na KodSL, kolumna na parametr
+     (pivot po stronie serwera); skladniki_db.fetch_all_parameters używa go, gdy istnieje,
+  3. kolumna rowversion WersjaWiersza (optymistyczna kontrola zapisów, skladniki_db) -
+     dołączona do indeksu z wersji 1, żeby odczyt tokenów wersji nie sięgał do tabeli,
+  4. tabela wyników weryfikacji dbo.wer_t_Wyniki_Weryfikacji (zapis w tle: wyniki_db.py) -
+     sterta z indeksem po IdPrzebiegu, żeby wstawianie paczek nie przebudowywało indeksu klastrowego.
+  5. klucz IdWyniku (IDENTITY) i wyliczana kolumna RoznicaAbs w tabeli wyników z indeksami
+     (IdPrzebiegu, kolumna sortowania, IdWyniku) - przeglądarka wyników (wyniki_db.fetch_results_page)
+     czyta strony paginacją kluczem bez sortowania milionów wierszy przy każdym przewinięciu.
+  6. widok macierzy z kolumną NieznaneParametry (liczba kluczy Parametr spoza ALL_EXPECTED_HEADERS) -
+     odczyt przez widok nie gubi nieznanych parametrów (reguła NIEZNANY_PARAMETR w kontrola_definicji.py).
+  7. tabela przebiegów dbo.wer_t_Przebiegi_Weryfikacji - jeden wiersz na przebieg z licznikiem wierszy
+     wyników, aktualizowanym w transakcji każdej paczki; lista przebiegów nie grupuje tabeli wyników.
+"""
+
+from db_utils import ALL_EXPECTED_HEADERS, database_key
+
+SCHEMA_VERSION_TABLE = "dbo.wer_t_Wersja_Schematu"
+MATRIX_VIEW = "dbo.wer_v_Skladniki_Macierz"
+MATRIX_UNKNOWN_COLUMN = "NieznaneParametry"
+CURRENT_INDEX = "IX_wer_t_Skladniki_Parametry_Biezace"
+VERSION_COLUMN = "WersjaWiersza"
+RESULTS_TABLE = "dbo.wer_t_Wyniki_Weryfikacji"
+RESULT_KEY_COLUMN = "IdWyniku"
+RUNS_TABLE = "dbo.wer_t_Przebiegi_Weryfikacji"
+# Kolumny sortowania przeglądarki wyników - dla każdej indeks (IdPrzebiegu, kolumna, IdWyniku).
+RESULT_SORT_COLUMNS = ["Pracownik", "KodSL", "Parametr", "RoznicaAbs"]
+
+
+def _quote(identifier):
+    return "[" + identifier.replace("]", "]]") + "]"
+
+
+def _literal(text):
+    return "N'" + text.replace("'", "''") + "'"
+
+
+def _results_index_sql(name, columns):
+    return f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                       WHERE name = '{name}' AND object_id = OBJECT_ID('{RESULTS_TABLE}'))
+            CREATE NONCLUSTERED INDEX {name} ON {RESULTS_TABLE} ({', '.join(columns)})
+        """
+
+
+def _matrix_view_sql():
+    columns = ",\n".join(
+        f"        MAX(CASE WHEN Parametr = {_literal(header)} THEN Wartosc END) AS {_quote(header)}"
+        for header in ALL_EXPECTED_HEADERS
+    )
+    known = ", ".join(_literal(header) for header in ALL_EXPECTED_HEADERS)
+    return f"""
+    CREATE VIEW {MATRIX_VIEW} AS
+    SELECT KodSL,
+{columns},
+        COUNT(CASE WHEN Parametr NOT IN ({known}) THEN 1 END) AS {MATRIX_UNKNOWN_COLUMN}
+    FROM dbo.wer_t_Skladniki_Parametry
+    WHERE Data_Od IS NULL AND Data_Do IS NULL
+    GROUP BY KodSL
+    """
+
+
+# (wersja, opis, polecenia SQL) - kolejne wersje wyłącznie dopisujemy na końcu.
+# Zmiana ALL_EXPECTED_HEADERS wymaga nowej wersji, która odtworzy widok macierzy.
+MIGRATIONS = [
+    (1, "Filtrowany indeks pokrywający dla bieżących parametrów", [
+        f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                       WHERE name = '{CURRENT_INDEX}'
+                         AND object_id = OBJECT_ID('dbo.wer_t_Skladniki_Parametry'))
+            CREATE NONCLUSTERED INDEX {CURRENT_INDEX}
+            ON dbo.wer_t_Skladniki_Parametry (KodSL, Parametr)
+            INCLUDE (Wartosc)
+            WHERE Data_Od IS NULL AND Data_Do IS NULL
+        """,
+    ]),
+    (2, "Widok macierzy parametrów (jeden wiersz na KodSL)", [
+        f"IF OBJECT_ID('{MATRIX_VIEW}', 'V') IS NOT NULL DROP VIEW {MATRIX_VIEW}",
+        _matrix_view_sql(),
+    ]),
+    (3, "Kolumna wersji wiersza (rowversion) do wykrywania konfliktów zapisu", [
+        f"""
+        IF COL_LENGTH('dbo.wer_t_Skladniki_Parametry', '{VERSION_COLUMN}') IS NULL
+            ALTER TABLE dbo.wer_t_Skladniki_Parametry ADD {VERSION_COLUMN} ROWVERSION
+        """,
+        f"""
+        CREATE NONCLUSTERED INDEX {CURRENT_INDEX}
+        ON dbo.wer_t_Skladniki_Parametry (KodSL, Parametr)
+        INCLUDE (Wartosc, {VERSION_COLUMN})
+        WHERE Data_Od IS NULL AND Data_Do IS NULL
+        WITH (DROP_EXISTING = ON)
+        """,
+    ]),
+    (4, "Tabela wyników weryfikacji", [
+        f"""
+        IF OBJECT_ID('{RESULTS_TABLE}', 'U') IS NULL
+            CREATE TABLE {RESULTS_TABLE} (
+                IdPrzebiegu UNIQUEIDENTIFIER NOT NULL,
+                Zrodlo NVARCHAR(200) NULL,
+                Pracownik NVARCHAR(100) NULL,
+                Okres NVARCHAR(100) NULL,
+                Parametr NVARCHAR(100) NULL,
+                KodSL NVARCHAR(100) NULL,
+                Oczekiwana DECIMAL(19, 4) NULL,
+                Naliczona DECIMAL(19, 4) NULL,
+                Roznica DECIMAL(19, 4) NULL,
+                Typ NVARCHAR(20) NOT NULL,
+                Zapisano DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+            )
+        """,
+        f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                       WHERE name = 'IX_wer_t_Wyniki_Weryfikacji_Przebieg'
+                         AND object_id = OBJECT_ID('{RESULTS_TABLE}'))
+            CREATE NONCLUSTERED INDEX IX_wer_t_Wyniki_Weryfikacji_Przebieg
+            ON {RESULTS_TABLE} (IdPrzebiegu)
+        """,
+    ]),
+    (5, "Klucz i indeksy przeglądarki wyników weryfikacji", [
+        f"""
+        IF COL_LENGTH('{RESULTS_TABLE}', '{RESULT_KEY_COLUMN}') IS NULL
+            ALTER TABLE {RESULTS_TABLE} ADD {RESULT_KEY_COLUMN} BIGINT IDENTITY(1, 1) NOT NULL
+        """,
+        f"""
+        IF COL_LENGTH('{RESULTS_TABLE}', 'RoznicaAbs') IS NULL
+            ALTER TABLE {RESULTS_TABLE} ADD RoznicaAbs AS ABS(Roznica) PERSISTED
+        """,
+        f"""
+        CREATE NONCLUSTERED INDEX IX_wer_t_Wyniki_Weryfikacji_Przebieg
+        ON {RESULTS_TABLE} (IdPrzebiegu, {RESULT_KEY_COLUMN})
+        WITH (DROP_EXISTING = ON)
+        """,
+    ] + [
+        _results_index_sql(f"IX_wer_t_Wyniki_Weryfikacji_{column}", ["IdPrzebiegu", column, RESULT_KEY_COLUMN])
+        for column in RESULT_SORT_COLUMNS
+    ]),
+    (6, "Widok macierzy z liczbą nieznanych parametrów", [
+        f"IF OBJECT_ID('{MATRIX_VIEW}', 'V') IS NOT NULL DROP VIEW {MATRIX_VIEW}",
+        _matrix_view_sql(),
+    ]),
+    (7, "Tabela przebiegów weryfikacji", [
+        f"""
+        IF OBJECT_ID('{RUNS_TABLE}', 'U') IS NULL
+            CREATE TABLE {RUNS_TABLE} (
+                IdPrzebiegu UNIQUEIDENTIFIER NOT NULL PRIMARY KEY,
+                Zrodlo NVARCHAR(200) NULL,
+                Zapisano DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+                Wiersze BIGINT NOT NULL DEFAULT 0
+            )
+        """,
+        # Przebiegi zapisane przed tą wersją - jedyne grupowanie całej tabeli wyników.
+        f"""
+        INSERT INTO {RUNS_TABLE} (IdPrzebiegu, Zrodlo, Zapisano, Wiersze)
+        SELECT w.IdPrzebiegu, MAX(w.Zrodlo), MIN(w.Zapisano), COUNT_BIG(*)
+        FROM {RESULTS_TABLE} w
+        WHERE NOT EXISTS (SELECT 1 FROM {RUNS_TABLE} p WHERE p.IdPrzebiegu = w.IdPrzebiegu)
+        GROUP BY w.IdPrzebiegu
+        """,
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        IF OBJECT_ID('{SCHEMA_VERSION_TABLE}', 'U') IS NULL
+            CREATE TABLE {SCHEMA_VERSION_TABLE} (
+                Wersja INT NOT NULL PRIMARY KEY,
+                Opis NVARCHAR(200) NOT NULL,
+                Zainstalowano DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+            )
+    """)
+    conn.commit()
+
+
+def schema_version(conn):
+    """Najwyższa zainstalowana wersja schematu (0, gdy nic nie zainstalowano)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT OBJECT_ID('{SCHEMA_VERSION_TABLE}', 'U')")
+    if cursor.fetchone()[0] is None:
+        return 0
+    cursor.execute(f"SELECT MAX(Wersja) FROM {SCHEMA_VERSION_TABLE}")
+    return cursor.fetchone()[0] or 0
+
+
+def pending_migrations(conn):
+    current = schema_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > current]
+
+
+def install_schema(conn):
+    """Instaluje brakujące migracje (każda w osobnej transakcji); zwraca listę zainstalowanych wersji."""
+    _ensure_version_table(conn)
+    installed = []
+    cursor = conn.cursor()
+    for version, description, statements in pending_migrations(conn):
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {SCHEMA_VERSION_TABLE} (Wersja, Opis) VALUES (?, ?)",
+                           (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        installed.append(version)
+    _matrix_view_checks.clear()
+    return installed
+
+
+# database_key(db_config) -> czy baza ma widok macierzy z wersji 6 (zmienia go tylko install_schema)
+_matrix_view_checks = {}
+
+
+def has_matrix_view(conn, db_config=None):
+    """
+    Czy baza ma widok macierzy z kolumną nieznanych parametrów (wersja 6; starszy widok jest pomijany).
+    Z db_config wynik jest zapamiętywany dla tej bazy - kolejne odczyty nie pytają serwera.
+    """
+    key = database_key(db_config) if db_config is not None else None
+    if key in _matrix_view_checks:
+        return _matrix_view_checks[key]
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COL_LENGTH('{MATRIX_VIEW}', '{MATRIX_UNKNOWN_COLUMN}')")
+    available = cursor.fetchone()[0] is not None
+    if key is not None:
+        _matrix_view_checks[key] = available
+    return available
@@ -0,0 +1,297 @@
+# skladniki_db.py
+"""Zapytania do wer_t_Skladniki_Parametry współdzielone przez widżety (bez zależności od Qt)."""
+
+from collections import OrderedDict
+
+import pyodbc
+
+from db_utils import ALL_EXPECTED_HEADERS, is_connection_error
+from schemat import MATRIX_UNKNOWN_COLUMN, MATRIX_VIEW, VERSION_COLUMN, has_matrix_view
+
+KODSL_PAGE_SIZE = 500
+
+
+def fetch_kodsl_page(conn, after_kod_sl=None, page_size=KODSL_PAGE_SIZE):
+    """
+    Zwraca kolejną stronę unikalnych KodSL (paginacja kluczem, nie OFFSET-em):
+    TOP n KodSL większych od ostatniego już pobranego.
+    """
+    cursor = conn.cursor()
+    if after_kod_sl is None:
+        cursor.execute("""
+            SELECT TOP (?) KodSL
+            FROM wer_t_Skladniki_Parametry
+            GROUP BY KodSL
+            ORDER BY KodSL
+        """, (page_size,))
+    else:
+        cursor.execute("""
+            SELECT TOP (?) KodSL
+            FROM wer_t_Skladniki_Parametry
+            WHERE KodSL > ?
+            GROUP BY KodSL
+            ORDER BY KodSL
+        """, (page_size, after_kod_sl))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def fetch_variant_parameters(conn, kod_sl_list):
+    """
+    Pobiera bieżące parametry (bez dat) dla podanych KodSL jednym zapytaniem.
+    Zwraca {KodSL: OrderedDict(Parametr -> wartość małymi literami)};
+    KodSL bez żadnych wierszy dostaje pusty słownik.
+    """
+    kod_sl_list = list(kod_sl_list)
+    result = OrderedDict((kod_sl, OrderedDict()) for kod_sl in kod_sl_list)
+    if not kod_sl_list:
+        return result
+
+    placeholders = ", ".join("?" for _ in kod_sl_list)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT KodSL, Parametr, Wartosc
+        FROM wer_t_Skladniki_Parametry
+        WHERE KodSL IN ({placeholders}) AND Data_Od IS NULL AND Data_Do IS NULL
+        ORDER BY KodSL, Parametr
+    """, kod_sl_list)
+    for KodSL, Parametr, Wartosc in cursor.fetchall():
+        result.setdefault(KodSL, OrderedDict())[Parametr] = str(Wartosc).lower()
+    return result
+
+
+def _fetch_matrix_view(conn, headers):
+    """
+    Odczyt z widoku wer_v_Skladniki_Macierz (pivot po stronie serwera, jeden wiersz na KodSL).
+    Nieznane klucze Parametr (kolumna NieznaneParametry > 0) są doczytywane z tabeli tylko dla
+    tych KodSL - zwykle żadnych, więc zwykle jest to jedno zapytanie.
+    """
+    columns = ", ".join(f"[{header}]" for header in headers)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT KodSL, {columns}, {MATRIX_UNKNOWN_COLUMN} FROM {MATRIX_VIEW} ORDER BY KodSL")
+
+    definitions = OrderedDict()
+    with_unknown = []
+    for row in cursor.fetchall():
+        definitions[row[0]] = OrderedDict(
+            (header, "" if value is None else str(value)) for header, value in zip(headers, row[1:-1])
+        )
+        if row[-1]:
+            with_unknown.append(row[0])
+
+    known = ", ".join("?" for _ in ALL_EXPECTED_HEADERS)
+    for start in range(0, len(with_unknown), CHANGES_BATCH_SIZE):
+        batch = with_unknown[start:start + CHANGES_BATCH_SIZE]
+        cursor.execute(f"""
+            SELECT KodSL, Parametr, Wartosc
+            FROM wer_t_Skladniki_Parametry
+            WHERE Data_Od IS NULL AND Data_Do IS NULL
+              AND KodSL IN ({", ".join("?" for _ in batch)}) AND Parametr NOT IN ({known})
+            ORDER BY KodSL, Parametr
+        """, batch + list(ALL_EXPECTED_HEADERS))
+        for KodSL, Parametr, Wartosc in cursor.fetchall():
+            definitions[KodSL][Parametr] = str(Wartosc)
+    return definitions
+
+
+def fetch_all_parameters(conn, headers=ALL_EXPECTED_HEADERS, use_view=None, db_config=None):
+    """
+    Pobiera bieżące (bez dat) definicje wszystkich składników jako macierz
+    {KodSL: OrderedDict(Parametr -> Wartosc)}; brakujące parametry z headers są uzupełniane "".
+    use_view=None - widok wer_v_Skladniki_Macierz (schemat.py) jest używany automatycznie, gdy
+    istnieje i zawiera wszystkie headers; wtedy macierz ma kolumny z headers i nieznane parametry.
+    db_config - sprawdzenie widoku jest zapamiętywane dla tej bazy (bez zapytania przy każdym odczycie).
+    """
+    if use_view is None:
+        use_view = set(headers) <= set(ALL_EXPECTED_HEADERS) and has_matrix_view(conn, db_config)
+    if use_view:
+        return _fetch_matrix_view(conn, headers)
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT DISTINCT KodSL, Parametr, Wartosc
+        FROM wer_t_Skladniki_Parametry
+        WHERE Data_Od IS NULL AND Data_Do IS NULL
+        ORDER BY KodSL, Parametr
+    """)
+
+    definitions = OrderedDict()
+    for KodSL, Parametr, Wartosc in cursor.fetchall():
+        if KodSL not in definitions:
+            definitions[KodSL] = OrderedDict()
+        definitions[KodSL][Parametr] = str(Wartosc)
+
+    for params in definitions.values():
+        for expected_header in headers:
+            if expected_header not in params:
+                params[expected_header] = ""
+    return definitions
+
+
+# SQL Server przyjmuje maksymalnie 2100 parametrów w jednym poleceniu:
+# DELETE zużywa 2 parametry na zmianę, INSERT 3 - paczka 600 zmian mieści się w limicie.
+CHANGES_BATCH_SIZE = 600
+
+
+def normalize_value(value):
+    """Sprowadza wartość parametru do 'tak' / 'nie' / '' (inne wartości traktujemy jak puste)."""
+    normalized_value = str(value if value is not None else "").strip().lower()
+    return normalized_value if normalized_value in ("tak", "nie") else ""
+
+
+# -----------------------------------------------------
+# WERSJE WIERSZY (optymistyczna kontrola współbieżności)
+# -----------------------------------------------------
+
+# Kolumna rowversion (VERSION_COLUMN) jest dodawana migracją 3 (schemat.py). Token wersji KodSL
+# to (MAX(WersjaWiersza), COUNT(*)) jego bieżących wierszy: każde INSERT/UPDATE podnosi MAX,
+# samo DELETE zmniejsza COUNT. KodSL bez wierszy ma token EMPTY_VERSION.
+EMPTY_VERSION = (None, 0)
+
+
+class ConflictError(Exception):
+    """Bieżące wiersze KodSL zmienił w międzyczasie inny użytkownik (token wersji się nie zgadza)."""
+
+    def __init__(self, kod_sl_list):
+        self.kod_sl_list = list(kod_sl_list)
+        super().__init__(f"Składniki zmienione przez innego użytkownika: {', '.join(self.kod_sl_list)}")
+
+
+def has_row_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COL_LENGTH('dbo.wer_t_Skladniki_Parametry', '{VERSION_COLUMN}')")
+    return cursor.fetchone()[0] is not None
+
+
+def _read_version_tokens(cursor, kod_sl_list, lock=False):
+    # UPDLOCK + HOLDLOCK blokuje (indeksem) tylko zakresy kluczy tych KodSL do końca transakcji -
+    # nikt nie zmieni ich między sprawdzeniem wersji a zapisem, a pozostałe KodSL są wolne.
+    hint = "WITH (UPDLOCK, HOLDLOCK)" if lock else ""
+    tokens = {kod_sl: EMPTY_VERSION for kod_sl in kod_sl_list}
+    for start in range(0, len(kod_sl_list), CHANGES_BATCH_SIZE):
+        batch = kod_sl_list[start:start + CHANGES_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        cursor.execute(f"""
+            SELECT KodSL, MAX({VERSION_COLUMN}), COUNT(*)
+            FROM dbo.wer_t_Skladniki_Parametry {hint}
+            WHERE KodSL IN ({placeholders}) AND Data_Od IS NULL AND Data_Do IS NULL
+            GROUP BY KodSL
+        """, batch)
+        tokens.update((kod_sl, (version, count)) for kod_sl, version, count in cursor.fetchall())
+    return tokens
+
+
+def fetch_version_tokens(conn, kod_sl_list=None):
+    """
+    Zwraca {KodSL: token wersji} dla podanych KodSL (None - dla wszystkich) albo None,
+    gdy tabela nie ma jeszcze kolumny wersji (wtedy konflikty nie są wykrywane).
+    """
+    if not has_row_versions(conn):
+        return None
+    cursor = conn.cursor()
+    if kod_sl_list is not None:
+        return _read_version_tokens(cursor, list(kod_sl_list))
+    cursor.execute(f"""
+        SELECT KodSL, MAX({VERSION_COLUMN}), COUNT(*)
+        FROM dbo.wer_t_Skladniki_Parametry
+        WHERE Data_Od IS NULL AND Data_Do IS NULL
+        GROUP BY KodSL
+    """)
+    return {kod_sl: (version, count) for kod_sl, version, count in cursor.fetchall()}
+
+
+def fetch_variant_snapshot(conn, kod_sl_list):
+    """
+    Parametry (jak fetch_variant_parameters) i tokeny wersji (jak fetch_version_tokens) podanych
+    KodSL jednym zapytaniem - token jest liczony z tych samych bieżących wierszy. Zwraca
+    (parametry, tokeny); bez kolumny wersji zapytanie jest powtarzane bez niej, a tokeny to None.
+    """
+    kod_sl_list = list(kod_sl_list)
+    result = OrderedDict((kod_sl, OrderedDict()) for kod_sl in kod_sl_list)
+    if not kod_sl_list:
+        return result, {}
+
+    placeholders = ", ".join("?" for _ in kod_sl_list)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT KodSL, Parametr, Wartosc, {VERSION_COLUMN}
+            FROM wer_t_Skladniki_Parametry
+            WHERE KodSL IN ({placeholders}) AND Data_Od IS NULL AND Data_Do IS NULL
+            ORDER BY KodSL, Parametr
+        """, kod_sl_list)
+    except pyodbc.Error as ex:
+        if is_connection_error(ex):
+            raise
+        # Baza sprzed migracji 3 (brak kolumny wersji) - konflikty nie są wykrywane.
+        return fetch_variant_parameters(conn, kod_sl_list), None
+
+    tokens = {kod_sl: EMPTY_VERSION for kod_sl in kod_sl_list}
+    for KodSL, Parametr, Wartosc, Wersja in cursor.fetchall():
+        result.setdefault(KodSL, OrderedDict())[Parametr] = str(Wartosc).lower()
+        version, count = tokens.get(KodSL, EMPTY_VERSION)
+        tokens[KodSL] = (Wersja if version is None or Wersja > version else version, count + 1)
+    return result, tokens
+
+
+def apply_parameter_changes(conn, changes, deleted_variants=(), expected_versions=None):
+    """
+    Zapisuje zmiany pojedynczych komórek [(KodSL, Parametr, Wartosc), ...] w JEDNEJ transakcji.
+    Dla każdej paczki: jedno DELETE zmienianych par (KodSL, Parametr) i jedno wielowierszowe
+    INSERT wartości 'tak'/'nie' (pusta wartość = brak wiersza). deleted_variants - KodSL,
+    których bieżące parametry mają zniknąć w całości (w tej samej transakcji).
+    expected_versions - {KodSL: token wersji} z chwili odczytu; jeśli któryś KodSL ma już inny
+    token, nic nie jest zapisywane i zgłaszany jest ConflictError. Wtedy funkcja zwraca nowe
+    tokeny zapisanych KodSL (bez expected_versions zwraca None).
+    Commit na końcu, rollback i ponowne zgłoszenie wyjątku przy błędzie.
+    """
+    # Ta sama komórka zmieniona kilka razy - liczy się ostatnia wartość.
+    latest = OrderedDict()
+    for kod_sl, parametr, wartosc in changes:
+        latest[(kod_sl, parametr)] = (kod_sl, parametr, normalize_value(wartosc))
+    changes = list(latest.values())
+    deleted_variants = list(deleted_variants)
+    if not changes and not deleted_variants:
+        return {} if expected_versions is not None else None
+
+    cursor = conn.cursor()
+    try:
+        if expected_versions is not None:
+            current = _read_version_tokens(cursor, list(expected_versions), lock=True)
+            conflicts = [kod_sl for kod_sl, token in expected_versions.items() if current[kod_sl] != token]
+            if conflicts:
+                raise ConflictError(conflicts)
+
+        for start in range(0, len(deleted_variants), CHANGES_BATCH_SIZE):
+            batch = deleted_variants[start:start + CHANGES_BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in batch)
+            cursor.execute(f"""
+                DELETE FROM dbo.wer_t_Skladniki_Parametry
+                WHERE Data_Od IS NULL AND Data_Do IS NULL AND KodSL IN ({placeholders})
+            """, batch)
+
+        for start in range(0, len(changes), CHANGES_BATCH_SIZE):
+            batch = changes[start:start + CHANGES_BATCH_SIZE]
+
+            pair_conditions = " OR ".join("(KodSL = ? AND Parametr = ?)" for _ in batch)
+            cursor.execute(f"""
+                DELETE FROM dbo.wer_t_Skladniki_Parametry
+                WHERE Data_Od IS NULL AND Data_Do IS NULL AND ({pair_conditions})
+            """, [value for kod_sl, parametr, _ in batch for value in (kod_sl, parametr)])
+
+            rows = [change for change in batch if change[2]]
+            if rows:
+                values_sql = ", ".join("(?, ?, ?, NULL, NULL)" for _ in rows)
+                cursor.execute(f"""
+                    INSERT INTO dbo.wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
+                    VALUES {values_sql}
+                """, [value for row in rows for value in row])
+
+        new_versions = None
+        if expected_versions is not None:
+            touched = list(OrderedDict.fromkeys([change[0] for change in changes] + deleted_variants))
+            new_versions = _read_version_tokens(cursor, touched)
+        conn.commit()
+        return new_versions
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,192 @@
+# skladniki_sync.py
+"""
+Synchronizacja definicji składników między konfiguracje/definicje_składników.json
+a wer_t_Skladniki_Parametry (bez zależności od Qt).
+
+Obie strony są sprowadzane do jednego schematu: KodSL -> krotka wartości 'tak'/'nie'/''
+w kolejności ALL_EXPECTED_HEADERS. Każda krotka dostaje skrót (hash), a różnice są
+liczone jednym przejściem po słownikach skrótów - O(n). Plan zmian zawiera tylko
+zmienione komórki, dodane i usunięte KodSL.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict, namedtuple
+
+from db_utils import ALL_EXPECTED_HEADERS, CONFIG_FOLDER, HEADER_MAPPING
+from skladniki_db import apply_parameter_changes, fetch_all_parameters, normalize_value
+
+DEFINICJE_SKLADNIKOW_FILE = os.path.join(CONFIG_FOLDER, "definicje_składników.json")
+
+# Klucze używane w pliku JSON (inne niż HEADER_MAPPING wyświetlane w tabelach)
+JSON_HEADER_MAPPING = {
+    "do_podstawa_zus": "ZUS",
+    "do_podstawa_podatek": "Podatek",
+    "do_podstawa_zdrowotna": "Zdrowotne",
+    "do_potracenie": "Potrącenie",
+    "do_zasilek": "Zasiłek",
+    "do_nie_podlega_zajęciu_przez_komornika": "Rodzaj zajęcia komorniczego",
+    "do_koszty_autorskie": "Koszty autorskie"
+}
+REVERSE_JSON_HEADER_MAPPING = {v: k for k, v in JSON_HEADER_MAPPING.items()}
+
+DIRECTION_JSON_TO_DB = "json-do-bazy"
+DIRECTION_DB_TO_JSON = "baza-do-json"
+
+_EMPTY_VECTOR = tuple("" for _ in ALL_EXPECTED_HEADERS)
+
+# inserts - {KodSL: wektor} nowych składników,
+# updates - {KodSL: [(Parametr, stara, nowa), ...]} zmienionych komórek,
+# deletes - [KodSL, ...] składników do usunięcia.
+SyncPlan = namedtuple("SyncPlan", ["inserts", "updates", "deletes"])
+
+
+def _vector(params, key_for):
+    return tuple(normalize_value(params.get(key_for(header), "")) for header in ALL_EXPECTED_HEADERS)
+
+
+def normalize_json_definitions(data):
+    """Plik JSON ("ZUS", "Zdrowotne", ...) -> {KodSL: wektor}. Składniki bez żadnej wartości są pomijane."""
+    normalized = OrderedDict()
+    for kod_sl, params in data.items():
+        vector = _vector(params, JSON_HEADER_MAPPING.get)
+        if vector != _EMPTY_VECTOR:
+            normalized[str(kod_sl).strip().upper()] = vector
+    return normalized
+
+
+def normalize_db_definitions(definitions):
+    """Macierz z bazy (klucze do_*) -> {KodSL: wektor}. Składniki bez żadnej wartości są pomijane."""
+    normalized = OrderedDict()
+    for kod_sl, params in definitions.items():
+        vector = _vector(params, lambda header: header)
+        if vector != _EMPTY_VECTOR:
+            normalized[kod_sl] = vector
+    return normalized
+
+
+def vector_hash(vector):
+    return hashlib.blake2b("\x1f".join(vector).encode("utf-8"), digest_size=16).digest()
+
+
+def definition_hashes(normalized):
+    return {kod_sl: vector_hash(vector) for kod_sl, vector in normalized.items()}
+
+
+def diff_definitions(source, target):
+    """Wylicza minimalny plan zmian, który sprowadza target do source (oba znormalizowane)."""
+    source_hashes = definition_hashes(source)
+    target_hashes = definition_hashes(target)
+
+    inserts = OrderedDict()
+    updates = OrderedDict()
+    for kod_sl, digest in source_hashes.items():
+        target_digest = target_hashes.get(kod_sl)
+        if target_digest is None:
+            inserts[kod_sl] = source[kod_sl]
+        elif target_digest != digest:
+            updates[kod_sl] = [
+                (header, old, new)
+                for header, old, new in zip(ALL_EXPECTED_HEADERS, target[kod_sl], source[kod_sl])
+                if old != new
+            ]
+    deletes = [kod_sl for kod_sl in target_hashes if kod_sl not in source_hashes]
+    return SyncPlan(inserts, updates, deletes)
+
+
+def plan_is_empty(plan):
+    return not (plan.inserts or plan.updates or plan.deletes)
+
+
+def format_plan(plan, target_name):
+    """Raport dry-run: jedna linia na składnik, nazwy parametrów jak w tabelach (HEADER_MAPPING)."""
+    def label(header):
+        return HEADER_MAPPING.get(header, header).replace("\n", "")
+
+    lines = [f"Plan synchronizacji ({target_name}): dodanie {len(plan.inserts)}, "
+             f"zmiana {len(plan.updates)}, usunięcie {len(plan.deletes)} składników."]
+    for kod_sl, vector in plan.inserts.items():
+        values = ", ".join(f"{label(h)}={v}" for h, v in zip(ALL_EXPECTED_HEADERS, vector) if v)
+        lines.append(f"+ {kod_sl}: {values}")
+    for kod_sl, cells in plan.updates.items():
+        values = ", ".join(f"{label(h)}: '{old}' -> '{new}'" for h, old, new in cells)
+        lines.append(f"~ {kod_sl}: {values}")
+    for kod_sl in plan.deletes:
+        lines.append(f"- {kod_sl}")
+    return "\n".join(lines)
+
+
+def load_json_definitions(path=DEFINICJE_SKLADNIKOW_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def plan_variants(plan):
+    """Wszystkie KodSL, których dotyczy plan."""
+    return list(plan.inserts) + list(plan.updates) + list(plan.deletes)
+
+
+def plan_changes(plan):
+    """Zmienione komórki planu jako lista (KodSL, Parametr, Wartosc) dla apply_parameter_changes."""
+    changes = [(kod_sl, header, value)
+               for kod_sl, vector in plan.inserts.items()
+               for header, value in zip(ALL_EXPECTED_HEADERS, vector) if value]
+    changes.extend((kod_sl, header, new)
+                   for kod_sl, cells in plan.updates.items()
+                   for header, _, new in cells)
+    return changes
+
+
+def apply_plan_to_db(conn, plan, expected_versions=None):
+    """
+    Stosuje plan w bazie jedną transakcją (zmienione komórki + usunięte KodSL).
+    expected_versions - jak w apply_parameter_changes (kontrola konfliktów, zwraca nowe tokeny).
+    """
+    return apply_parameter_changes(conn, plan_changes(plan), deleted_variants=plan.deletes,
+                                   expected_versions=expected_versions)
+
+
+def apply_plan_to_json(data, plan, path=DEFINICJE_SKLADNIKOW_FILE):
+    """Stosuje plan w pliku JSON, zachowując kolejność i pozostałe wpisy."""
+    by_normalized_key = {str(kod_sl).strip().upper(): kod_sl for kod_sl in data}
+
+    for kod_sl, vector in plan.inserts.items():
+        data[by_normalized_key.get(kod_sl, kod_sl)] = OrderedDict(
+            (JSON_HEADER_MAPPING[header], value) for header, value in zip(ALL_EXPECTED_HEADERS, vector)
+        )
+    for kod_sl, cells in plan.updates.items():
+        entry = data[by_normalized_key[kod_sl]]
+        for header, _, new in cells:
+            entry[JSON_HEADER_MAPPING[header]] = new
+    for kod_sl in plan.deletes:
+        data.pop(by_normalized_key[kod_sl], None)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def sync_definitions(conn, direction, path=DEFINICJE_SKLADNIKOW_FILE, apply=False):
+    """
+    Porównuje plik JSON z bazą i zwraca (plan, raport). Przy apply=True plan jest stosowany
+    po stronie docelowej; bez niego to tylko raport dry-run.
+    """
+    data = load_json_definitions(path)
+    json_side = normalize_json_definitions(data)
+    db_side = normalize_db_definitions(fetch_all_parameters(conn))
+
+    if direction == DIRECTION_JSON_TO_DB:
+        plan = diff_definitions(json_side, db_side)
+        target_name = "baza danych"
+    elif direction == DIRECTION_DB_TO_JSON:
+        plan = diff_definitions(db_side, json_side)
+        target_name = path
+    else:
+        raise ValueError(f"Nieznany kierunek synchronizacji: {direction}")
+
+    if apply and not plan_is_empty(plan):
+        if direction == DIRECTION_JSON_TO_DB:
+            apply_plan_to_db(conn, plan)
+        else:
+            apply_plan_to_json(data, plan, path)
+    return plan, format_plan(plan, target_name)
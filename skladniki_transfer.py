@@ -0,0 +1,199 @@
+# skladniki_transfer.py
+"""
+Strumieniowy eksport i import wer_t_Skladniki_Parametry (CSV / Parquet), bez zależności od Qt.
+
+Eksport czyta kursor paczkami (fetchmany) i dopisuje je do pliku, import czyta plik paczkami,
+ładuje je przez fast_executemany do tabeli tymczasowej, a potem podmienia dane w tabeli
+docelowej jednym poleceniem DELETE + jednym INSERT ... SELECT w tej samej transakcji.
+Pamięć zależy od rozmiaru paczki, nie od liczby wierszy.
+"""
+
+import csv
+import os
+from datetime import date, datetime
+
+COLUMNS = ["KodSL", "Parametr", "Wartosc", "Data_Od", "Data_Do"]
+CHUNK_SIZE = 50000
+CSV_DELIMITER = ";"
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+
+MODE_REPLACE = "zastap"   # cała tabela = zawartość pliku
+MODE_MERGE = "scal"       # podmieniane są tylko KodSL obecne w pliku
+
+
+class TransferError(Exception):
+    """Błąd eksportu/importu (format pliku, brakujące kolumny, brak pyarrow)."""
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".parquet", ".pq"):
+        return FORMAT_PARQUET
+    if extension in (".csv", ".txt"):
+        return FORMAT_CSV
+    raise TransferError(f"Nieznany format pliku '{path}' - podaj format (csv lub parquet).")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise TransferError("Format Parquet wymaga pakietu pyarrow (python -m pip install pyarrow).")
+    return pyarrow, pyarrow.parquet
+
+
+def _to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, (date, datetime)):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    return datetime.fromisoformat(value)
+
+
+def _normalize_row(record):
+    """Zamienia rekord z pliku (dict) na krotkę do wstawienia."""
+    try:
+        kod_sl, parametr, wartosc = record["KodSL"], record["Parametr"], record["Wartosc"]
+    except KeyError as ex:
+        raise TransferError(f"W pliku brakuje kolumny {ex}.")
+    if not kod_sl or not parametr:
+        raise TransferError(f"Pusty KodSL lub Parametr w wierszu: {record}")
+    return (str(kod_sl), str(parametr), "" if wartosc is None else str(wartosc),
+            _parse_date(record.get("Data_Od")), _parse_date(record.get("Data_Do")))
+
+
+# -----------------------------------------------------
+# EKSPORT
+# -----------------------------------------------------
+
+def _iter_table_chunks(conn, chunk_size):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT KodSL, Parametr, Wartosc, Data_Od, Data_Do
+        FROM wer_t_Skladniki_Parametry
+        ORDER BY KodSL, Parametr
+    """)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+def export_parameters(conn, path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Eksportuje całą tabelę parametrów do pliku; zwraca liczbę wierszy."""
+    fmt = detect_format(path, fmt)
+    count = 0
+
+    if fmt == FORMAT_CSV:
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f, delimiter=CSV_DELIMITER)
+            writer.writerow(COLUMNS)
+            for rows in _iter_table_chunks(conn, chunk_size):
+                writer.writerows([["" if v is None else _to_text(v) for v in row] for row in rows])
+                count += len(rows)
+        return count
+
+    if fmt == FORMAT_PARQUET:
+        pa, pq = _require_pyarrow()
+        schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in _iter_table_chunks(conn, chunk_size):
+                columns = list(zip(*[[_to_text(v) for v in row] for row in rows]))
+                writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in columns], schema=schema))
+                count += len(rows)
+        return count
+
+    raise TransferError(f"Nieobsługiwany format: {fmt}")
+
+
+# -----------------------------------------------------
+# IMPORT
+# -----------------------------------------------------
+
+def iter_file_chunks(path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Czyta plik paczkami krotek (KodSL, Parametr, Wartosc, Data_Od, Data_Do)."""
+    fmt = detect_format(path, fmt)
+
+    if fmt == FORMAT_CSV:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            chunk = []
+            for record in csv.DictReader(f, delimiter=CSV_DELIMITER):
+                chunk.append(_normalize_row(record))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        return
+
+    if fmt == FORMAT_PARQUET:
+        _, pq = _require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield [_normalize_row(record) for record in batch.to_pylist()]
+        return
+
+    raise TransferError(f"Nieobsługiwany format: {fmt}")
+
+
+def import_parameters(conn, path, fmt=None, mode=MODE_MERGE, chunk_size=CHUNK_SIZE):
+    """
+    Importuje plik do wer_t_Skladniki_Parametry.
+    1. Paczki trafiają przez fast_executemany do #wer_import (typy kolumn jak w tabeli docelowej).
+    2. Podmiana zbiorowa: DELETE (cała tabela albo KodSL z pliku) + INSERT ... SELECT z #wer_import.
+    Wszystko w jednej transakcji - przy błędzie tabela docelowa pozostaje bez zmian.
+    Zwraca liczbę zaimportowanych wierszy.
+    """
+    if mode not in (MODE_REPLACE, MODE_MERGE):
+        raise TransferError(f"Nieznany tryb importu: {mode}")
+
+    cursor = conn.cursor()
+    count = 0
+    try:
+        cursor.execute("""
+            SELECT TOP 0 KodSL, Parametr, Wartosc, Data_Od, Data_Do
+            INTO #wer_import
+            FROM dbo.wer_t_Skladniki_Parametry
+        """)
+        cursor.fast_executemany = True
+        for chunk in iter_file_chunks(path, fmt, chunk_size):
+            cursor.executemany("""
+                INSERT INTO #wer_import (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+            count += len(chunk)
+
+        if mode == MODE_REPLACE:
+            cursor.execute("DELETE FROM dbo.wer_t_Skladniki_Parametry")
+        else:
+            cursor.execute("""
+                DELETE t FROM dbo.wer_t_Skladniki_Parametry AS t
+                WHERE EXISTS (SELECT 1 FROM #wer_import AS s WHERE s.KodSL = t.KodSL)
+            """)
+        cursor.execute("""
+            INSERT INTO dbo.wer_t_Skladniki_Parametry (KodSL, Parametr, Wartosc, Data_Od, Data_Do)
+            SELECT KodSL, Parametr, Wartosc, Data_Od, Data_Do FROM #wer_import
+        """)
+        cursor.execute("DROP TABLE #wer_import")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
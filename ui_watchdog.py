@@ -0,0 +1,136 @@
+# ui_watchdog.py
+"""
+Strażnik wątku GUI: wykrywa „zawieszenia” okna i zapisuje, który slot je powodował.
+
+QTimer w wątku GUI co chwilę odnotowuje puls, a osobny wątek sprawdza, od kiedy go nie było.
+Gdy pętla zdarzeń Qt stoi dłużej niż watchdog_threshold_ms (db_config.json), wątek pobiera stos
+Pythona wątku GUI (sys._current_frames) i dopisuje do pliku WATCHDOG_LOG_FILE slot aplikacji,
+który był wtedy wykonywany (np. combo_box_modified, update_row_colors, load_variant_data), i pełny
+stos. Przy dłuższym zawieszeniu stos jest próbkowany ponownie (zapisywany, gdy się zmienił),
+a po odblokowaniu dopisywany jest łączny czas. watchdog_threshold_ms = 0 wyłącza strażnika.
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+LOG_FOLDER = "logi"
+WATCHDOG_LOG_FILE = os.path.join(LOG_FOLDER, "zawieszenia_gui.log")
+WATCHDOG_THRESHOLD_MS = 500
+MAX_SAMPLES_PER_STALL = 10
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_WRAPPER_NAMES = ("<module>", "<lambda>")
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def running_slot(frame):
+    """
+    (slot, bieżąca funkcja) aplikacji: slot to najbardziej zewnętrzna funkcja z katalogu aplikacji
+    wywołana przez pętlę zdarzeń (bez <module> i lambd pośredniczących w połączeniach sygnałów),
+    bieżąca - najbardziej wewnętrzna. (None, None) poza kodem aplikacji.
+    """
+    slot = current = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_APP_DIR) and code.co_name not in _WRAPPER_NAMES:
+            slot = frame
+            current = current or frame
+        frame = frame.f_back
+    if slot is None:
+        return None, None
+    return _frame_name(slot), _frame_name(current)
+
+
+class UiWatchdog(QObject):
+    # Błąd zapisu dziennika (raz do następnego udanego zapisu); emitowany z wątku strażnika
+    writeFailed = pyqtSignal(str)
+
+    def __init__(self, threshold_ms=WATCHDOG_THRESHOLD_MS, log_path=WATCHDOG_LOG_FILE, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.log_path = log_path
+        self.stalls = 0
+        self._write_failed = False
+        self._gui_thread = threading.get_ident()  # tworzony w wątku GUI
+        self._interval = max(threshold_ms // 4, 20)
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setInterval(self._interval)
+        self._heartbeat.timeout.connect(self._beat)
+
+    def start(self):
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._last_beat = time.monotonic()
+        self._heartbeat.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="UiWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._heartbeat.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+
+    def _blocked_for(self):
+        # Puls przychodzi co _interval ms - tyle opóźnienia jest normalne.
+        return time.monotonic() - self._last_beat - self._interval / 1000
+
+    def _watch(self):
+        while not self._stop.wait(self._interval / 1000):
+            if self._blocked_for() > self.threshold:
+                self._record_stall()
+
+    def _record_stall(self):
+        """Zapisuje próbki stosu do końca zawieszenia, potem łączny czas."""
+        beat = self._last_beat
+        self.stalls += 1
+        previous_stack = None
+        samples = 0
+        slot = None
+        while self._last_beat == beat and not self._stop.is_set():
+            frame = sys._current_frames().get(self._gui_thread)
+            if frame is None:
+                return
+            stack = traceback.format_stack(frame)
+            if stack != previous_stack and samples < MAX_SAMPLES_PER_STALL:
+                frame_slot, current = running_slot(frame)
+                slot = frame_slot or slot
+                self._write(f"ZAWIESZENIE GUI od {self._blocked_for() * 1000:.0f} ms, "
+                            f"slot: {frame_slot or '(poza kodem aplikacji)'}, w: {current or '-'}", stack)
+                previous_stack = stack
+                samples += 1
+            del frame
+            self._stop.wait(self.threshold)
+        blocked = (self._last_beat - beat - self._interval / 1000) * 1000
+        self._write(f"koniec zawieszenia po {blocked:.0f} ms, slot: {slot or '(poza kodem aplikacji)'}")
+
+    def _write(self, message, stack=None):
+        line = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}\n"
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                if stack:
+                    f.writelines(stack)
+        except OSError as ex:
+            if not self._write_failed:
+                self._write_failed = True
+                self.writeFailed.emit(f"Nie można zapisać dziennika zawieszeń {self.log_path}: {ex}")
+            return
+        self._write_failed = False
@@ -0,0 +1,276 @@
+# verification_widget.py
+"""
+Zakładka "Weryfikacja": uruchomienie weryfikacji naliczeń z GUI jako zadania w tle (job_scheduler.py).
+
+Weryfikacja ma własne połączenie i niski priorytet, więc w trakcie można dalej edytować definicje.
+Raport (CSV/XLSX, opcjonalnie z podsumowaniem) jest pisany strumieniowo jak w weryfikator_cli.py,
+a wyniki mogą trafić także do tabeli wyników w bazie. Anulowanie przerywa odczyt źródła
+i usuwa niedokończony raport.
+
+"Sprawdź próbkę" weryfikuje w kilka sekund losową próbę pracowników (probkowanie.py) i pokazuje
+oszacowanie odsetka rozbieżności z przedziałem ufności; z wyniku jednym przyciskiem uruchamia się
+pełną weryfikację z bieżącymi ustawieniami raportu.
+"""
+
+import os
+import time
+from contextlib import nullcontext
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QIntValidator
+from PyQt5.QtWidgets import (
+    QCheckBox, QDoubleSpinBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QMessageBox, QPlainTextEdit,
+    QPushButton, QVBoxLayout, QWidget
+)
+
+from db_utils import load_db_config, open_db_connection
+from job_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, JobCancelled
+from probkowanie import DEFAULT_SAMPLE_PERCENT, MAX_SEED, format_sample_result, run_sample_verification
+from raport import summary_path, write_report
+from skladniki_db import fetch_all_parameters
+from weryfikacja import VerificationStats, run_verification
+from wyniki_db import ResultsSink, ResultsSinkError, has_results_table
+
+DEFAULT_REPORT_FILE = "raport_weryfikacji.csv"
+CANCEL_CHECK_ROWS = 1000
+PROGRESS_INTERVAL_S = 0.25
+
+
+class VerificationOutcome:
+    def __init__(self, written, stats, sink, seconds):
+        self.written = written
+        self.stats = stats
+        self.sink = sink
+        self.seconds = seconds
+
+
+def _checked_rows(rows, token, progress, stats):
+    """Wiersze źródłowe z kontrolą anulowania i postępem (co CANCEL_CHECK_ROWS wierszy)."""
+    last_report = 0.0
+    for count, row in enumerate(rows, 1):
+        if count % CANCEL_CHECK_ROWS == 0:
+            token.raise_if_cancelled()
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL_S:
+                progress(count, 0, f"wczytano {count} wierszy źródłowych, rozbieżności: {stats.discrepancies}")
+                last_report = now
+        yield row
+
+
+def verification_job(db_config, report_path, group_totals=False, to_database=False):
+    """Funkcja zadania fn(token, progress) dla JobScheduler; zwraca VerificationOutcome."""
+
+    def run(token, progress):
+        started = time.perf_counter()
+        conn = open_db_connection(db_config)
+        try:
+            progress(0, 0, "wczytywanie definicji")
+            definitions = fetch_all_parameters(conn, db_config=db_config)
+            token.raise_if_cancelled()
+            sink = None
+            if to_database:
+                if not has_results_table(conn):
+                    raise ResultsSinkError("Brak tabeli wyników - uruchom: weryfikator_cli.py schemat --zainstaluj")
+                sink = ResultsSink(db_config, source=db_config.get("migration_db"))
+            stats = VerificationStats()
+            discrepancies = run_verification(
+                conn, db_config, definitions, stats=stats,
+                wrap_rows=lambda rows: _checked_rows(rows, token, progress, stats)
+            )
+            try:
+                with sink or nullcontext():
+                    written = write_report(report_path, sink.tee(discrepancies) if sink else discrepancies,
+                                           group_totals=group_totals)
+            except JobCancelled:
+                for path in [report_path] + ([summary_path(report_path)] if group_totals else []):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+            return VerificationOutcome(written, stats, sink, time.perf_counter() - started)
+        finally:
+            conn.close()
+
+    return run
+
+
+def sample_job(db_config, percent, seed):
+    """Funkcja zadania fn(token, progress) dla weryfikacji losowej próby; zwraca SampleResult."""
+
+    def run(token, progress):
+        conn = open_db_connection(db_config)
+        try:
+            stats = VerificationStats()
+
+            def stage(message):
+                token.raise_if_cancelled()
+                progress(0, 0, message)
+
+            return run_sample_verification(
+                conn, db_config, percent=percent, seed=seed, stats=stats, progress=stage,
+                wrap_rows=lambda rows: _checked_rows(rows, token, progress, stats)
+            )
+        finally:
+            conn.close()
+
+    return run
+
+
+class VerificationWidget(QWidget):
+    # IdPrzebiegu wyników zapisanych w bazie (zakładka "Wyniki")
+    runStored = pyqtSignal(str)
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.job = None
+
+        layout = QVBoxLayout(self)
+        file_layout = QHBoxLayout()
+        file_layout.addWidget(QLabel("Raport:"))
+        self.report_edit = QLineEdit(DEFAULT_REPORT_FILE)
+        file_layout.addWidget(self.report_edit)
+        choose_btn = QPushButton("Wybierz...")
+        choose_btn.clicked.connect(self.choose_report_file)
+        file_layout.addWidget(choose_btn)
+        layout.addLayout(file_layout)
+
+        self.summary_check = QCheckBox("Podsumowanie w grupach podstawa / KodSL")
+        self.database_check = QCheckBox("Zapisz wyniki w bazie (tabela wyników weryfikacji)")
+        layout.addWidget(self.summary_check)
+        layout.addWidget(self.database_check)
+
+        btn_layout = QHBoxLayout()
+        self.run_btn = QPushButton("Uruchom weryfikację")
+        self.run_btn.clicked.connect(self.start_verification)
+        self.cancel_btn = QPushButton("Anuluj")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_verification)
+        btn_layout.addWidget(self.run_btn)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addStretch()
+        layout.addLayout(btn_layout)
+
+        self.status_label = QLabel("Weryfikacja działa w tle - w trakcie można edytować definicje.")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        sample_layout = QHBoxLayout()
+        sample_layout.addWidget(QLabel("Próba:"))
+        self.percent_spin = QDoubleSpinBox()
+        self.percent_spin.setRange(0.1, 100.0)
+        self.percent_spin.setSingleStep(0.5)
+        self.percent_spin.setSuffix(" % pracowników")
+        self.percent_spin.setValue(DEFAULT_SAMPLE_PERCENT)
+        sample_layout.addWidget(self.percent_spin)
+        sample_layout.addWidget(QLabel("Ziarno:"))
+        self.seed_edit = QLineEdit()
+        self.seed_edit.setPlaceholderText("losowe")
+        self.seed_edit.setValidator(QIntValidator(0, MAX_SEED - 1, self))
+        sample_layout.addWidget(self.seed_edit)
+        self.sample_btn = QPushButton("Sprawdź próbkę")
+        self.sample_btn.clicked.connect(self.start_sample)
+        sample_layout.addWidget(self.sample_btn)
+        self.full_btn = QPushButton("Pełna weryfikacja")
+        self.full_btn.setEnabled(False)
+        self.full_btn.clicked.connect(self.start_verification)
+        sample_layout.addWidget(self.full_btn)
+        sample_layout.addStretch()
+        layout.addLayout(sample_layout)
+
+        self.sample_text = QPlainTextEdit()
+        self.sample_text.setReadOnly(True)
+        self.sample_text.setPlaceholderText("Wynik próby: oszacowany odsetek rozbieżności z przedziałem ufności.")
+        layout.addWidget(self.sample_text)
+        self.sample_job = None
+        self.sample_result = None
+
+    def choose_report_file(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Plik raportu", self.report_edit.text(),
+                                              "CSV (*.csv);;Excel (*.xlsx)")
+        if path:
+            self.report_edit.setText(path)
+
+    def start_verification(self):
+        report_path = self.report_edit.text().strip()
+        if not report_path:
+            QMessageBox.warning(self, "Weryfikacja", "Podaj plik raportu.")
+            return
+        self.job = self.scheduler.submit(
+            "Weryfikacja",
+            verification_job(load_db_config(), report_path, self.summary_check.isChecked(),
+                             self.database_check.isChecked()),
+            PRIORITY_BATCH,
+            on_result=self._on_finished, on_error=self._on_failed, on_cancelled=self._on_cancelled
+        )
+        self.job.signals.progress.connect(lambda done, total, message: self.status_label.setText(message))
+        self._set_running(True)
+        self.status_label.setText("Weryfikacja oczekuje na wolny wątek...")
+
+    def start_sample(self):
+        seed = int(self.seed_edit.text()) if self.seed_edit.text() else None
+        self.sample_job = self.scheduler.submit(
+            "Próba weryfikacji",
+            sample_job(load_db_config(), self.percent_spin.value(), seed),
+            PRIORITY_INTERACTIVE,
+            on_result=self._on_sample_finished, on_error=self._on_sample_failed,
+            on_cancelled=self._on_sample_cancelled
+        )
+        self.sample_job.signals.progress.connect(
+            lambda done, total, message: self.sample_text.setPlainText(f"Próba: {message}...")
+        )
+        self.sample_btn.setEnabled(False)
+        self.sample_text.setPlainText("Próba oczekuje na wolny wątek...")
+
+    def _on_sample_finished(self, result):
+        self.sample_job = None
+        self.sample_result = result
+        self.sample_btn.setEnabled(True)
+        self.full_btn.setEnabled(self.job is None)
+        self.sample_text.setPlainText(
+            format_sample_result(result)
+            + f"\n\nTę samą próbę da ziarno {result.seed}. \"Pełna weryfikacja\" sprawdza wszystkich pracowników."
+        )
+
+    def _on_sample_failed(self, ex):
+        self.sample_job = None
+        self.sample_btn.setEnabled(True)
+        self.sample_text.setPlainText("Próba przerwana błędem.")
+        QMessageBox.critical(self, "Błąd weryfikacji próby", str(ex))
+
+    def _on_sample_cancelled(self):
+        self.sample_job = None
+        self.sample_btn.setEnabled(True)
+        self.sample_text.setPlainText("Próba anulowana.")
+
+    def cancel_verification(self):
+        if self.job is not None:
+            self.scheduler.cancel(self.job)
+
+    def _set_running(self, running):
+        self.run_btn.setEnabled(not running)
+        self.full_btn.setEnabled(not running and self.sample_result is not None)
+        self.cancel_btn.setEnabled(running)
+        if not running:
+            self.job = None
+
+    def _on_finished(self, outcome):
+        self._set_running(False)
+        text = (f"Weryfikacja zakończona: {outcome.stats}. Zapisano {outcome.written} wierszy do "
+                f"{self.report_edit.text()} ({outcome.seconds:.1f} s).")
+        if outcome.sink is not None:
+            text += f" Przebieg {outcome.sink.run_id} w bazie: {outcome.sink.stats}."
+        self.status_label.setText(text)
+        if outcome.sink is not None:
+            self.runStored.emit(outcome.sink.run_id)
+
+    def _on_failed(self, ex):
+        self._set_running(False)
+        self.status_label.setText("Weryfikacja przerwana błędem.")
+        QMessageBox.critical(self, "Błąd weryfikacji", str(ex))
+
+    def _on_cancelled(self):
+        self._set_running(False)
+        text = "Weryfikacja anulowana - niedokończony raport został usunięty."
+        if self.database_check.isChecked():
+            text += " Wiersze zapisane do chwili anulowania zostają w tabeli wyników."
+        self.status_label.setText(text)
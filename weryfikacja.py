@@ -0,0 +1,277 @@
+# weryfikacja.py
+"""
+Weryfikacja naliczeń na podstawie definicji składników (bez zależności od Qt).
+
+Źródła danych w bazie migracyjnej (nazwy konfigurowalne w db_config.json):
+  - weryfikacja_zrodlo_skladnikow: Pracownik, Okres, KodSL, Kwota
+  - weryfikacja_zrodlo_podstaw:    Pracownik, Okres, Parametr, Kwota
+    (Parametr to klucz bazodanowy z ALL_EXPECTED_HEADERS, np. do_podstawa_zus)
+  - weryfikacja_zrodlo_umow (opcjonalne): Pracownik, RodzajUmowy - tylko do warstw próby
+
+Dla każdego pracownika i okresu podstawa oczekiwana to suma kwot składników, które
+w wer_t_Skladniki_Parametry mają dla danego parametru wartość 'tak'. Rozbieżność
+powstaje, gdy różni się od podstawy naliczonej o więcej niż tolerancja albo gdy
+wypłacono składnik, który nie ma żadnej definicji.
+"""
+
+import re
+from collections import namedtuple, defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from db_utils import ALL_EXPECTED_HEADERS, HEADER_MAPPING
+from skladniki_db import fetch_all_parameters, fetch_variant_parameters
+
+DEFAULT_COMPONENTS_SOURCE = "dbo.wer_v_Naliczenia_Skladniki"
+DEFAULT_BASES_SOURCE = "dbo.wer_v_Naliczenia_Podstawy"
+DEFAULT_TOLERANCE = "0.01"
+FETCH_BATCH_SIZE = 5000
+
+TYP_PODSTAWA = "PODSTAWA"
+TYP_BRAK_DEFINICJI = "BRAK_DEFINICJI"
+
+Rozbieznosc = namedtuple(
+    "Rozbieznosc",
+    ["Pracownik", "Okres", "Parametr", "KodSL", "Oczekiwana", "Naliczona", "Roznica", "Typ"]
+)
+REPORT_COLUMNS = list(Rozbieznosc._fields)
+
+_SOURCE_ROW_COMPONENT = "S"
+_SOURCE_ROW_BASE = "P"
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*){0,2}$")
+
+
+class VerificationError(Exception):
+    """Błąd konfiguracji weryfikacji (np. niepoprawna nazwa źródła)."""
+
+
+class VerificationStats:
+    """Liczniki przebiegu weryfikacji (uzupełniane na bieżąco przez verify_rows)."""
+
+    def __init__(self):
+        self.checked_periods = 0
+        self.discrepancies = 0
+        self.by_type = defaultdict(int)
+
+    def __str__(self):
+        details = ", ".join(f"{typ}: {count}" for typ, count in sorted(self.by_type.items()))
+        return (f"sprawdzono par pracownik/okres: {self.checked_periods}, "
+                f"rozbieżności: {self.discrepancies}" + (f" ({details})" if details else ""))
+
+
+def _source_name(db_config, key, default):
+    name = db_config.get(key) or default
+    if not _IDENTIFIER.match(name):
+        raise VerificationError(f"Niepoprawna nazwa źródła '{name}' w ustawieniu {key}.")
+    return name
+
+
+def _amount(value):
+    if value is None:
+        return Decimal(0)
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def included_parameters(definitions):
+    """Dla każdego KodSL: krotka parametrów, do których składnik wchodzi ('tak')."""
+    return {
+        kod_sl: tuple(param for param in ALL_EXPECTED_HEADERS
+                      if str(params.get(param, "")).strip().lower() == "tak")
+        for kod_sl, params in definitions.items()
+    }
+
+
+def source_query(db_config, conditions=()):
+    """
+    Buduje zapytanie łączące oba źródła w jeden strumień posortowany po (Pracownik, Okres).
+    conditions - warunki SQL (z parametrami ?) nakładane na obie części UNION ALL.
+    """
+    components = _source_name(db_config, "weryfikacja_zrodlo_skladnikow", DEFAULT_COMPONENTS_SOURCE)
+    bases = _source_name(db_config, "weryfikacja_zrodlo_podstaw", DEFAULT_BASES_SOURCE)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+        SELECT Pracownik, Okres, '{_SOURCE_ROW_COMPONENT}' AS Typ, KodSL AS Klucz, Kwota
+        FROM {components} {where}
+        UNION ALL
+        SELECT Pracownik, Okres, '{_SOURCE_ROW_BASE}' AS Typ, Parametr AS Klucz, Kwota
+        FROM {bases} {where}
+        ORDER BY Pracownik, Okres
+    """
+
+
+def fetch_source_values(conn, db_config, column):
+    """
+    Unikalne wartości kolumny Pracownik albo Okres z obu źródeł w kolejności serwera
+    (np. granice zakresów pracowników przy podziale weryfikacji na części).
+    """
+    if column not in ("Pracownik", "Okres"):
+        raise VerificationError(f"Nieobsługiwana kolumna źródła: {column}")
+    components = _source_name(db_config, "weryfikacja_zrodlo_skladnikow", DEFAULT_COMPONENTS_SOURCE)
+    bases = _source_name(db_config, "weryfikacja_zrodlo_podstaw", DEFAULT_BASES_SOURCE)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {column} FROM {components}
+        UNION
+        SELECT {column} FROM {bases}
+        ORDER BY {column}
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def fetch_rarest_component_usage(conn, db_config):
+    """
+    Dla każdego pracownika ze źródła składników: u ilu pracowników występuje jego najrzadszy KodSL
+    (warstwy próby w probkowanie.py). Liczy serwer - pobierany jest jeden wiersz na pracownika.
+    """
+    components = _source_name(db_config, "weryfikacja_zrodlo_skladnikow", DEFAULT_COMPONENTS_SOURCE)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT Pracownik, MIN(Pracownikow)
+        FROM (
+            SELECT Pracownik, COUNT(*) OVER (PARTITION BY KodSL) AS Pracownikow
+            FROM (SELECT DISTINCT Pracownik, KodSL FROM {components}) pary
+        ) uzycie
+        GROUP BY Pracownik
+    """)
+    return {pracownik: usage for pracownik, usage in cursor.fetchall()}
+
+
+def fetch_contract_types(conn, db_config):
+    """
+    Rodzaj umowy pracownika ze źródła weryfikacja_zrodlo_umow (Pracownik, RodzajUmowy); przy kilku
+    umowach brana jest pierwsza alfabetycznie. Bez tego ustawienia zwraca pusty słownik.
+    """
+    if not db_config.get("weryfikacja_zrodlo_umow"):
+        return {}
+    contracts = _source_name(db_config, "weryfikacja_zrodlo_umow", None)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT Pracownik, MIN(RodzajUmowy) FROM {contracts} GROUP BY Pracownik")
+    return {pracownik: rodzaj for pracownik, rodzaj in cursor.fetchall()}
+
+
+def stream_source_rows(conn, db_config, conditions=(), params=(), batch_size=FETCH_BATCH_SIZE):
+    """Strumieniuje wiersze źródłowe paczkami fetchmany (stała pamięć niezależnie od liczby wierszy)."""
+    cursor = conn.cursor()
+    cursor.execute(source_query(db_config, conditions), list(params) * 2)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def verify_rows(rows, definitions, tolerance=DEFAULT_TOLERANCE, stats=None):
+    """
+    Porównuje podstawy oczekiwane z naliczonymi dla strumienia wierszy
+    (Pracownik, Okres, Typ, Klucz, Kwota) posortowanego po (Pracownik, Okres).
+    Zwraca generator Rozbieznosc; w pamięci trzymany jest tylko bieżący pracownik/okres.
+    """
+    tolerance = _amount(tolerance)
+    included = included_parameters(definitions)
+    stats = stats if stats is not None else VerificationStats()
+
+    for (pracownik, okres), group in groupby(rows, key=itemgetter(0, 1)):
+        expected = defaultdict(Decimal)
+        stored = defaultdict(Decimal)
+        for _, _, typ, klucz, kwota in group:
+            if typ == _SOURCE_ROW_COMPONENT:
+                params = included.get(klucz)
+                if params is None:
+                    stats.discrepancies += 1
+                    stats.by_type[TYP_BRAK_DEFINICJI] += 1
+                    yield Rozbieznosc(pracownik, okres, "", klucz, None, None, _amount(kwota), TYP_BRAK_DEFINICJI)
+                    continue
+                for param in params:
+                    expected[param] += _amount(kwota)
+            elif klucz in ALL_EXPECTED_HEADERS:
+                stored[klucz] += _amount(kwota)
+
+        stats.checked_periods += 1
+        for param in ALL_EXPECTED_HEADERS:
+            if param not in expected and param not in stored:
+                continue
+            difference = stored[param] - expected[param]
+            if abs(difference) > tolerance:
+                stats.discrepancies += 1
+                stats.by_type[TYP_PODSTAWA] += 1
+                yield Rozbieznosc(pracownik, okres, param, "", expected[param], stored[param], difference, TYP_PODSTAWA)
+
+
+def run_verification(conn, db_config, definitions=None, conditions=(), params=(), stats=None, wrap_rows=None):
+    """
+    Uruchamia weryfikację na połączeniu conn i zwraca generator Rozbieznosc.
+    Bez podanych definicji pobiera bieżące definicje z wer_t_Skladniki_Parametry.
+    wrap_rows - opcjonalna funkcja opakowująca strumień wierszy źródłowych (np. postęp
+    i anulowanie w GUI - rozbieżności mogą pojawiać się rzadko).
+    """
+    if definitions is None:
+        definitions = fetch_all_parameters(conn, db_config=db_config)
+    tolerance = db_config.get("weryfikacja_tolerancja", DEFAULT_TOLERANCE)
+    rows = stream_source_rows(conn, db_config, conditions, params)
+    if wrap_rows is not None:
+        rows = wrap_rows(rows)
+    return verify_rows(rows, definitions, tolerance, stats)
+
+
+def parameter_label(param):
+    """Nazwa parametru z HEADER_MAPPING w jednej linii (nagłówki tabel mają łamania wierszy)."""
+    return " ".join(HEADER_MAPPING.get(param, param).split())
+
+
+def explain_rows(rows, definitions, tolerance=DEFAULT_TOLERANCE):
+    """
+    Wyprowadzenie podstaw krok po kroku dla wierszy źródłowych JEDNEGO pracownika i okresu:
+    do których podstaw wchodzi każdy wypłacony składnik i z jakich kwot składa się podstawa
+    oczekiwana. Reguły jak w verify_rows. Zwraca listę linii tekstu.
+    """
+    tolerance = _amount(tolerance)
+    included = included_parameters(definitions)
+    components = defaultdict(Decimal)
+    stored = defaultdict(Decimal)
+    for _, _, typ, klucz, kwota in rows:
+        if typ == _SOURCE_ROW_COMPONENT:
+            components[klucz] += _amount(kwota)
+        elif klucz in ALL_EXPECTED_HEADERS:
+            stored[klucz] += _amount(kwota)
+    if not components and not stored:
+        return ["Brak wierszy źródłowych dla tego pracownika i okresu."]
+
+    lines = ["Wypłacone składniki:"]
+    contributions = defaultdict(list)
+    for kod_sl in sorted(components):
+        kwota = components[kod_sl]
+        params = included.get(kod_sl)
+        if params is None:
+            lines.append(f"  {kod_sl}: {kwota:.2f} - brak definicji -> rozbieżność {TYP_BRAK_DEFINICJI}")
+        elif not params:
+            lines.append(f"  {kod_sl}: {kwota:.2f} - nie wchodzi do żadnej podstawy")
+        else:
+            lines.append(f"  {kod_sl}: {kwota:.2f} -> {', '.join(parameter_label(p) for p in params)}")
+            for param in params:
+                contributions[param].append((kod_sl, kwota))
+
+    lines += ["", f"Podstawy (tolerancja {tolerance}):"]
+    for param in ALL_EXPECTED_HEADERS:
+        if param not in contributions and param not in stored:
+            continue
+        expected = sum((kwota for _, kwota in contributions[param]), Decimal(0))
+        terms = " + ".join(f"{kod_sl} {kwota:.2f}" for kod_sl, kwota in contributions[param]) or "brak składników"
+        difference = stored[param] - expected
+        verdict = "ROZBIEŻNOŚĆ" if abs(difference) > tolerance else "zgodna"
+        lines.append(f"  {parameter_label(param)} ({param}): oczekiwana = {terms} = {expected:.2f}")
+        lines.append(f"      naliczona {stored[param]:.2f}, różnica {difference:.2f} -> {verdict}")
+    return lines
+
+
+def explain_period(conn, db_config, pracownik, okres):
+    """
+    Wyprowadzenie dla jednego pracownika i okresu na żądanie: pobiera tylko jego wiersze źródłowe
+    i bieżące definicje wypłaconych KodSL (bez przeliczania całej weryfikacji).
+    """
+    rows = list(stream_source_rows(conn, db_config, ["Pracownik = ?", "Okres = ?"], [pracownik, okres]))
+    kod_sl_list = sorted({klucz for _, _, typ, klucz, _ in rows if typ == _SOURCE_ROW_COMPONENT})
+    # KodSL bez wierszy definicji to "brak definicji" (jak przy fetch_all_parameters).
+    definitions = {kod_sl: params for kod_sl, params in fetch_variant_parameters(conn, kod_sl_list).items() if params}
+    tolerance = db_config.get("weryfikacja_tolerancja", DEFAULT_TOLERANCE)
+    return explain_rows(rows, definitions, tolerance)
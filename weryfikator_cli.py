@@ -0,0 +1,413 @@
+# weryfikator_cli.py
+"""
+Tryb wsadowy (bez GUI i bez importu PyQt) - np. do nocnych przebiegów z crona:
+
+    python weryfikator_cli.py weryfikuj --raport raport.xlsx [--podsumowanie] [--wszystkie-cele | --cel NAZWA ...] [--do-bazy]
+    python weryfikator_cli.py probka [--procent 1 | --liczba N] [--ziarno Z] [--raport probka.csv]
+    python weryfikator_cli.py definicje --raport definicje.csv [--cel NAZWA ...]
+    python weryfikator_cli.py porownaj 0127 0128
+    python weryfikator_cli.py kontrola
+    python weryfikator_cli.py schemat [--zainstaluj]
+    python weryfikator_cli.py shardy --kolejka kolejka.db [--cel NAZWA]
+    python weryfikator_cli.py pracuj --kolejka kolejka.db
+    python weryfikator_cli.py postep --kolejka kolejka.db [--raport raport.csv]
+    python weryfikator_cli.py eksport --plik definicje.parquet
+    python weryfikator_cli.py import --plik definicje.csv --tryb scal
+    python weryfikator_cli.py sync --kierunek json-do-bazy [--zastosuj]
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from contextlib import nullcontext
+
+import pyodbc
+
+from db_utils import ALL_EXPECTED_HEADERS, CONFIG_FILE_NAME, load_db_config, get_db_connection
+from kontrola_definicji import lint_definitions
+from kolejka_shardow import (
+    EMPLOYEES_PER_SHARD, HEARTBEAT_S, SHARD_TIMEOUT_S, ShardQueue, ShardQueueError, format_progress, is_finished,
+    plan_shards, run_worker
+)
+from probkowanie import DEFAULT_SAMPLE_PERCENT, format_sample_result, run_sample_verification
+from porownanie import N_BUCKETS, compare_definitions, format_comparison
+from raport import ReportError, write_report
+from schemat import MIGRATIONS, install_schema, pending_migrations, schema_version
+from skladniki_db import fetch_all_parameters
+from skladniki_transfer import (
+    CHUNK_SIZE, FORMAT_CSV, FORMAT_PARQUET, MODE_MERGE, MODE_REPLACE, TransferError,
+    export_parameters, import_parameters
+)
+from skladniki_sync import DEFINICJE_SKLADNIKOW_FILE, DIRECTION_DB_TO_JSON, DIRECTION_JSON_TO_DB, sync_definitions
+from weryfikacja import REPORT_COLUMNS, VerificationError, VerificationStats, run_verification
+from wyniki_db import ResultsSink, ResultsSinkError, has_results_table, iter_results
+from wiele_baz import (
+    MERGED_REPORT_COLUMNS, SOURCE_COLUMN, format_timings, load_definitions_all, merged_definitions,
+    run_verification_all, select_targets
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_FILE = os.path.join(APP_DIR, CONFIG_FILE_NAME)
+
+EXIT_OK = 0
+EXIT_DIFFERENCES = 1
+EXIT_ERROR = 2
+
+
+def _open_connection(args):
+    db_config = load_db_config(args.konfiguracja)
+    conn = get_db_connection(db_config)
+    if not conn:
+        raise SystemExit(EXIT_ERROR)
+    return db_config, conn
+
+
+def _results_sink(args, db_config, conn, source=None):
+    """ResultsSink dla --do-bazy (None bez opcji); tabela wyników to wersja 4 schematu."""
+    if not args.do_bazy:
+        return None
+    if not has_results_table(conn):
+        raise ResultsSinkError("Brak tabeli wyników - uruchom: weryfikator_cli.py schemat --zainstaluj")
+    sink = ResultsSink(db_config, source=source)
+    print(f"Wyniki przebiegu {sink.run_id} będą zapisane w bazie.")
+    return sink
+
+
+def _print_sink_stats(sink):
+    if sink is not None:
+        print(f"Zapis wyników do bazy: {sink.stats}.")
+
+
+def _selected_targets(args):
+    names = None if args.wszystkie_cele else args.cel
+    return select_targets(load_db_config(args.konfiguracja), names)
+
+
+def _report_target_errors(results):
+    failed = [r for r in results if r.error is not None]
+    for r in failed:
+        print(f"Błąd bazy {r.name}: {r.error}", file=sys.stderr)
+    return EXIT_ERROR if failed else EXIT_OK
+
+
+def command_weryfikuj_wiele(args):
+    targets = _selected_targets(args)
+    sink = None
+    if args.do_bazy:
+        # Wyniki ze wszystkich baz trafiają do pierwszej z nich (kolumna Zrodlo rozróżnia bazy).
+        conn = get_db_connection(targets[0])
+        if not conn:
+            return EXIT_ERROR
+        try:
+            sink = _results_sink(args, targets[0], conn)
+        finally:
+            conn.close()
+    started = time.perf_counter()
+    rows, results = run_verification_all(targets)
+    with sink or nullcontext():
+        written = write_report(args.raport, sink.tee_merged(rows) if sink else rows, MERGED_REPORT_COLUMNS,
+                               group_totals=args.podsumowanie)
+    print(f"Weryfikacja {len(targets)} baz zakończona. Zapisano {written} wierszy do {args.raport} "
+          f"({time.perf_counter() - started:.2f} s):")
+    for r in results:
+        print(f"  {r.name}: {r.result}")
+    print(format_timings(results))
+    _print_sink_stats(sink)
+    return _report_target_errors(results)
+
+
+def command_probka(args):
+    db_config, conn = _open_connection(args)
+    try:
+        result = run_sample_verification(conn, db_config, percent=args.procent, size=args.liczba, seed=args.ziarno,
+                                         progress=print)
+    finally:
+        conn.close()
+    print(format_sample_result(result))
+    if args.raport:
+        written = write_report(args.raport, result.discrepancies)
+        print(f"Zapisano {written} rozbieżności z próby do {args.raport}.")
+    print(f"Ta sama próba: --ziarno {result.seed}; "
+          f"pełna weryfikacja: weryfikator_cli.py weryfikuj --raport raport.csv")
+    return EXIT_OK
+
+
+def command_definicje(args):
+    targets = _selected_targets(args)
+    started = time.perf_counter()
+    results = load_definitions_all(targets)
+    written = 0
+    with open(args.raport, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([SOURCE_COLUMN, "KodSL"] + ALL_EXPECTED_HEADERS)
+        for name, kod_sl, params in merged_definitions(results):
+            writer.writerow([name, kod_sl] + [params.get(header, "") for header in ALL_EXPECTED_HEADERS])
+            written += 1
+    print(f"Zapisano {written} definicji z {len(targets)} baz do {args.raport} "
+          f"({time.perf_counter() - started:.2f} s):")
+    print(format_timings(results))
+    return _report_target_errors(results)
+
+
+def command_porownaj(args):
+    left, right = select_targets(load_db_config(args.konfiguracja), [args.lewa, args.prawa])
+    started = time.perf_counter()
+    result = compare_definitions(left, right, args.kubelki)
+    print(format_comparison(result, left["name"], right["name"]))
+    print(f"Porównanie zakończone ({time.perf_counter() - started:.2f} s).")
+    identical = not (result.only_left or result.only_right or result.different)
+    return EXIT_OK if identical else EXIT_DIFFERENCES
+
+
+def command_kontrola(args):
+    db_config, conn = _open_connection(args)
+    try:
+        definitions = fetch_all_parameters(conn)
+    finally:
+        conn.close()
+    findings = lint_definitions(definitions, db_config.get("definition_lint_exemptions"))
+    for finding in findings:
+        print(f"{finding.kod_sl};{finding.parametr};{finding.regula};{finding.komunikat}")
+    print(f"Sprawdzono {len(definitions)} KodSL: {len(findings)} uwag.")
+    return EXIT_DIFFERENCES if findings else EXIT_OK
+
+
+def _shard_target(args):
+    """Baza kolejki części: --cel z migration_targets albo główna konfiguracja."""
+    db_config = load_db_config(args.konfiguracja)
+    return select_targets(db_config, [args.cel])[0] if args.cel else db_config
+
+
+def command_shardy(args):
+    target = _shard_target(args)
+    conn = get_db_connection(target)
+    if not conn:
+        return EXIT_ERROR
+    try:
+        definitions = fetch_all_parameters(conn)
+    finally:
+        conn.close()
+    started = time.perf_counter()
+    run_id, count = plan_shards(args.kolejka, target, definitions, args.pracownikow, source=args.cel)
+    print(f"Kolejka {args.kolejka}: przebieg {run_id}, {count} części, {len(definitions)} definicji "
+          f"({time.perf_counter() - started:.2f} s). Na każdym stanowisku uruchom: "
+          f"weryfikator_cli.py pracuj --kolejka {args.kolejka}")
+    return EXIT_OK
+
+
+def command_pracuj(args):
+    target = _shard_target(args)
+    done = run_worker(args.kolejka, target, worker=args.nazwa, max_shards=args.limit,
+                      heartbeat_s=target.get("shard_heartbeat_s", HEARTBEAT_S),
+                      timeout_s=target.get("shard_timeout_s", SHARD_TIMEOUT_S))
+    print(f"Ten proces zakończył {done} części.")
+    print(format_progress(args.kolejka))
+    return EXIT_OK
+
+
+def command_postep(args):
+    print(format_progress(args.kolejka))
+    _, _, failed = ShardQueue(args.kolejka).progress()
+    if failed:
+        return EXIT_ERROR
+    if not is_finished(args.kolejka):
+        return EXIT_DIFFERENCES
+    if args.raport:
+        run_id = ShardQueue(args.kolejka).meta()["przebieg"]
+        conn = get_db_connection(_shard_target(args))
+        if not conn:
+            return EXIT_ERROR
+        try:
+            written = write_report(args.raport, iter_results(conn, run_id), REPORT_COLUMNS,
+                                   group_totals=args.podsumowanie)
+        finally:
+            conn.close()
+        print(f"Zapisano {written} wierszy przebiegu {run_id} do {args.raport}.")
+    return EXIT_OK
+
+
+def command_schemat(args):
+    _, conn = _open_connection(args)
+    try:
+        if args.zainstaluj:
+            installed = install_schema(conn)
+            print(f"Zainstalowano wersje: {', '.join(map(str, installed))}." if installed
+                  else "Schemat jest aktualny.")
+        print(f"Wersja schematu: {schema_version(conn)} z {MIGRATIONS[-1][0]}.")
+        for version, description, _ in pending_migrations(conn):
+            print(f"  do instalacji: {version} - {description}")
+    finally:
+        conn.close()
+    return EXIT_OK
+
+
+def command_weryfikuj(args):
+    if args.wszystkie_cele or args.cel:
+        return command_weryfikuj_wiele(args)
+    db_config, conn = _open_connection(args)
+    try:
+        started = time.perf_counter()
+        definitions = fetch_all_parameters(conn)
+        print(f"Wczytano definicje {len(definitions)} składników ({time.perf_counter() - started:.2f} s).")
+
+        sink = _results_sink(args, db_config, conn, db_config.get("migration_db"))
+        stats = VerificationStats()
+        discrepancies = run_verification(conn, db_config, definitions, stats=stats)
+        with sink or nullcontext():
+            written = write_report(args.raport, sink.tee(discrepancies) if sink else discrepancies,
+                                   group_totals=args.podsumowanie)
+        print(f"Weryfikacja zakończona: {stats}. Zapisano {written} wierszy do {args.raport} "
+              f"({time.perf_counter() - started:.2f} s).")
+        _print_sink_stats(sink)
+    finally:
+        conn.close()
+    return EXIT_OK
+
+
+def command_eksport(args):
+    _, conn = _open_connection(args)
+    try:
+        started = time.perf_counter()
+        count = export_parameters(conn, args.plik, args.format, args.rozmiar_paczki)
+        print(f"Wyeksportowano {count} wierszy do {args.plik} ({time.perf_counter() - started:.2f} s).")
+    finally:
+        conn.close()
+    return EXIT_OK
+
+
+def command_import(args):
+    _, conn = _open_connection(args)
+    try:
+        started = time.perf_counter()
+        count = import_parameters(conn, args.plik, args.format, args.tryb, args.rozmiar_paczki)
+        print(f"Zaimportowano {count} wierszy z {args.plik} w trybie '{args.tryb}' "
+              f"({time.perf_counter() - started:.2f} s).")
+    finally:
+        conn.close()
+    return EXIT_OK
+
+
+def command_sync(args):
+    _, conn = _open_connection(args)
+    try:
+        started = time.perf_counter()
+        _, report = sync_definitions(conn, args.kierunek, args.plik, apply=args.zastosuj)
+        print(report)
+        status = "Zastosowano zmiany" if args.zastosuj else "Tryb próbny (dry-run) - bez zmian"
+        print(f"{status} ({time.perf_counter() - started:.2f} s).")
+    finally:
+        conn.close()
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Weryfikator naliczeń - tryb wsadowy.")
+    parser.add_argument("--konfiguracja", default=DEFAULT_CONFIG_FILE,
+                        help="Ścieżka do pliku db_config.json.")
+    subparsers = parser.add_subparsers(dest="polecenie", required=True)
+
+    weryfikuj = subparsers.add_parser("weryfikuj", help="Wczytuje definicje, weryfikuje naliczenia i zapisuje raport.")
+    weryfikuj.add_argument("--raport", required=True, help="Plik wynikowy CSV lub XLSX (wg rozszerzenia).")
+    weryfikuj.add_argument("--podsumowanie", action="store_true",
+                           help="Dołącz podsumowanie rozbieżności w grupach podstawa / KodSL.")
+    weryfikuj.set_defaults(handler=command_weryfikuj)
+
+    probka = subparsers.add_parser("probka", help="Szybka weryfikacja losowej próby pracowników "
+                                                  "z oszacowaniem odsetka rozbieżności.")
+    size = probka.add_mutually_exclusive_group()
+    size.add_argument("--procent", type=float, default=DEFAULT_SAMPLE_PERCENT,
+                      help="Wielkość próby w procentach pracowników.")
+    size.add_argument("--liczba", type=int, help="Wielkość próby w liczbie pracowników.")
+    probka.add_argument("--ziarno", type=int, help="Ziarno losowania (to samo ziarno - ta sama próba).")
+    probka.add_argument("--raport", help="Plik CSV/XLSX z rozbieżnościami znalezionymi w próbie.")
+    probka.set_defaults(handler=command_probka)
+
+    definicje = subparsers.add_parser("definicje", help="Zapisuje definicje składników z wielu baz do jednego CSV.")
+    definicje.add_argument("--raport", required=True, help="Plik wynikowy CSV.")
+    definicje.set_defaults(handler=command_definicje)
+
+    porownaj = subparsers.add_parser("porownaj", help="Porównuje definicje składników dwóch baz z migration_targets.")
+    porownaj.add_argument("lewa", help="Nazwa pierwszej bazy.")
+    porownaj.add_argument("prawa", help="Nazwa drugiej bazy.")
+    porownaj.add_argument("--kubelki", type=int, default=N_BUCKETS,
+                          help="Liczba kubełków skrótów (więcej = mniej danych przy nielicznych różnicach).")
+    porownaj.set_defaults(handler=command_porownaj)
+
+    kontrola = subparsers.add_parser("kontrola", help="Sprawdza wiarygodność definicji składników "
+                                                      "(kod 1 - są uwagi).")
+    kontrola.set_defaults(handler=command_kontrola)
+
+    schemat = subparsers.add_parser("schemat", help="Pokazuje/instaluje obiekty przyspieszające odczyt (indeks, widok).")
+    schemat.add_argument("--zainstaluj", action="store_true", help="Zainstaluj brakujące wersje schematu.")
+    schemat.set_defaults(handler=command_schemat)
+
+    shardy = subparsers.add_parser("shardy", help="Dzieli weryfikację na części (okres x zakres pracowników) "
+                                                  "w kolejce SQLite dla kilku stanowisk.")
+    shardy.add_argument("--pracownikow", type=int, default=EMPLOYEES_PER_SHARD,
+                        help="Liczba pracowników w jednej części.")
+    shardy.set_defaults(handler=command_shardy)
+
+    pracuj = subparsers.add_parser("pracuj", help="Weryfikuje kolejne części z kolejki (uruchom na każdym stanowisku).")
+    pracuj.add_argument("--nazwa", help="Nazwa procesu w kolejce (domyślnie komputer-pid).")
+    pracuj.add_argument("--limit", type=int, help="Zakończ po tylu częściach.")
+    pracuj.set_defaults(handler=command_pracuj)
+
+    postep = subparsers.add_parser("postep", help="Stan kolejki części; kod 0 - gotowe, 1 - w toku, 2 - części z błędem.")
+    postep.add_argument("--raport", help="Po zakończeniu: raport CSV/XLSX z wynikami całego przebiegu.")
+    postep.add_argument("--podsumowanie", action="store_true",
+                        help="Dołącz podsumowanie rozbieżności w grupach podstawa / KodSL.")
+    postep.set_defaults(handler=command_postep)
+
+    for queue_command in (shardy, pracuj, postep):
+        queue_command.add_argument("--kolejka", required=True, help="Plik kolejki SQLite (na wspólnym dysku).")
+        queue_command.add_argument("--cel", metavar="NAZWA", help="Nazwa bazy z migration_targets.")
+
+    for multi in (weryfikuj, definicje):
+        multi.add_argument("--wszystkie-cele", action="store_true",
+                           help="Wszystkie bazy z listy migration_targets (raport z kolumną Zrodlo).")
+        multi.add_argument("--cel", action="append", metavar="NAZWA",
+                           help="Nazwa bazy z migration_targets (można podać wielokrotnie).")
+    weryfikuj.add_argument("--do-bazy", action="store_true",
+                           help="Zapisz rozbieżności także w tabeli dbo.wer_t_Wyniki_Weryfikacji (w tle).")
+
+    for name, handler, description in (
+            ("eksport", command_eksport, "Eksportuje wer_t_Skladniki_Parametry do pliku CSV/Parquet."),
+            ("import", command_import, "Importuje wer_t_Skladniki_Parametry z pliku CSV/Parquet.")):
+        transfer = subparsers.add_parser(name, help=description)
+        transfer.add_argument("--plik", required=True, help="Plik .csv lub .parquet.")
+        transfer.add_argument("--format", choices=[FORMAT_CSV, FORMAT_PARQUET],
+                              help="Format pliku (domyślnie na podstawie rozszerzenia).")
+        transfer.add_argument("--rozmiar-paczki", type=int, default=CHUNK_SIZE,
+                              help="Liczba wierszy w jednej paczce (ogranicza zużycie pamięci).")
+        transfer.set_defaults(handler=handler)
+        if name == "import":
+            transfer.add_argument("--tryb", choices=[MODE_MERGE, MODE_REPLACE], default=MODE_MERGE,
+                                  help="scal - podmienia tylko KodSL z pliku, zastap - całą tabelę.")
+
+    sync = subparsers.add_parser("sync", help="Porównuje definicje z pliku JSON z bazą i synchronizuje je.")
+    sync.add_argument("--kierunek", required=True, choices=[DIRECTION_JSON_TO_DB, DIRECTION_DB_TO_JSON],
+                      help="Która strona jest źródłem prawdy.")
+    sync.add_argument("--plik", default=os.path.join(APP_DIR, DEFINICJE_SKLADNIKOW_FILE),
+                      help="Plik definicji składników (JSON).")
+    sync.add_argument("--zastosuj", action="store_true",
+                      help="Zastosuj plan (domyślnie tylko raport dry-run).")
+    sync.set_defaults(handler=command_sync)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (pyodbc.Error, VerificationError, TransferError, ResultsSinkError, ReportError, ShardQueueError,
+            sqlite3.Error, OSError, ValueError) as ex:
+        print(f"Błąd: {ex}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
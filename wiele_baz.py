@@ -0,0 +1,144 @@
+# wiele_baz.py
+"""
+Równoległa praca na wielu bazach migracyjnych (bez zależności od Qt).
+
+Lista baz pochodzi z db_utils.load_targets (ustawienie "migration_targets" w db_config.json).
+Każda baza ma własną pulę połączeń, a zadania dla baz są wykonywane równolegle w puli wątków
+(zapytania czekają na serwer, więc GIL nie ogranicza równoległości). Wyniki ze wszystkich baz
+są łączone w jeden strumień z kolumną Zrodlo (nazwa bazy).
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from db_utils import get_connection_pool, load_targets
+from skladniki_db import fetch_all_parameters
+from weryfikacja import REPORT_COLUMNS, VerificationStats, run_verification
+
+SOURCE_COLUMN = "Zrodlo"
+MERGED_REPORT_COLUMNS = [SOURCE_COLUMN] + REPORT_COLUMNS
+POOL_SIZE = 2
+_QUEUE_SIZE = 10000
+
+# name - nazwa bazy, result - wynik zadania (None przy błędzie), error - wyjątek albo None,
+# seconds - czas wykonania zadania dla tej bazy.
+TargetResult = namedtuple("TargetResult", ["name", "result", "error", "seconds"])
+
+
+def select_targets(db_config, names=None):
+    """Zwraca bazy z konfiguracji; names zawęża listę (nieznana nazwa -> ValueError)."""
+    targets = load_targets(db_config)
+    if not names:
+        return targets
+    by_name = {target["name"]: target for target in targets}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Nieznane bazy w konfiguracji: {', '.join(unknown)}. "
+                         f"Dostępne: {', '.join(by_name)}.")
+    return [by_name[name] for name in names]
+
+
+def _connection(target):
+    return get_connection_pool(target, target.get("pool_size", POOL_SIZE)).connection()
+
+
+def fan_out(targets, task, max_workers=None):
+    """
+    Wykonuje task(target, conn) równolegle dla każdej bazy na połączeniu z jej puli.
+    Błąd jednej bazy nie przerywa pozostałych - trafia do TargetResult.error.
+    Zwraca listę TargetResult w kolejności targets.
+    """
+    def run(target):
+        started = time.perf_counter()
+        try:
+            with _connection(target) as conn:
+                result = task(target, conn)
+            return TargetResult(target["name"], result, None, time.perf_counter() - started)
+        except Exception as ex:
+            return TargetResult(target["name"], None, ex, time.perf_counter() - started)
+
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(targets)) as executor:
+        return list(executor.map(run, targets))
+
+
+def load_definitions_all(targets, max_workers=None):
+    """Pobiera macierz definicji (fetch_all_parameters) ze wszystkich baz równolegle."""
+    return fan_out(targets, lambda target, conn: fetch_all_parameters(conn, db_config=target), max_workers)
+
+
+def merged_definitions(results):
+    """Łączy wyniki load_definitions_all w wiersze (Zrodlo, KodSL, {parametr: wartość})."""
+    for target_result in results:
+        if target_result.error is None:
+            for kod_sl, params in target_result.result.items():
+                yield target_result.name, kod_sl, params
+
+
+def run_verification_all(targets, max_workers=None):
+    """
+    Weryfikuje naliczenia we wszystkich bazach równolegle.
+    Zwraca (rows, results): rows - generator krotek (Zrodlo, *Rozbieznosc) w kolejności
+    napływania, results - lista TargetResult (result = VerificationStats) uzupełniana
+    w trakcie; jest kompletna po wyczerpaniu rows.
+    """
+    rows_queue = queue.Queue(maxsize=_QUEUE_SIZE)  # ogranicza pamięć, gdy odbiorca nie nadąża
+    cancelled = threading.Event()
+    results = []
+    done = object()
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                rows_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def verify(target):
+        started = time.perf_counter()
+        stats = VerificationStats()
+        error = None
+        try:
+            with _connection(target) as conn:
+                for discrepancy in run_verification(conn, target, stats=stats):
+                    if cancelled.is_set():
+                        break
+                    put((target["name"],) + tuple(discrepancy))
+        except Exception as ex:
+            error = ex
+        put((done, TargetResult(target["name"], stats, error, time.perf_counter() - started)))
+
+    def rows():
+        executor = ThreadPoolExecutor(max_workers=max_workers or max(len(targets), 1))
+        try:
+            for target in targets:
+                executor.submit(verify, target)
+            remaining = len(targets)
+            while remaining:
+                item = rows_queue.get()
+                if item[0] is done:
+                    results.append(item[1])
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True)
+            order = {target["name"]: i for i, target in enumerate(targets)}
+            results.sort(key=lambda r: order[r.name])
+
+    return rows(), results
+
+
+def format_timings(results):
+    """Raport czasów per baza (jedna linia na bazę)."""
+    lines = []
+    for target_result in results:
+        status = f"BŁĄD: {target_result.error}" if target_result.error is not None else "OK"
+        lines.append(f"  {target_result.name}: {target_result.seconds:.2f} s - {status}")
+    return "\n".join(lines)
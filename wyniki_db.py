@@ -0,0 +1,369 @@
+# wyniki_db.py
+"""
+Zapis rozbieżności weryfikacji do tabeli dbo.wer_t_Wyniki_Weryfikacji (bez zależności od Qt).
+
+ResultsSink zbiera wiersze w paczki, a osobny wątek zapisuje je przez fast_executemany
+(typy parametrów ustawione z góry przez setinputsizes), każdą paczkę w osobnej transakcji.
+Dodanie wiersza nigdy nie czeka na serwer - przy wolnym zapisie paczki czekają w kolejce
+(największe zaległości są w statystykach). Wiersze jednego przebiegu mają wspólne IdPrzebiegu.
+
+    with ResultsSink(db_config, source="0127") as sink:
+        for row in sink.tee(run_verification(conn, db_config)):
+            ...
+    print(sink.stats)
+
+Odczyt dla przeglądarki wyników (wersja 5 schematu): fetch_results_page zwraca kolejne strony
+przebiegu paginacją kluczem (wartość kolumny sortowania, IdWyniku) - każde przewinięcie to jedno
+zapytanie po indeksie, niezależnie od liczby wierszy w przebiegu. Filtry (ResultsFilter) i sortowanie
+liczy serwer. Listę przebiegów (fetch_runs) daje tabela przebiegów z wersji 7 - jej licznik wierszy jest
+aktualizowany w tej samej transakcji co każda paczka wyników.
+"""
+
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+import pyodbc
+
+from db_utils import open_db_connection
+from schemat import RESULT_KEY_COLUMN, RESULTS_TABLE, RUNS_TABLE
+
+RESULTS_BATCH_SIZE = 10000
+RESULTS_PAGE_SIZE = 500
+_TEXT_SIZE = 100
+
+RESULT_COLUMNS = [
+    "IdPrzebiegu", "Zrodlo", "Pracownik", "Okres", "Parametr", "KodSL",
+    "Oczekiwana", "Naliczona", "Roznica", "Typ"
+]
+_INSERT_SQL = (
+    f"INSERT INTO {RESULTS_TABLE} ({', '.join(RESULT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in RESULT_COLUMNS)})"
+)
+# (typ SQL, rozmiar, miejsca po przecinku) - jak w definicji tabeli (schemat.py, wersja 4)
+_INPUT_SIZES = (
+    [(pyodbc.SQL_WVARCHAR, 36, 0), (pyodbc.SQL_WVARCHAR, 200, 0)]
+    + [(pyodbc.SQL_WVARCHAR, _TEXT_SIZE, 0)] * 4
+    + [(pyodbc.SQL_DECIMAL, 19, 4)] * 3
+    + [(pyodbc.SQL_WVARCHAR, 20, 0)]
+)
+_STOP = object()
+
+# Kolumny stron przeglądarki; ostatnia (RoznicaAbs) służy tylko do paginacji po wielkości różnicy.
+BROWSER_COLUMNS = [
+    RESULT_KEY_COLUMN, "Zrodlo", "Pracownik", "Okres", "Parametr", "KodSL",
+    "Oczekiwana", "Naliczona", "Roznica", "Typ", "RoznicaAbs"
+]
+# etykieta -> (kolumna, malejąco); każda kolumna ma indeks (IdPrzebiegu, kolumna, IdWyniku)
+RESULT_SORTS = OrderedDict([
+    ("Kolejność zapisu", (RESULT_KEY_COLUMN, False)),
+    ("Największa różnica", ("RoznicaAbs", True)),
+    ("Pracownik", ("Pracownik", False)),
+    ("KodSL", ("KodSL", False)),
+    ("Podstawa", ("Parametr", False)),
+])
+DEFAULT_RESULT_SORT = RESULT_KEY_COLUMN, False
+
+# kod_sl - prefiks KodSL, parametr - klucz do_*, typ - weryfikacja.TYP_*, min_difference - najmniejsza
+# wartość bezwzględna różnicy, pracownik - dokładny identyfikator; None = bez filtra.
+ResultsFilter = namedtuple(
+    "ResultsFilter", ["run_id", "kod_sl", "parametr", "typ", "min_difference", "pracownik"],
+    defaults=(None, None, None, None, None)
+)
+
+
+class ResultsSinkError(Exception):
+    """Zapis wyników do bazy nie powiódł się (wątek zapisu zakończył pracę)."""
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _result_row(run_id, source, discrepancy):
+    pracownik, okres, parametr, kod_sl, oczekiwana, naliczona, roznica, typ = discrepancy
+    return (run_id, source, _text(pracownik), _text(okres), parametr, kod_sl, oczekiwana, naliczona, roznica, typ)
+
+
+class SinkStats:
+    """Liczniki zapisu: wiersze w bazie, czas pracy wątku zapisu i największe zaległości."""
+
+    def __init__(self):
+        self.rows_written = 0
+        self.batches_written = 0
+        self.write_seconds = 0.0
+        self.peak_backlog = 0  # największa liczba paczek czekających na zapis
+        self.error = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.write_seconds if self.write_seconds else 0.0
+
+    def __str__(self):
+        text = (f"zapisano {self.rows_written} wierszy w {self.batches_written} paczkach "
+                f"({self.rows_per_second:.0f} wierszy/s, najwięcej paczek w kolejce: {self.peak_backlog})")
+        return text + (f", BŁĄD: {self.error}" if self.error is not None else "")
+
+
+class ResultsSink:
+    """
+    Zapisuje w tle rozbieżności (krotki w układzie weryfikacja.REPORT_COLUMNS) do RESULTS_TABLE.
+    Wątek zapisu ma własne połączenie; close() (albo wyjście z bloku with) zapisuje resztę
+    i czeka na koniec zapisu. Błąd zapisu nie przerywa weryfikacji - kolejne paczki są
+    pomijane, a close() zgłasza ResultsSinkError.
+    """
+
+    def __init__(self, db_config, run_id=None, source=None, batch_size=RESULTS_BATCH_SIZE):
+        self.db_config = db_config
+        self.run_id = run_id or str(uuid.uuid4())
+        self.source = source
+        self.batch_size = batch_size
+        self.stats = SinkStats()
+        self._buffer = []
+        self._batches = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="ResultsSink", daemon=True)
+        self._thread.start()
+
+    def add(self, discrepancy, source=None):
+        self._buffer.append(_result_row(self.run_id, source or self.source, discrepancy))
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def tee(self, discrepancies):
+        """Przekazuje rozbieżności dalej (np. do raportu CSV), po drodze dodając je do zapisu."""
+        for discrepancy in discrepancies:
+            self.add(discrepancy)
+            yield discrepancy
+
+    def tee_merged(self, rows):
+        """Jak tee, dla wierszy z kolumną Zrodlo na początku (wiele_baz.run_verification_all)."""
+        for row in rows:
+            self.add(row[1:], source=row[0])
+            yield row
+
+    def _flush(self):
+        if self._buffer:
+            self._batches.put(self._buffer)
+            self._buffer = []
+            self.stats.peak_backlog = max(self.stats.peak_backlog, self._batches.qsize())
+
+    def close(self):
+        """Zapisuje pozostałe wiersze i czeka na wątek zapisu; zwraca statystyki."""
+        if self._thread.is_alive():
+            self._flush()
+            self._batches.put(_STOP)
+            self._thread.join()
+        if self.stats.error is not None:
+            raise ResultsSinkError(f"Nie zapisano wyników przebiegu {self.run_id}: {self.stats.error}")
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Błąd weryfikacji ma pierwszeństwo - zapisujemy to, co już jest, bez maskowania wyjątku;
+            # błąd zapisu trafia tylko na stderr (jak błędy połączenia w db_utils poza GUI).
+            try:
+                self.close()
+            except ResultsSinkError as ex:
+                print(ex, file=sys.stderr)
+        return False
+
+    def _write_loop(self):
+        conn = None
+        count_runs = False
+        try:
+            while True:
+                batch = self._batches.get()
+                if batch is _STOP:
+                    return
+                if self.stats.error is not None:
+                    continue  # po błędzie tylko opróżniamy kolejkę
+                try:
+                    if conn is None:
+                        conn = open_db_connection(self.db_config)
+                        cursor = conn.cursor()
+                        cursor.fast_executemany = True
+                        count_runs = has_runs_table(conn)
+                    started = time.perf_counter()
+                    cursor.setinputsizes(_INPUT_SIZES)
+                    cursor.executemany(_INSERT_SQL, batch)
+                    if count_runs:
+                        _count_run_rows(conn, self.run_id, self.source or batch[0][1], len(batch))
+                    conn.commit()
+                    self.stats.write_seconds += time.perf_counter() - started
+                    self.stats.rows_written += len(batch)
+                    self.stats.batches_written += 1
+                except Exception as ex:
+                    self.stats.error = ex
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def has_results_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT OBJECT_ID('{RESULTS_TABLE}', 'U')")
+    return cursor.fetchone()[0] is not None
+
+
+def has_runs_table(conn):
+    """Czy baza ma tabelę przebiegów (wersja 7 schematu)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT OBJECT_ID('{RUNS_TABLE}', 'U')")
+    return cursor.fetchone()[0] is not None
+
+
+def _count_run_rows(conn, run_id, source, delta):
+    """Zakłada wiersz przebiegu (jeśli go nie ma) i dodaje delta do jego licznika, BEZ commit."""
+    cursor = conn.cursor()  # osobny kursor - kursor paczek ma ustawione setinputsizes
+    cursor.execute(f"""
+        INSERT INTO {RUNS_TABLE} (IdPrzebiegu, Zrodlo)
+        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM {RUNS_TABLE} WHERE IdPrzebiegu = ?)
+    """, [run_id, source, run_id])
+    if delta:
+        cursor.execute(f"UPDATE {RUNS_TABLE} SET Wiersze = Wiersze + ? WHERE IdPrzebiegu = ?", [delta, run_id])
+
+
+def register_run(conn, run_id, source=None):
+    """Zakłada pusty wiersz przebiegu (np. przy planowaniu części), żeby był na liście przed pierwszym wynikiem."""
+    if has_runs_table(conn):
+        _count_run_rows(conn, run_id, source, 0)
+        conn.commit()
+
+
+def replace_results(conn, run_id, discrepancies, source=None, conditions=(), params=(),
+                    batch_size=RESULTS_BATCH_SIZE):
+    """
+    Zastępuje wiersze przebiegu spełniające warunki (część przebiegu liczona ponownie) podanymi
+    rozbieżnościami: DELETE i INSERT na jednym połączeniu, BEZ commit - zatwierdza (albo wycofuje)
+    wywołujący, więc stare i nowe wiersze nigdy nie są widoczne razem. Zwraca liczbę usuniętych wierszy.
+    """
+    where = " AND ".join(["IdPrzebiegu = ?"] + list(conditions))
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {RESULTS_TABLE} WHERE {where}", [run_id] + list(params))
+    removed = cursor.rowcount
+    rows = [_result_row(run_id, source, discrepancy) for discrepancy in discrepancies]
+    cursor.fast_executemany = True
+    for start in range(0, len(rows), batch_size):
+        cursor.setinputsizes(_INPUT_SIZES)
+        cursor.executemany(_INSERT_SQL, rows[start:start + batch_size])
+    if has_runs_table(conn):
+        _count_run_rows(conn, run_id, source, len(rows) - removed)
+    return removed
+
+
+def has_results_browser(conn):
+    """Czy tabela wyników ma klucz i indeksy przeglądarki (wersja 5 schematu)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COL_LENGTH('{RESULTS_TABLE}', '{RESULT_KEY_COLUMN}')")
+    return cursor.fetchone()[0] is not None
+
+
+def fetch_runs(conn):
+    """
+    Przebiegi: (IdPrzebiegu, Zrodlo, zapisano, liczba wierszy), najnowsze najpierw. Bez tabeli przebiegów
+    (schemat sprzed wersji 7) lista jest liczona grupowaniem całej tabeli wyników.
+    """
+    cursor = conn.cursor()
+    if has_runs_table(conn):
+        cursor.execute(f"SELECT IdPrzebiegu, Zrodlo, Zapisano, Wiersze FROM {RUNS_TABLE} ORDER BY Zapisano DESC")
+        return [tuple(row) for row in cursor.fetchall()]
+    cursor.execute(f"""
+        SELECT IdPrzebiegu, MAX(Zrodlo), MIN(Zapisano), COUNT(*)
+        FROM {RESULTS_TABLE}
+        GROUP BY IdPrzebiegu
+        ORDER BY MIN(Zapisano) DESC
+    """)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _filter_conditions(results_filter):
+    conditions, params = ["IdPrzebiegu = ?"], [results_filter.run_id]
+    if results_filter.kod_sl:
+        conditions.append("KodSL LIKE ?")
+        params.append(results_filter.kod_sl.replace("[", "[[]").replace("%", "[%]").replace("_", "[_]") + "%")
+    for column, value in (("Parametr", results_filter.parametr), ("Typ", results_filter.typ),
+                          ("Pracownik", results_filter.pracownik)):
+        if value:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if results_filter.min_difference is not None:
+        conditions.append("RoznicaAbs >= ?")
+        params.append(results_filter.min_difference)
+    return conditions, params
+
+
+def _after_condition(column, descending, after):
+    """
+    Warunek „za ostatnim wierszem strony” dla ORDER BY kolumna, IdWyniku (oba rosnąco albo oba
+    malejąco). NULL-e są na początku przy sortowaniu rosnącym i na końcu przy malejącym (SQL Server).
+    """
+    value, key = after
+    op = "<" if descending else ">"
+    if column == RESULT_KEY_COLUMN:
+        return f"{RESULT_KEY_COLUMN} {op} ?", [key]
+    if value is None:
+        if descending:
+            return f"({column} IS NULL AND {RESULT_KEY_COLUMN} < ?)", [key]
+        return f"({column} IS NOT NULL OR {RESULT_KEY_COLUMN} > ?)", [key]
+    condition = f"{column} {op} ? OR ({column} = ? AND {RESULT_KEY_COLUMN} {op} ?)"
+    if descending:
+        condition += f" OR {column} IS NULL"
+    return f"({condition})", [value, value, key]
+
+
+def fetch_results_page(conn, results_filter, sort=DEFAULT_RESULT_SORT, after=None, limit=RESULTS_PAGE_SIZE):
+    """
+    Jedna strona wyników przebiegu (wiersze w układzie BROWSER_COLUMNS).
+    after - page_key ostatniego wiersza poprzedniej strony (None = pierwsza strona).
+    """
+    column, descending = sort
+    conditions, params = _filter_conditions(results_filter)
+    if after is not None:
+        condition, after_params = _after_condition(column, descending, after)
+        conditions.append(condition)
+        params += after_params
+    direction = " DESC" if descending else ""
+    order = f"{RESULT_KEY_COLUMN}{direction}"
+    if column != RESULT_KEY_COLUMN:
+        order = f"{column}{direction}, {order}"
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT TOP (?) {', '.join(BROWSER_COLUMNS)}
+        FROM {RESULTS_TABLE}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order}
+    """, [limit] + params)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def page_key(row, sort=DEFAULT_RESULT_SORT):
+    """Klucz paginacji wiersza strony: (wartość kolumny sortowania, IdWyniku)."""
+    return row[BROWSER_COLUMNS.index(sort[0])], row[0]
+
+
+def iter_results(conn, run_id, page_size=RESULTS_BATCH_SIZE):
+    """Wszystkie rozbieżności przebiegu w kolejności zapisu (krotki w układzie weryfikacja.REPORT_COLUMNS)."""
+    results_filter = ResultsFilter(run_id)
+    after = None
+    while True:
+        page = fetch_results_page(conn, results_filter, after=after, limit=page_size)
+        for row in page:
+            yield row[2:10]
+        if len(page) < page_size:
+            return
+        after = page_key(page[-1])
+
+
+def count_results(conn, results_filter):
+    conditions, params = _filter_conditions(results_filter)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {RESULTS_TABLE} WHERE {' AND '.join(conditions)}", params)
+    return cursor.fetchone()[0]